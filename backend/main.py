@@ -1,12 +1,20 @@
 """
 FastAPI Backend - Uses Modular Architecture
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List,  Dict
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, field_validator
+from typing import List,  Dict, Optional
+import asyncio
+import hashlib
+import hmac
+import json
 import sys
+import time
 import os
+from contextlib import nullcontext
 from pathlib import Path
 
 # Add parent directory to path
@@ -14,6 +22,39 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import modular components
 from modules import RecommendationEngine
+from modules.admission import AdmissionController
+from modules.catalog import CompactCatalog
+from modules.compression import maybe_compress
+from modules.cursor_store import RankingCursor, RankingCursorStore
+from modules.config import (
+    ADMIN_TOKEN,
+    CURSOR_MAX_ENTRIES,
+    CURSOR_MAX_RESULTS,
+    CURSOR_TTL,
+    MAX_BATCH_QUERIES,
+    PROFILE_MAX_SECONDS,
+    RECOMMEND_CACHE_CONTROL,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL
+)
+from modules.exceptions import AdmissionRejectedException
+from modules.executor import ExecutionLayer
+from modules.filters import RecommendationFilters, validate_test_types
+from modules.metrics import REGISTRY, stage_timer
+from modules.profiling import SamplingProfiler, StageTrace
+from modules.response_cache import ResponseCache
+from modules.serialization import dumps, render_recommend_response
+
+# compact=true: just what integrations need to link an assessment
+COMPACT_FIELDS = ('assessment_name', 'assessment_url', 'relevance_score')
+COMPACT_SCORE_DIGITS = 4
+
+def validate_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    if fields is not None:
+        if not fields:
+            raise ValueError("fields must not be empty")
+        CompactCatalog.canonical_fields(fields)
+    return fields
 
 app = FastAPI(
     title="SHL Assessment Recommendation System",
@@ -30,8 +71,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global recommender (initialized during startup)
+HTTP_SECONDS = REGISTRY.histogram(
+    'shl_http_request_duration_seconds',
+    'Time to response headers per route (streams: time to first event)',
+    ('method', 'route')
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'shl_http_requests_total',
+    'HTTP responses per route and status code',
+    ('method', 'route', 'status')
+)
+
+ADMISSION_WAIT = stage_timer('admission_wait')
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware timing every HTTP request by route template
+    (cheaper than BaseHTTPMiddleware and leaves streaming bodies alone);
+    also counts finished /recommend* requests for a running profile
+    """
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+    
+    def route_of(self, scope) -> str:
+        if self._routes is None:
+            self._routes = {route.endpoint: route.path for route in app.routes if hasattr(route, 'endpoint')}
+        return self._routes.get(scope.get('endpoint'), 'unmatched')
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status = [500]
+        
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                HTTP_SECONDS.labels(method=scope['method'], route=self.route_of(scope)).observe(
+                    time.perf_counter() - start
+                )
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self.route_of(scope)
+            HTTP_REQUESTS.labels(method=scope['method'], route=route, status=status[0]).inc()
+            if route.startswith('/recommend'):
+                profiler.request_finished()
+
+app.add_middleware(MetricsMiddleware)
+
+# Global recommender and execution layer (initialized during startup)
 recommender = None
+execution_layer = None
+
+# Rendered GET /recommend responses keyed by canonical request
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# Full rankings behind paginated /recommend/pages cursors
+cursor_store = RankingCursorStore(CURSOR_TTL, CURSOR_MAX_ENTRIES)
+
+# Bounded concurrency / load shedding for everything that runs the pipeline
+admission = AdmissionController()
+
+# On-demand stack sampling (POST /admin/profile)
+profiler = SamplingProfiler()
+
+@app.exception_handler(AdmissionRejectedException)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejectedException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(round(exc.retry_after)))}
+    )
 
 @app.on_event("startup")
 async def startup_event():
@@ -39,7 +155,7 @@ async def startup_event():
     Initialize recommendation engine during startup
     This prevents timeout on first request
     """
-    global recommender
+    global recommender, execution_layer
     
     print("="*80)
     print("INITIALIZING RECOMMENDATION ENGINE AT STARTUP")
@@ -58,6 +174,7 @@ async def startup_event():
         print("Loading data and building features...")
         recommender = RecommendationEngine()
         recommender.initialize()
+        execution_layer = ExecutionLayer(recommender)
         print("="*80)
         print("✅ RECOMMENDATION ENGINE READY!")
         print("="*80)
@@ -65,6 +182,12 @@ async def startup_event():
         # Restore original directory
         os.chdir(current_dir)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the CPU worker pool"""
+    if execution_layer is not None:
+        execution_layer.shutdown(wait=False)
+
 def get_recommender() -> RecommendationEngine:
     """
     Get the recommendation engine (already initialized at startup)
@@ -76,10 +199,68 @@ def get_recommender() -> RecommendationEngine:
     
     return recommender
 
+def get_execution_layer() -> ExecutionLayer:
+    """
+    Get the execution layer that runs the pipeline off the event loop
+    """
+    if execution_layer is None:
+        raise RuntimeError("Execution layer not initialized. This should not happen.")
+    
+    return execution_layer
+
 # Pydantic Models
 class RecommendRequest(BaseModel):
     query: str = Field(..., description="Job description or requirements", min_length=1)
     top_k: int = Field(10, ge=1, le=20, description="Number of recommendations")
+    max_duration: Optional[int] = Field(None, ge=1, description="Maximum duration in minutes")
+    min_duration: Optional[int] = Field(None, ge=0, description="Minimum duration in minutes")
+    remote: Optional[bool] = Field(None, description="Require (true) or exclude (false) remote support")
+    adaptive: Optional[bool] = Field(None, description="Require (true) or exclude (false) adaptive support")
+    test_types: Optional[List[str]] = Field(
+        None,
+        description="Only assessments covering any of these test types (names or codes A/B/C/D/E/K/P/S)"
+    )
+    exclude_test_types: Optional[List[str]] = Field(None, description="Exclude assessments with any of these test types")
+    extract_filters: Optional[bool] = Field(
+        None,
+        description="Also apply constraints stated in the query text (default: SHL_EXTRACT_QUERY_FILTERS, off)"
+    )
+    fields: Optional[List[str]] = Field(
+        None,
+        description="Only return these recommendation fields (e.g. assessment_url, assessment_name, relevance_score)"
+    )
+    compact: bool = Field(False, description="Name, URL and score only, scores rounded to 4 decimals")
+    trace: bool = Field(False, description="Include a per-stage timing trace in the response")
+    
+    @field_validator('fields')
+    @classmethod
+    def check_fields(cls, fields):
+        return validate_fields(fields)
+    
+    @field_validator('test_types', 'exclude_test_types')
+    @classmethod
+    def check_test_types(cls, labels):
+        return validate_test_types(labels)
+    
+    def to_filters(self) -> RecommendationFilters:
+        return RecommendationFilters(
+            max_duration=self.max_duration,
+            min_duration=self.min_duration,
+            remote=self.remote,
+            adaptive=self.adaptive,
+            include_types=self.test_types,
+            exclude_types=self.exclude_test_types
+        )
+
+class BatchRecommendRequest(BaseModel):
+    requests: List[RecommendRequest] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+    fields: Optional[List[str]] = Field(None, description="Default field selection for every request")
+    compact: bool = Field(False, description="Default compact mode for every request")
+    
+    @field_validator('fields')
+    @classmethod
+    def check_fields(cls, fields):
+        return validate_fields(fields)
 
 class AssessmentRecommendation(BaseModel):
     assessment_name: str
@@ -95,6 +276,74 @@ class RecommendResponse(BaseModel):
     query: str
     recommendations: List[AssessmentRecommendation]
     count: int
+    filters: Dict = Field(default_factory=dict, description="Filters applied (explicit + extracted from query)")
+    trace: Optional[Dict] = Field(None, description="Stage timings in ms (only when requested with trace=true)")
+
+class BatchRecommendResponse(BaseModel):
+    results: List[RecommendResponse]
+    count: int
+
+class RecommendPageResponse(RecommendResponse):
+    cursor: str
+    offset: int
+    total: int
+    next_offset: Optional[int] = Field(None, description="Offset of the next page (null on the last page)")
+
+def json_response(body: bytes, http_request: Request) -> Response:
+    """JSON response, gzip/brotli encoded when large enough and accepted"""
+    body, encoding = maybe_compress(body, http_request.headers.get('accept-encoding', ''))
+    headers = {'Vary': 'Accept-Encoding'}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def resolve_request_filters(request: RecommendRequest) -> RecommendationFilters:
+    return RecommendationEngine.resolve_filters(
+        request.query,
+        request.to_filters(),
+        extract_filters=request.extract_filters
+    )
+
+def request_priority(http_request: Request, default: str = 'interactive') -> str:
+    """Admission class from the X-Request-Priority header (interactive / batch)"""
+    return AdmissionController.normalize_priority(http_request.headers.get('x-request-priority', default))
+
+async def render_recommendation(
+    executor: ExecutionLayer,
+    request: RecommendRequest,
+    fields: Optional[List[str]] = None,
+    compact: bool = False,
+    filters: Optional[RecommendationFilters] = None,
+    priority: str = 'interactive',
+    served: Optional[Dict] = None
+) -> bytes:
+    """
+    Rank one request (under admission control) and assemble its body from pre-rendered catalog fragments
+
+    served is filled as in ExecutionLayer.rank (tier used, degraded or not).
+    """
+    if filters is None:
+        filters = resolve_request_filters(request)
+    with StageTrace() if request.trace else nullcontext() as trace:
+        start = time.perf_counter()
+        async with admission.slot(priority):
+            ADMISSION_WAIT.observe(time.perf_counter() - start)
+            indices, scores = await executor.rank(request.query, top_k=request.top_k, filters=filters,
+                                                  served=served)
+    
+    selected, compact = selected_fields(request, fields, compact)
+    
+    # The catalog data is trusted, so skip building and re-validating RecommendResponse
+    return render_recommend_response(
+        request.query,
+        executor.engine.catalog.json_fragments(selected),
+        indices,
+        scores,
+        filters=filters.to_dict(),
+        extra={'trace': trace.to_dict()} if trace is not None else None,
+        with_score='relevance_score' in selected,
+        score_digits=COMPACT_SCORE_DIGITS if compact else None
+    )
 
 # Endpoints
 @app.get("/")
@@ -123,11 +372,348 @@ async def health():
     return {
         "status": "healthy",
         "service": "SHL Recommendation System",
-        "architecture": "Modular"
+        "architecture": "Modular",
+        "serving_tier": recommender.serving_tier.name if recommender is not None else None
+    }
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Embedding cache hit rates and encoder time saved"""
+    engine = get_recommender()
+    stats = engine.feature_extractor.cache_stats()
+    stats['response_cache'] = response_cache.stats()
+    stats['cursors'] = cursor_store.stats()
+    return stats
+
+def collect_service_metrics():
+    """Scrape-time view of counters the caches, admission and tiers already keep"""
+    families = []
+    caches = [('response', response_cache.stats())]
+    if recommender is not None:
+        feature_extractor = recommender.feature_extractor
+        caches = [
+            ('query_embedding', feature_extractor.query_cache.stats()),
+            ('phrase_embedding', feature_extractor.phrase_cache.stats()),
+        ] + caches
+    families.append(('shl_cache_hits_total', 'counter', 'Cache hits',
+                     [({'cache': name}, stats['hits']) for name, stats in caches]))
+    families.append(('shl_cache_misses_total', 'counter', 'Cache misses',
+                     [({'cache': name}, stats['misses']) for name, stats in caches]))
+    families.append(('shl_cache_entries', 'gauge', 'Entries currently cached',
+                     [({'cache': name}, stats['size']) for name, stats in caches]))
+    
+    cursors = cursor_store.stats()
+    families.append(('shl_cursors', 'gauge', 'Live pagination cursors', [({}, cursors['cursors'])]))
+    families.append(('shl_cursor_bytes', 'gauge', 'Bytes held by pagination cursors', [({}, cursors['stored_bytes'])]))
+    
+    admitted = admission.stats()
+    families.append(('shl_admission_active', 'gauge', 'Requests running the pipeline', [({}, admitted['active'])]))
+    families.append(('shl_admission_queued', 'gauge', 'Requests waiting for a slot',
+                     [({'priority': name}, value) for name, value in admitted['queued'].items()]))
+    families.append(('shl_admission_admitted_total', 'counter', 'Requests admitted',
+                     [({'priority': name}, value) for name, value in admitted['admitted'].items()]))
+    families.append(('shl_admission_rejected_total', 'counter', 'Requests shed by admission control', [
+        ({'priority': name, 'reason': reason}, value)
+        for reason, key in (('queue_full', 'rejected_queue_full'), ('timeout', 'rejected_timeout'))
+        for name, value in admitted[key].items()
+    ]))
+    
+    if recommender is not None:
+        served = recommender.tier_selector.served
+        families.append(('shl_tier_requests_total', 'counter', 'Requests served per serving tier (fallbacks included)',
+                         [({'tier': name}, value) for name, value in served.items()]))
+    return families
+
+REGISTRY.register_collector('service', collect_service_metrics)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latency histograms, LLM outcomes, errors, caches, admission"""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def require_admin(http_request: Request) -> None:
+    """Admin endpoints need SHL_ADMIN_TOKEN as X-Admin-Token or a Bearer token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (set SHL_ADMIN_TOKEN)")
+    token = http_request.headers.get('x-admin-token', '')
+    authorization = http_request.headers.get('authorization', '')
+    if not token and authorization.lower().startswith('bearer '):
+        token = authorization[7:].strip()
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/admin/profile")
+async def admin_profile(
+    http_request: Request,
+    requests: Optional[int] = Query(None, ge=1, le=100000, description="Stop after this many /recommend* requests"),
+    seconds: Optional[float] = Query(None, gt=0, le=PROFILE_MAX_SECONDS, description="Stop after this long"),
+    interval_ms: Optional[float] = Query(None, ge=1, le=1000, description="Sampling interval"),
+    include_idle: bool = Query(False, description="Keep samples of threads waiting for work")
+):
+    """
+    Sample all thread stacks over the next N requests or T seconds
+    (whichever ends first, at most SHL_PROFILE_MAX_SECONDS)
+    
+    Returns folded stacks ('thread;outer;...;leaf count' per line) for
+    flamegraph.pl or speedscope; the run summary is in X-Profile-* headers.
+    """
+    require_admin(http_request)
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    result = await profiler.profile(
+        max_requests=requests,
+        seconds=seconds,
+        interval_ms=interval_ms,
+        include_idle=include_idle
+    )
+    summary = result.summary()
+    headers = {f"X-Profile-{key.replace('_', '-').title()}": str(value) for key, value in summary.items()}
+    return Response(result.folded(), media_type="text/plain", headers=headers)
+
+@app.get("/tiers")
+async def serving_tiers():
+    """Base serving tier, stage latencies vs. budgets and requests served per tier"""
+    return get_recommender().tier_selector.stats()
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Concurrency, queue depth, admissions and rejections per priority class"""
+    return admission.stats()
+
+def selected_fields(request: RecommendRequest, fields: Optional[List[str]] = None, compact: bool = False):
+    """Resolved (field projection, compact) for a request"""
+    compact = compact or request.compact
+    return CompactCatalog.canonical_fields(request.fields or fields or (COMPACT_FIELDS if compact else None)), compact
+
+def render_page(executor: ExecutionLayer, cursor: RankingCursor, offset: int, limit: int,
+                trace: Optional[StageTrace] = None) -> bytes:
+    """One page of a stored ranking, rendered from pre-rendered catalog fragments"""
+    indices, scores = cursor.page(offset, limit)
+    end = offset + len(indices)
+    extra = {
+        'cursor': cursor.cursor_id,
+        'offset': offset,
+        'total': cursor.total,
+        'next_offset': end if end < cursor.total else None
     }
+    if trace is not None:
+        extra['trace'] = trace.to_dict()
+    return render_recommend_response(
+        cursor.query,
+        executor.engine.catalog.json_fragments(cursor.fields),
+        indices,
+        scores,
+        filters=cursor.filters,
+        extra=extra,
+        with_score='relevance_score' in cursor.fields,
+        score_digits=COMPACT_SCORE_DIGITS if cursor.compact else None
+    )
+
+def stream_format(http_request: Request, requested: Optional[str]) -> str:
+    """'sse' or 'ndjson', from ?format= or the Accept header"""
+    if requested:
+        return requested
+    accept = http_request.headers.get('accept', '')
+    return 'sse' if 'text/event-stream' in accept else 'ndjson'
+
+async def stream_recommendation(executor: ExecutionLayer, request: RecommendRequest, fmt: str, release):
+    """
+    Provisional then final ranking as NDJSON lines or SSE events
+    
+    Each event is a normal recommend response plus 'stage' and 'timings'.
+    The admission slot taken before the response started is released
+    when the stream ends.
+    """
+    def frame(stage: str, body: bytes) -> bytes:
+        if fmt == 'sse':
+            return b'event: ' + stage.encode('ascii') + b'\ndata: ' + body + b'\n\n'
+        return body + b'\n'
+    
+    filters = resolve_request_filters(request)
+    selected, compact = selected_fields(request)
+    fragments = executor.engine.catalog.json_fragments(selected)
+    try:
+        async for stage, indices, scores, timings in executor.rank_progressive(
+            request.query, top_k=request.top_k, filters=filters
+        ):
+            body = render_recommend_response(
+                request.query,
+                fragments,
+                indices,
+                scores,
+                filters=filters.to_dict(),
+                extra={'stage': stage, 'timings': timings},
+                with_score='relevance_score' in selected,
+                score_digits=COMPACT_SCORE_DIGITS if compact else None
+            )
+            yield frame(stage, body)
+    except Exception as e:
+        yield frame('error', dumps({'stage': 'error', 'detail': f"Recommendation failed: {str(e)}"}))
+    finally:
+        release()
+
+async def streaming_response(
+    executor: ExecutionLayer,
+    request: RecommendRequest,
+    fmt: str,
+    priority: str
+) -> StreamingResponse:
+    # Admit before the 200 goes out so a rejection can still be a 429/503
+    await admission.acquire(priority)
+    released = False
+    
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission.release()
+    
+    media_type = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    return StreamingResponse(
+        stream_recommendation(executor, request, fmt, release),
+        media_type=media_type,
+        # Stop proxies from buffering the provisional event
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        # Also runs if the client disconnected before the stream started
+        background=BackgroundTask(release)
+    )
+
+def split_list_param(values: Optional[List[str]]) -> Optional[List[str]]:
+    """Accept both ?test_types=P&test_types=K and ?test_types=P,K"""
+    if not values:
+        return None
+    return [item.strip() for value in values for item in value.split(',') if item.strip()] or None
+
+def recommend_query_params(
+    query: str = Query(..., min_length=1, description="Job description or requirements"),
+    top_k: int = Query(10, ge=1, le=20),
+    max_duration: Optional[int] = Query(None, ge=1),
+    min_duration: Optional[int] = Query(None, ge=0),
+    remote: Optional[bool] = Query(None),
+    adaptive: Optional[bool] = Query(None),
+    test_types: Optional[List[str]] = Query(None),
+    exclude_test_types: Optional[List[str]] = Query(None),
+    extract_filters: Optional[bool] = Query(None),
+    fields: Optional[List[str]] = Query(None),
+    compact: bool = Query(False),
+    trace: bool = Query(False)
+) -> RecommendRequest:
+    """
+    GET /recommend parameters as a canonical RecommendRequest
+    
+    Whitespace in the query is collapsed so trivially different URLs share
+    one cache entry (the tokenizers ignore it anyway).
+    """
+    try:
+        return RecommendRequest(
+            query=' '.join(query.split()) or query,
+            top_k=top_k,
+            max_duration=max_duration,
+            min_duration=min_duration,
+            remote=remote,
+            adaptive=adaptive,
+            test_types=split_list_param(test_types),
+            exclude_test_types=split_list_param(exclude_test_types),
+            extract_filters=extract_filters,
+            fields=split_list_param(fields),
+            compact=compact,
+            trace=trace
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def recommend_cache_key(request: RecommendRequest, filters: RecommendationFilters, index_version: str) -> str:
+    """
+    Canonical cache key: requests that resolve to the same ranking inputs
+    (explicit vs. extracted filters, field order, list order) share a key
+    """
+    fields, _ = selected_fields(request)
+    return json.dumps([index_version, request.query, request.top_k, filters.cache_key(), fields, request.compact])
+
+def make_etag(body: bytes, index_version: str) -> str:
+    # Weak: the same representation may be sent gzip/br/identity encoded
+    return f'W/"{index_version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if (candidate[2:] if candidate.startswith('W/') else candidate) == opaque:
+            return True
+    return False
+
+@app.get("/recommend", response_model=RecommendResponse)
+async def recommend_get(http_request: Request, request: RecommendRequest = Depends(recommend_query_params)):
+    """
+    Cacheable variant of POST /recommend (same parameters as query string)
+    
+    Responses carry an ETag derived from the body and the index version and
+    the configured Cache-Control, so browsers and CDNs can reuse them;
+    If-None-Match revalidation returns 304. Rendered responses are also
+    kept in-process for SHL_RESPONSE_CACHE_TTL seconds. trace=true
+    responses, and rankings served by a degraded tier or without the LLM
+    extraction they should have had, are sent with no-store and never cached.
+    """
+    try:
+        executor = get_execution_layer()
+        index_version = executor.engine.index_version
+        filters = resolve_request_filters(request)
+        if request.trace:
+            body = await render_recommendation(
+                executor,
+                request,
+                filters=filters,
+                priority=request_priority(http_request)
+            )
+            response = json_response(body, http_request)
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        
+        key = recommend_cache_key(request, filters, index_version)
+        
+        cached = response_cache.get(key)
+        if cached is not None:
+            etag, body = cached
+        else:
+            served = {}
+            body = await render_recommendation(
+                executor,
+                request,
+                filters=filters,
+                priority=request_priority(http_request),
+                served=served
+            )
+            if served.get('degraded'):
+                # A lower tier or an LLM fallback is transient; never pin it in any cache
+                response = json_response(body, http_request)
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+            etag = make_etag(body, index_version)
+            response_cache.put(key, etag, body)
+        
+        headers = {'ETag': etag, 'Cache-Control': RECOMMEND_CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+        if etag_matches(http_request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=headers)
+        
+        response = json_response(body, http_request)
+        response.headers.update(headers)
+        return response
+        
+    except AdmissionRejectedException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Recommendation failed: {str(e)}"
+        )
 
 @app.post("/recommend", response_model=RecommendResponse)
-async def recommend(request: RecommendRequest):
+async def recommend(request: RecommendRequest, http_request: Request):
     """
     Get assessment recommendations using modular pipeline
     
@@ -142,29 +728,155 @@ async def recommend(request: RecommendRequest):
     **Request:**
     - query: Job description or requirements
     - top_k: Number of recommendations (1-20)
+    - max_duration / min_duration / remote / adaptive / test_types /
+      exclude_test_types: optional hard filters, applied before scoring
+    - extract_filters: also take filters stated in the query text (dropped
+      if they would match nothing; default SHL_EXTRACT_QUERY_FILTERS)
+    - fields: return only these recommendation fields
+    - compact: name, URL and score only
+    - trace: add per-stage timings (ms) to the response
     
     **Returns:**
     - List of recommended assessments with scores
     """
     try:
-        # Get modular recommender
-        engine = get_recommender()
+        # LLM call is awaited, scoring runs on the CPU pool
+        executor = get_execution_layer()
+        body = await render_recommendation(executor, request, priority=request_priority(http_request))
+        return json_response(body, http_request)
         
-        # Generate recommendations using modular pipeline
-        results = engine.recommend(request.query, top_k=request.top_k)
+    except AdmissionRejectedException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Recommendation failed: {str(e)}"
+        )
+
+@app.post("/recommend/batch", response_model=BatchRecommendResponse)
+async def recommend_batch(request: BatchRecommendRequest, http_request: Request):
+    """
+    Recommendations for several queries in one round trip
+    
+    Queries run concurrently (their LLM calls overlap, scoring shares the
+    CPU pool). Batch-level fields / compact apply to every request that
+    does not set its own. Each query is admitted separately in the
+    'batch' priority class (unless X-Request-Priority says otherwise).
+    """
+    tasks = []
+    try:
+        executor = get_execution_layer()
+        priority = request_priority(http_request, default='batch')
+        tasks = [
+            asyncio.ensure_future(render_recommendation(
+                executor, item, fields=request.fields, compact=request.compact, priority=priority
+            ))
+            for item in request.requests
+        ]
+        bodies = await asyncio.gather(*tasks)
+        body = b'{"results":[' + b','.join(bodies) + b'],"count":' + str(len(bodies)).encode('ascii') + b'}'
+        return json_response(body, http_request)
         
-        return RecommendResponse(
+    except AdmissionRejectedException:
+        # Don't keep computing a batch that is going to fail anyway
+        for task in tasks:
+            task.cancel()
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Batch recommendation failed: {str(e)}"
+        )
+
+@app.post("/recommend/stream")
+async def recommend_stream(
+    request: RecommendRequest,
+    http_request: Request,
+    format: Optional[str] = Query(None, pattern='^(ndjson|sse)$', description="ndjson (default) or sse")
+):
+    """
+    Progressive recommendations
+    
+    Emits a provisional top-k ranked from local signals (TF-IDF, semantic,
+    training patterns) as soon as it is ready, then the final ranking once
+    LLM requirement extraction returns. Events carry 'stage'
+    ('provisional' / 'final') and stage 'timings' in milliseconds.
+    """
+    executor = get_execution_layer()
+    return await streaming_response(executor, request, stream_format(http_request, format), request_priority(http_request))
+
+@app.get("/recommend/stream")
+async def recommend_stream_get(
+    http_request: Request,
+    request: RecommendRequest = Depends(recommend_query_params),
+    format: Optional[str] = Query(None, pattern='^(ndjson|sse)$')
+):
+    """GET form of /recommend/stream (usable from a browser EventSource)"""
+    executor = get_execution_layer()
+    return await streaming_response(executor, request, stream_format(http_request, format), request_priority(http_request))
+
+@app.post("/recommend/pages", response_model=RecommendPageResponse)
+async def recommend_pages(request: RecommendRequest, http_request: Request):
+    """
+    First page of a paginated ranking (page size = top_k)
+    
+    The full ranking (up to SHL_CURSOR_MAX_RESULTS) is computed once and
+    stored under the returned cursor; fetch further pages with
+    GET /recommend/pages/{cursor}?offset=... without rerunning the pipeline
+    (LLM call included). Cursors expire SHL_CURSOR_TTL seconds after last use.
+    """
+    try:
+        executor = get_execution_layer()
+        filters = resolve_request_filters(request)
+        with StageTrace() if request.trace else nullcontext() as trace:
+            start = time.perf_counter()
+            async with admission.slot(request_priority(http_request)):
+                ADMISSION_WAIT.observe(time.perf_counter() - start)
+                indices, scores = await executor.rank(
+                    request.query,
+                    top_k=CURSOR_MAX_RESULTS or None,
+                    filters=filters
+                )
+        fields, compact = selected_fields(request)
+        cursor = cursor_store.create(
+            indices,
+            scores,
             query=request.query,
-            recommendations=results,
-            count=len(results)
+            filters=filters.to_dict(),
+            fields=fields,
+            compact=compact,
+            page_size=request.top_k,
+            index_version=executor.engine.index_version
         )
+        return json_response(render_page(executor, cursor, 0, request.top_k, trace=trace), http_request)
         
+    except AdmissionRejectedException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, 
             detail=f"Recommendation failed: {str(e)}"
         )
 
+@app.get("/recommend/pages/{cursor_id}", response_model=RecommendPageResponse)
+async def recommend_page(
+    cursor_id: str,
+    http_request: Request,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=20, description="Page size (default: the first page's top_k)"),
+    trace: bool = Query(False, description="Include a timing trace (a stored page runs no pipeline stages)")
+):
+    """Slice a page out of a stored ranking"""
+    with StageTrace() if trace else nullcontext() as page_trace:
+        executor = get_execution_layer()
+        cursor = cursor_store.get(cursor_id)
+        if cursor is None or cursor.index_version != executor.engine.index_version:
+            raise HTTPException(status_code=404, detail="Cursor not found or expired")
+        if offset > cursor.total:
+            raise HTTPException(status_code=400, detail=f"offset beyond end of ranking ({cursor.total} results)")
+        body = render_page(executor, cursor, offset, limit or cursor.page_size, trace=page_trace)
+    return json_response(body, http_request)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
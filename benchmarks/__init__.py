@@ -0,0 +1,4 @@
+"""
+Performance Benchmarks
+Run from the project root, e.g. python -m benchmarks.encode_batching
+"""
@@ -0,0 +1,105 @@
+"""
+Benchmark Suite CLI
+
+Usage:
+    python -m benchmarks run --output bench.json
+    python -m benchmarks run --sections query http --baseline benchmarks/baseline.json
+    python -m benchmarks compare benchmarks/baseline.json bench.json --threshold 0.15
+
+'run' writes a JSON result (optionally comparing it with a baseline);
+'compare' diffs two results. Both exit with status 1 on a regression.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.suite import compare, run_suite
+
+SECTIONS = ('build', 'query', 'http')
+
+
+def _fmt(value, digits: int = 3) -> str:
+    if value is None:
+        return '-'
+    return f"{value:.{digits}f}"
+
+
+def print_result(result: dict) -> None:
+    print(f"\n{'stage':<30} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'per s':>10} {'RSS MB':>8}")
+    for stage, summary in result['stages'].items():
+        throughput = summary['throughput_per_s'] if stage.endswith('recommend') else None
+        print(f"{stage:<30} {summary['count']:>6} {_fmt(summary['p50_ms']):>10} {_fmt(summary['p95_ms']):>10} "
+              f"{_fmt(summary['p99_ms']):>10} {_fmt(throughput, 1):>10} {_fmt(summary['peak_rss_mb'], 1):>8}")
+    print(f"\nPeak RSS: {result['peak_rss_mb']:.1f} MB")
+
+
+def print_comparison(rows: list) -> int:
+    """Print baseline -> current per stage; returns the number of regressed stages"""
+    regressed = 0
+    print(f"\n{'stage':<30} {'metric':<18} {'baseline':>12} {'current':>12} {'change':>8}")
+    for row in rows:
+        for metric, (old, new) in row['metrics'].items():
+            change = f"{(new - old) / old:+.0%}" if old and new is not None else '-'
+            print(f"{row['stage']:<30} {metric:<18} {_fmt(old):>12} {_fmt(new):>12} {change:>8}")
+        if row['regressions']:
+            regressed += 1
+            print(f"  REGRESSION {row['stage']}: {', '.join(row['regressions'])}")
+    print(f"\n{regressed} regressed stage(s)" if regressed else "\nNo regressions")
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Stage and end-to-end benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the suite")
+    run.add_argument('--sections', nargs='+', choices=SECTIONS, default=list(SECTIONS))
+    run.add_argument('--data-dir', default='data')
+    run.add_argument('--tier', default='full', help="Serving tier to benchmark (default: full)")
+    run.add_argument('--repeat', type=int, default=5, help="Passes over the query set")
+    run.add_argument('--build-repeat', type=int, default=3, help="Runs of each build stage")
+    run.add_argument('--llm-latency-ms', type=float, default=0.0, help="Delay of the stubbed LLM")
+    run.add_argument('--http-requests', type=int, default=200)
+    run.add_argument('--concurrency', type=int, default=8, help="Concurrent /recommend requests")
+    run.add_argument('--output', help="Write the result JSON here (e.g. to save a baseline)")
+    run.add_argument('--baseline', help="Compare against this result and fail on regressions")
+    run.add_argument('--threshold', type=float, default=0.10, help="Relative change counted as a regression")
+
+    diff = commands.add_parser('compare', help="Compare two results")
+    diff.add_argument('baseline')
+    diff.add_argument('current')
+    diff.add_argument('--threshold', type=float, default=0.10)
+    diff.add_argument('--min-delta-ms', type=float, default=0.05, help="Ignore latency changes smaller than this")
+
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        baseline = json.loads(Path(args.baseline).read_text())
+        current = json.loads(Path(args.current).read_text())
+        return 1 if print_comparison(compare(baseline, current, args.threshold, args.min_delta_ms)) else 0
+
+    result = run_suite(
+        data_dir=args.data_dir,
+        tier=args.tier,
+        repeat=args.repeat,
+        build_repeat=args.build_repeat,
+        llm_latency_ms=args.llm_latency_ms,
+        http_requests=args.http_requests,
+        concurrency=args.concurrency,
+        sections=tuple(args.sections)
+    )
+    print_result(result)
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+        print(f"Saved {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        return 1 if print_comparison(compare(baseline, result, args.threshold)) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Encode Batching Benchmark
+Compares batch-of-one query encodes with the EncodeScheduler under
+concurrent load and reports QPS and p50/p99 latency.
+
+Usage:
+    python -m benchmarks.encode_batching --concurrency 1 8 32 --requests 512
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules import DataLoader, FeatureExtractor
+from modules.encode_scheduler import EncodeScheduler
+
+
+def load_queries(data_dir: str, n: int) -> List[str]:
+    """Training/test queries, cycled with a suffix so no two texts are identical"""
+    loader = DataLoader(data_dir=data_dir)
+    data = loader.load_train_test_data()
+    base = list(dict.fromkeys(
+        data['train']['Query'].astype(str).tolist() + data['test']['Query'].astype(str).tolist()
+    ))
+    return [f"{base[i % len(base)]} (variant {i})" for i in range(n)]
+
+
+def run_load(encode_one: Callable[[str], np.ndarray], queries: List[str], concurrency: int) -> Dict:
+    """Issue all queries from `concurrency` threads and time each call"""
+    latencies = [0.0] * len(queries)
+    next_index = iter(range(len(queries)))
+    index_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with index_lock:
+                i = next(next_index, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            encode_one(queries[i])
+            latencies[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    wall_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        'qps': len(queries) / wall,
+        'p50_ms': float(np.percentile(lat_ms, 50)),
+        'p99_ms': float(np.percentile(lat_ms, 99))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched query encoding")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--requests', type=int, default=512, help="Encodes per run")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--output', help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    extractor = FeatureExtractor()
+    extractor.load_embedding_model()
+    queries = load_queries(args.data_dir, args.requests)
+
+    # Warm up the model so the first run is not penalised
+    extractor._encode_texts(queries[:8])
+
+    results = []
+    print(f"{'mode':<10}{'conc':>6}{'QPS':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for concurrency in args.concurrency:
+        direct = run_load(lambda q: extractor._encode_texts([q])[0], queries, concurrency)
+
+        scheduler = EncodeScheduler(
+            extractor._encode_texts,
+            max_batch_size=args.max_batch,
+            max_wait_ms=args.max_wait_ms
+        )
+        batched = run_load(scheduler.encode, queries, concurrency)
+        batched['mean_batch_size'] = scheduler.stats()['mean_batch_size']
+        scheduler.close()
+
+        for mode, stats in (('direct', direct), ('batched', batched)):
+            print(f"{mode:<10}{concurrency:>6}{stats['qps']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+            results.append({'mode': mode, 'concurrency': concurrency, **stats})
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
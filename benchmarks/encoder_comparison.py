@@ -0,0 +1,123 @@
+"""
+Encoder Backend Comparison
+Embedding parity, query-encode latency and Recall@10 for the torch,
+ONNX and int8 ONNX encoder backends.
+
+Usage:
+    python download_models.py --onnx --int8
+    python -m benchmarks.encoder_comparison --backends torch onnx onnx-int8
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules import DataLoader, DataPreprocessor, Evaluator, FeatureExtractor, RecommendationEngine
+
+
+def query_latencies(extractor: FeatureExtractor, queries: List[str], repeats: int) -> Dict:
+    """Single-query encode latency (batch of one, as in recommend)"""
+    timings = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            extractor._encode_texts([query])
+            timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    return {
+        'query_p50_ms': float(np.percentile(timings, 50)),
+        'query_p99_ms': float(np.percentile(timings, 99))
+    }
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return (a * b).sum(axis=1)
+
+
+def top10_overlap(query_a: np.ndarray, catalog_a: np.ndarray, query_b: np.ndarray, catalog_b: np.ndarray) -> float:
+    """Mean overlap of the semantic top-10 rankings produced by two backends"""
+    top_a = np.argsort(-(query_a @ catalog_a.T), axis=1)[:, :10]
+    top_b = np.argsort(-(query_b @ catalog_b.T), axis=1)[:, :10]
+    return float(np.mean([len(set(x) & set(y)) / 10 for x, y in zip(top_a, top_b)]))
+
+
+def recall_at_10(backend: str, data_dir: str) -> float:
+    """End-to-end Recall@10 with the whole catalog encoded by this backend"""
+    engine = RecommendationEngine(data_dir=data_dir)
+    engine.feature_extractor = FeatureExtractor(encoder_backend=backend)
+    engine.initialize()
+    return float(Evaluator(engine).evaluate_recall_at_k(k=10))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encoder backends")
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8'])
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--repeats', type=int, default=5, help="Passes over the query set for latency")
+    parser.add_argument('--skip-recall', action='store_true', help="Skip the end-to-end Recall@10 runs")
+    parser.add_argument('--output', help="Optional JSON file for the report")
+    args = parser.parse_args()
+
+    loader = DataLoader(data_dir=args.data_dir)
+    data = loader.get_all_data()
+    catalog = DataPreprocessor().clean_scraped_data(data['scraped'])
+    catalog_texts = FeatureExtractor.build_semantic_texts(catalog)
+    queries = list(dict.fromkeys(
+        data['train']['Query'].astype(str).tolist() + data['test']['Query'].astype(str).tolist()
+    ))
+
+    vectors = {}
+    report = []
+    for backend in args.backends:
+        extractor = FeatureExtractor(encoder_backend=backend)
+        extractor.load_embedding_model()
+
+        start = time.perf_counter()
+        catalog_vectors = extractor.embedding_model.encode(catalog_texts, show_progress_bar=False)
+        catalog_seconds = time.perf_counter() - start
+
+        query_vectors = extractor.embedding_model.encode(queries, show_progress_bar=False)
+        vectors[backend] = (np.asarray(query_vectors), np.asarray(catalog_vectors))
+
+        entry = {
+            'backend': backend,
+            'catalog_encode_s': catalog_seconds,
+            **query_latencies(extractor, queries, args.repeats)
+        }
+        if not args.skip_recall:
+            entry['recall_at_10'] = recall_at_10(backend, args.data_dir)
+        report.append(entry)
+
+    # Parity against the torch reference
+    if 'torch' in vectors:
+        ref_queries, ref_catalog = vectors['torch']
+        for entry in report:
+            query_vectors, catalog_vectors = vectors[entry['backend']]
+            catalog_cos = cosine_rows(catalog_vectors, ref_catalog)
+            entry['parity_min_cosine'] = float(catalog_cos.min())
+            entry['parity_mean_cosine'] = float(catalog_cos.mean())
+            entry['semantic_top10_overlap'] = top10_overlap(query_vectors, catalog_vectors, ref_queries, ref_catalog)
+
+    print(f"\n{'backend':<12}{'p50 ms':>9}{'p99 ms':>9}{'catalog s':>11}{'min cos':>9}{'top10':>8}{'R@10':>8}")
+    for entry in report:
+        print(
+            f"{entry['backend']:<12}{entry['query_p50_ms']:>9.2f}{entry['query_p99_ms']:>9.2f}"
+            f"{entry['catalog_encode_s']:>11.2f}{entry.get('parity_min_cosine', float('nan')):>9.4f}"
+            f"{entry.get('semantic_top10_overlap', float('nan')):>8.3f}{entry.get('recall_at_10', float('nan')):>8.3f}"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
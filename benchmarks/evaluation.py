@@ -0,0 +1,64 @@
+"""
+Offline Evaluation
+Recall, MAP, NDCG and MRR at several cutoffs over the labelled train
+queries, with LLM extractions replayed from the evaluation cache.
+--folds / --loo cross-validate so training patterns never see the
+query being scored.
+
+Usage:
+    python -m benchmarks.evaluation --k 1 3 5 10 --workers 4
+    python -m benchmarks.evaluation --llm replay --tier lexical-training --output eval.json
+    python -m benchmarks.evaluation --folds 5
+    python -m benchmarks.evaluation --loo
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules import Evaluator, RecommendationEngine
+from modules.evaluator import DEFAULT_KS, DEFAULT_LLM_CACHE, LLM_MODES, format_metrics
+from modules.serving_tiers import TIER_ORDER, get_tier
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate rankings on the labelled train queries")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--k', type=int, nargs='+', default=list(DEFAULT_KS), help="Cutoffs")
+    parser.add_argument('--tier', choices=TIER_ORDER, help="Serving tier (default: the engine's)")
+    parser.add_argument('--llm', choices=LLM_MODES, default='cached', help="LLM requirements source")
+    parser.add_argument('--llm-cache', default=DEFAULT_LLM_CACHE, help="Extraction cache file")
+    parser.add_argument('--workers', type=int, default=1, help="Ranking processes")
+    parser.add_argument('--folds', type=int, help="K-fold cross-validation by query")
+    parser.add_argument('--loo', action='store_true', help="Leave-one-query-out cross-validation")
+    parser.add_argument('--seed', type=int, default=0, help="Fold shuffle seed")
+    parser.add_argument('--per-query', action='store_true', help="Print per-query recall")
+    parser.add_argument('--output', help="Write metrics and per-query results as JSON")
+    args = parser.parse_args()
+
+    engine = RecommendationEngine(data_dir=args.data_dir)
+    engine.initialize()
+    evaluator = Evaluator(engine, llm_cache_path=args.llm_cache)
+    tier = get_tier(args.tier) if args.tier else None
+    if args.loo or args.folds:
+        result = evaluator.cross_validate(folds=None if args.loo else args.folds, ks=args.k, tier=tier,
+                                          llm=args.llm, workers=args.workers, seed=args.seed,
+                                          verbose=args.per_query)
+        scheme = f", {'leave-one-query-out' if args.loo else str(result['folds']) + '-fold'}"
+    else:
+        result = evaluator.evaluate(ks=args.k, tier=tier, llm=args.llm, workers=args.workers, verbose=args.per_query)
+        scheme = ''
+
+    if not args.per_query:
+        print(f"\n{result['queries']} queries, tier {(tier or engine.serving_tier).name}, "
+              f"LLM {args.llm}{scheme}, {result['seconds']['total']:.2f}s")
+        print('\n'.join(format_metrics(result['metrics'], args.k)))
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Index Build Benchmark
+Times RecommendationEngine.initialize on the bundled catalog and on
+synthetic catalogs, with the index stages run one at a time and
+concurrently, and reports each stage's time.
+
+Usage:
+    python -m benchmarks.index_build --sizes bundled 50k 500k --workers 1 4
+    python -m benchmarks.index_build --sizes 50k --encode-processes 4 --encode-batch 64 --output build.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.suite import peak_rss_mb
+from benchmarks.synthetic_data import generate, parse_count, write_dataset
+from modules import RecommendationEngine, config
+from modules.serving_tiers import TIER_ORDER, TierSelector, get_tier
+
+
+def build_once(data_dir: str, tier_name: str, workers: int, encode_batch: int, encode_processes: int) -> Dict:
+    """One initialize() with the given settings: wall time and per-stage seconds"""
+    config.INDEX_BUILD_WORKERS = workers
+    config.INDEX_ENCODE_BATCH = encode_batch
+    config.INDEX_ENCODE_PROCESSES = encode_processes
+    engine = RecommendationEngine(data_dir=data_dir)
+    engine.tier_selector = TierSelector(get_tier(tier_name), llm_budget_ms=0, semantic_budget_ms=0)
+
+    start = time.perf_counter()
+    engine.initialize()
+    seconds = time.perf_counter() - start
+    stages = {entry['stage']: round(entry['seconds'], 3) for entry in engine.build_report}
+    result = {
+        'assessments': engine.catalog.size,
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        # What the same stages cost back to back (assembly excluded)
+        'stage_seconds_total': round(sum(stages.values()), 3),
+        'stages': stages,
+    }
+    if engine.feature_extractor.encode_scheduler is not None:
+        engine.feature_extractor.disable_encode_batching()
+    del engine
+    gc.collect()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the index build at several catalog sizes")
+    parser.add_argument('--sizes', nargs='+', default=['bundled', '50k', '500k'],
+                        help="'bundled' (data/) or synthetic assessment counts such as 50k, 500k")
+    parser.add_argument('--data-dir', default='data', help="Bundled data directory")
+    parser.add_argument('--tier', choices=TIER_ORDER, default='no-llm', help="Tier to build (semantic tiers encode)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help="Concurrent stages to compare")
+    parser.add_argument('--encode-batch', type=int, default=config.INDEX_ENCODE_BATCH)
+    parser.add_argument('--encode-processes', type=int, default=config.INDEX_ENCODE_PROCESSES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = {
+        'cpus': os.cpu_count(),
+        'tier': args.tier,
+        'encode_batch': args.encode_batch,
+        'encode_processes': args.encode_processes,
+        'runs': []
+    }
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix='shl-index-') as tmp:
+            if size == 'bundled':
+                data_dir = args.data_dir
+            else:
+                data_dir = str(write_dataset(generate(parse_count(size), seed=args.seed), tmp))
+            for workers in args.workers:
+                run = build_once(data_dir, args.tier, workers, args.encode_batch, args.encode_processes)
+                run['size'] = size
+                results['runs'].append(run)
+                print(f"\n{size:>8} ({run['assessments']} assessments), {workers} worker(s): {run['seconds']:.2f}s "
+                      f"(stages back to back {run['stage_seconds_total']:.2f}s)")
+                print('  ' + ', '.join(f"{name} {seconds:.2f}s" for name, seconds in run['stages'].items()))
+    results['peak_rss_mb'] = round(peak_rss_mb(), 1)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\nSaved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+Load Test
+QPS and tail latency of the API under an LLM stub: starts the stub Groq
+server and the backend (or targets a running one), then drives
+/recommend at fixed arrival rates (open loop) or with a fixed number of
+concurrent clients (closed loop), one step per rate or concurrency.
+
+Open-loop latency is measured from each request's scheduled send time,
+so time spent waiting behind a saturated server counts (no coordinated
+omission). The saturation point is the first step whose throughput falls
+below 90% of the offered rate, whose p99 exceeds --slo-ms or whose error
+rate exceeds --max-error-rate; in closed loop, the first step that adds
+less than 10% throughput.
+
+Usage:
+    python -m benchmarks.load_test --rates 2 5 10 20 --duration 30 --llm-latency lognormal:300,0.5
+    python -m benchmarks.load_test --concurrency 1 4 16 64 --queries synthetic --llm-error-rate 0.02
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 --stub-url http://127.0.0.1:8090 --rates 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+ROOT = Path(__file__).parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def load_queries(source: str, data_dir: str, count: int, seed: int) -> List[str]:
+    """
+    Query mix: 'replay' (train + test queries in data_dir), 'synthetic'
+    (generated, see benchmarks.synthetic_data) or a text file, one per line
+    """
+    if source == 'replay':
+        sheets = pd.read_excel(Path(data_dir) / "Gen_AI Dataset (1).xlsx", sheet_name=['Train-Set', 'Test-Set'])
+        queries = pd.concat([sheets['Train-Set']['Query'], sheets['Test-Set']['Query']]).astype(str)
+        return list(dict.fromkeys(queries))
+    if source == 'synthetic':
+        from benchmarks.synthetic_data import generate
+        return generate(2000, n_train_queries=0, n_test_queries=count, seed=seed)['test']['Query'].tolist()
+    return [line.strip() for line in Path(source).read_text().splitlines() if line.strip()]
+
+
+class ManagedProcess:
+    """Subprocess that is terminated on exit; output goes to a log file"""
+
+    def __init__(self, name: str, args: List[str], env: Dict[str, str], log_dir: Path):
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.log_path = log_dir / f"load_test_{name}.log"
+        self._log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(args, cwd=ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+
+async def wait_healthy(url: str, process: Optional[ManagedProcess], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.process.poll() is not None:
+                raise RuntimeError(f"{process.name} exited during startup, see {process.log_path}")
+            try:
+                if (await client.get(f"{url}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} not healthy after {timeout:.0f}s")
+
+
+class LoadGenerator:
+    """Sends /recommend requests and records (scheduled, end, status) per request"""
+
+    def __init__(self, client: httpx.AsyncClient, queries: List[str], endpoint: str, top_k: int, seed: int):
+        self.client = client
+        self.queries = queries
+        self.endpoint = endpoint
+        self.top_k = top_k
+        self.rng = np.random.default_rng(seed)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _next_query(self) -> str:
+        return self.queries[int(self.rng.integers(len(self.queries)))]
+
+    async def send(self, scheduled: float, records: List) -> None:
+        query = self._next_query()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.endpoint == 'get':
+                response = await self.client.get('/recommend', params={'query': query, 'top_k': self.top_k})
+            else:
+                response = await self.client.post('/recommend', json={'query': query, 'top_k': self.top_k})
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = 'timeout'
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        records.append((scheduled, time.perf_counter(), status))
+
+    async def open_loop(self, rate: float, duration: float, arrivals: str) -> List:
+        """Requests start at fixed (uniform) or Poisson arrival times regardless of responses"""
+        records, tasks = [], []
+        start = time.perf_counter()
+        offset = 0.0
+        while offset < duration:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.send(scheduled, records)))
+            offset += self.rng.exponential(1 / rate) if arrivals == 'poisson' else 1 / rate
+        await asyncio.gather(*tasks)
+        return records
+
+    async def closed_loop(self, concurrency: int, duration: float) -> List:
+        """concurrency clients, each sending its next request when the last one returns"""
+        records = []
+        stop_at = time.perf_counter() + duration
+
+        async def client():
+            while time.perf_counter() < stop_at:
+                await self.send(time.perf_counter(), records)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return records
+
+
+def summarize_step(records: List, start: float, duration: float) -> Dict:
+    """Latency percentiles of successful requests; throughput counts those finished within the step"""
+    latencies = np.array([(end - scheduled) * 1000 for scheduled, end, status in records if status == '200'])
+    completed = sum(1 for _, end, status in records if status == '200' and end <= start + duration)
+    statuses: Dict[str, int] = {}
+    for _, _, status in records:
+        statuses[status] = statuses.get(status, 0) + 1
+    total = len(records)
+    summary = {
+        'requests': total,
+        'sent_per_s': total / duration,
+        'throughput_per_s': completed / duration,
+        'error_rate': (total - len(latencies)) / total if total else 0.0,
+        'statuses': statuses,
+    }
+    for name, q in (('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99), ('max_ms', 100)):
+        summary[name] = float(np.percentile(latencies, q)) if len(latencies) else None
+    return summary
+
+
+def find_saturation(steps: List[Dict], slo_ms: float, max_error_rate: float) -> Optional[Dict]:
+    """First step that is saturated, with the reason"""
+    previous = None
+    for step in steps:
+        reasons = []
+        # Compared with the arrivals actually sent (Poisson counts vary around the rate)
+        if 'rate' in step and step['throughput_per_s'] < 0.9 * step['sent_per_s']:
+            reasons.append(f"throughput {step['throughput_per_s']:.1f}/s < 90% of {step['sent_per_s']:.1f}/s offered")
+        if previous is not None and 'concurrency' in step and 'concurrency' in previous and \
+                step['throughput_per_s'] < 1.1 * previous['throughput_per_s']:
+            reasons.append(f"throughput {step['throughput_per_s']:.1f}/s, +<10% over {previous['concurrency']} clients")
+        if step['p99_ms'] is None or step['p99_ms'] > slo_ms:
+            reasons.append(f"p99 above {slo_ms:g} ms")
+        if step['error_rate'] > max_error_rate:
+            reasons.append(f"error rate {step['error_rate']:.1%}")
+        if reasons:
+            return {'step': step.get('rate', step.get('concurrency')), 'reasons': reasons}
+        previous = step
+    return None
+
+
+async def stub_stats(client: Optional[httpx.AsyncClient]) -> Optional[Dict]:
+    if client is None:
+        return None
+    try:
+        return (await client.get('/stats')).json()
+    except httpx.HTTPError:
+        return None
+
+
+def llm_delta(before: Optional[Dict], after: Optional[Dict], requests: int) -> Optional[Dict]:
+    """Stub LLM calls and failures during one step"""
+    if not before or not after:
+        return None
+    delta = {key: after[key] - before[key] for key in ('requests', 'ok', 'rate_limited', 'errors', 'malformed')}
+    delta['calls_per_request'] = delta['requests'] / requests if requests else 0.0
+    delta['max_in_flight'] = after['max_in_flight']
+    return delta
+
+
+def print_step(step: Dict) -> None:
+    label = f"rate {step['rate']:g}/s" if 'rate' in step else f"{step['concurrency']} clients"
+    fmt = lambda v: '-' if v is None else f"{v:.0f}"
+    line = (f"{label:>14}  {step['requests']:>6} req  {step['throughput_per_s']:>7.1f}/s  "
+            f"p50 {fmt(step['p50_ms']):>6}  p90 {fmt(step['p90_ms']):>6}  p99 {fmt(step['p99_ms']):>6}  "
+            f"max {fmt(step['max_ms']):>6} ms  errors {step['error_rate']:.1%}")
+    if step.get('llm'):
+        line += f"  llm calls/req {step['llm']['calls_per_request']:.2f}"
+    print(line)
+    non_ok = {status: count for status, count in step['statuses'].items() if status != '200'}
+    if non_ok:
+        print(f"{'':>16}non-200: {non_ok}")
+
+
+async def run(args) -> Dict:
+    processes: List[ManagedProcess] = []
+    stub_client = None
+    try:
+        target = args.target
+        if args.stub_url:
+            stub_client = httpx.AsyncClient(base_url=args.stub_url, timeout=5.0)
+        if target is None:
+            env = dict(os.environ)
+            stub_port = free_port()
+            processes.append(ManagedProcess('stub_groq', [
+                sys.executable, '-m', 'benchmarks.stub_groq', '--port', str(stub_port),
+                '--data-dir', args.data_dir, '--latency', args.llm_latency,
+                '--error-rate', str(args.llm_error_rate), '--rate-limit-rate', str(args.llm_rate_limit_rate),
+                '--malformed-rate', str(args.llm_malformed_rate), '--seed', str(args.seed)
+            ], env, ROOT / 'logs'))
+            stub_url = f"http://127.0.0.1:{stub_port}"
+            await wait_healthy(stub_url, processes[-1], 120)
+            stub_client = httpx.AsyncClient(base_url=stub_url, timeout=5.0)
+
+            api_port = free_port()
+            env.update(GROQ_BASE_URL=stub_url, GROQ_API_KEY='stub')
+            processes.append(ManagedProcess('backend', [
+                sys.executable, '-m', 'uvicorn', 'backend.main:app', '--host', '127.0.0.1',
+                '--port', str(api_port), '--log-level', 'warning'
+            ], env, ROOT / 'logs'))
+            target = f"http://127.0.0.1:{api_port}"
+            print(f"Starting backend on {target} (LLM stub {stub_url}, {args.llm_latency})...")
+            await wait_healthy(target, processes[-1], args.startup_timeout)
+
+        queries = load_queries(args.queries, args.data_dir, args.query_count, args.seed)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=1000)
+        async with httpx.AsyncClient(base_url=target, timeout=args.timeout, limits=limits) as client:
+            generator = LoadGenerator(client, queries, args.endpoint, args.top_k, args.seed)
+            for query in queries[:args.warmup]:
+                await generator.send(time.perf_counter(), [])
+
+            steps = []
+            plan = [('rate', r) for r in args.rates or []] + [('concurrency', c) for c in args.concurrency or []]
+            for kind, value in plan:
+                generator.max_in_flight = 0
+                before = await stub_stats(stub_client)
+                start = time.perf_counter()
+                if kind == 'rate':
+                    records = await generator.open_loop(value, args.duration, args.arrivals)
+                else:
+                    records = await generator.closed_loop(value, args.duration)
+                step = {kind: value, **summarize_step(records, start, args.duration)}
+                step['max_in_flight'] = generator.max_in_flight
+                step['llm'] = llm_delta(before, await stub_stats(stub_client), len(records))
+                steps.append(step)
+                print_step(step)
+                if args.cooldown:
+                    await asyncio.sleep(args.cooldown)
+
+        saturation = {}
+        for kind, label in (('rate', 'open loop'), ('concurrency', 'closed loop')):
+            kind_steps = [step for step in steps if kind in step]
+            if not kind_steps:
+                continue
+            saturation[kind] = found = find_saturation(kind_steps, args.slo_ms, args.max_error_rate)
+            if found is None:
+                print(f"\n{label}: no saturation within the tested steps")
+            else:
+                print(f"\n{label}: saturated at {kind} {found['step']:g} - {'; '.join(found['reasons'])}")
+        return {
+            'target': target,
+            'endpoint': args.endpoint,
+            'queries': args.queries,
+            'llm': None if args.target else {
+                'latency': args.llm_latency, 'error_rate': args.llm_error_rate,
+                'rate_limit_rate': args.llm_rate_limit_rate, 'malformed_rate': args.llm_malformed_rate
+            },
+            'duration_s': args.duration,
+            'steps': steps,
+            'saturation': saturation,
+        }
+    finally:
+        if stub_client is not None:
+            await stub_client.aclose()
+        for process in reversed(processes):
+            process.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /recommend against a stub LLM")
+    parser.add_argument('--target', help="Base URL of a running API (default: start one with the LLM stub)")
+    parser.add_argument('--stub-url', help="With --target: the stub Groq server it uses, for LLM call counts")
+    parser.add_argument('--rates', type=float, nargs='+', help="Open loop: arrival rates (requests/s), one step each")
+    parser.add_argument('--concurrency', type=int, nargs='+', help="Closed loop: concurrent clients, one step each")
+    parser.add_argument('--arrivals', choices=('poisson', 'uniform'), default='poisson')
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds per step")
+    parser.add_argument('--cooldown', type=float, default=2.0, help="Pause between steps (s)")
+    parser.add_argument('--warmup', type=int, default=10, help="Sequential requests before the first step")
+    parser.add_argument('--endpoint', choices=('post', 'get'), default='post',
+                        help="POST /recommend, or GET (response cache applies)")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=60.0, help="Client timeout per request (s)")
+    parser.add_argument('--queries', default='replay', help="replay, synthetic or a file with one query per line")
+    parser.add_argument('--query-count', type=int, default=200, help="Synthetic queries to generate")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--llm-latency', default='lognormal:300,0.5', help="Stub latency (see benchmarks.stub_groq)")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--llm-malformed-rate', type=float, default=0.0)
+    parser.add_argument('--startup-timeout', type=float, default=600.0)
+    parser.add_argument('--slo-ms', type=float, default=5000.0, help="p99 latency above this counts as saturated")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+    if not args.rates and not args.concurrency:
+        parser.error("give --rates and/or --concurrency")
+
+    result = asyncio.run(run(args))
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
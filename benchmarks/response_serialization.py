@@ -0,0 +1,78 @@
+"""
+Response Serialization Benchmark
+Time to turn a top_k ranking into the /recommend response body:
+dict build + RecommendResponse validation + jsonable_encoder + JSONResponse
+(the previous path) versus assembling pre-rendered catalog fragments.
+
+Usage:
+    python -m benchmarks.response_serialization --top-k 20 --iterations 5000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from modules import DataLoader, DataPreprocessor
+from modules.catalog import CompactCatalog
+from modules.serialization import loads, orjson, render_recommend_response
+
+
+def timed(fn, iterations: int) -> np.ndarray:
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - start
+    return timings * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /recommend response serialization")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    from backend.main import RecommendResponse
+
+    scraped = DataLoader(data_dir=args.data_dir).load_scraped_assessments()
+    catalog = CompactCatalog.from_dataframe(DataPreprocessor().clean_scraped_data(scraped))
+    catalog.build_json_fragments()
+
+    rng = np.random.default_rng(0)
+    indices = rng.choice(catalog.size, size=min(args.top_k, catalog.size), replace=False)
+    scores = np.sort(rng.random(len(indices)))[::-1]
+    query = "Java developer who can collaborate with business teams, under 40 minutes"
+    filters = {'max_duration': 40}
+
+    def validated_path():
+        records = [catalog.record(idx, score) for idx, score in zip(indices, scores)]
+        model = RecommendResponse(query=query, recommendations=records, count=len(records), filters=filters)
+        return JSONResponse(jsonable_encoder(model)).body
+
+    def fragment_path():
+        return render_recommend_response(query, catalog.json_prefixes, indices, scores, filters=filters)
+
+    # Both paths must produce the same document
+    assert json.loads(validated_path()) == loads(fragment_path()), "Serialized responses differ"
+
+    results = {}
+    for name, fn in (('validated', validated_path), ('fragments', fragment_path)):
+        fn()
+        timings = timed(fn, args.iterations)
+        results[name] = timings
+        print(f"{name:<10} mean {timings.mean():8.1f} us   p50 {np.percentile(timings, 50):8.1f} us   "
+              f"p99 {np.percentile(timings, 99):8.1f} us   ({len(fn())} bytes)")
+
+    speedup = results['validated'].mean() / results['fragments'].mean()
+    print(f"\ntop_k={len(indices)}  encoder={'orjson' if orjson else 'json'}  speedup {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Serving Tier Benchmark
+Mean Recall@10 (train set) and recommend latency for each serving tier the
+engine can serve, with optional weight re-tuning for the tiers that do not
+need the embedding model or the LLM.
+
+Usage:
+    SHL_SERVING_TIER=lexical-training python -m benchmarks.serving_tiers --tune
+    python -m benchmarks.serving_tiers
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules import Evaluator, RecommendationEngine
+from modules.serving_tiers import TIER_ORDER, TIERS, ServingTier, renormalize
+
+
+def servable_tiers(engine: RecommendationEngine) -> List[str]:
+    """The engine's base tier and every cheaper tier"""
+    return list(TIER_ORDER[TIER_ORDER.index(engine.serving_tier.name):])
+
+
+def latency_ms(engine: RecommendationEngine, tier: ServingTier, queries: List[str]) -> float:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        engine.recommend(query, top_k=10, tier=tier)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50))
+
+
+def weight_grid(components: List[str], step: float):
+    """All weight vectors over components on a step grid that sum to 1"""
+    units = int(round(1 / step))
+    for split in itertools.product(range(units + 1), repeat=len(components) - 1):
+        if sum(split) <= units:
+            values = list(split) + [units - sum(split)]
+            if values[0] > 0:  # TF-IDF always carries weight
+                yield {name: value * step for name, value in zip(components, values)}
+
+
+def tune(evaluator: Evaluator, tier: ServingTier, step: float) -> Dict:
+    """Grid-search the tier's weights for Mean Recall@10 (ties keep the current weights)"""
+    components = list(tier.weights)
+    best_weights, best_recall = tier.weights, evaluator.evaluate_recall_at_k(10, tier=tier, verbose=False)
+    for weights in weight_grid(components, step):
+        candidate = ServingTier(tier.name, tier.use_llm, tier.use_semantic, tier.use_training,
+                                weights, None, tier.description)
+        recall = evaluator.evaluate_recall_at_k(10, tier=candidate, verbose=False)
+        if recall > best_recall + 1e-9:
+            best_weights, best_recall = weights, recall
+    return {'weights': renormalize(best_weights), 'recall_at_10': best_recall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@10 and latency per serving tier")
+    parser.add_argument('--tiers', nargs='+', choices=TIER_ORDER, help="Tiers to evaluate (default: all servable)")
+    parser.add_argument('--tune', action='store_true', help="Grid-search weights of tiers without semantic/LLM")
+    parser.add_argument('--step', type=float, default=0.05)
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    engine = RecommendationEngine()
+    engine.initialize()
+    evaluator = Evaluator(engine)
+
+    train = engine.preprocessor.prepare_train_data(engine.data_loader.train_data)
+    queries = list(train['Query'].unique())
+
+    tier_names = args.tiers or servable_tiers(engine)
+    results = {}
+    for name in tier_names:
+        tier = TIERS[name]
+        if tier.use_semantic and engine.feature_extractor.semantic_embeddings is None:
+            print(f"Skipping {name}: embedding model not loaded (serving tier {engine.serving_tier.name})")
+            continue
+
+        result = {'weights': engine.tier_weights(tier)}
+        if args.tune and not tier.use_semantic and not tier.use_llm:
+            result.update(tune(evaluator, tier, args.step))
+            tier = ServingTier(name, tier.use_llm, tier.use_semantic, tier.use_training,
+                               result['weights'], None, tier.description)
+        result['recall_at_10'] = evaluator.evaluate_recall_at_k(10, tier=tier, verbose=False)
+        result['p50_ms'] = latency_ms(engine, tier, queries)
+        results[name] = result
+
+        weights = ', '.join(f"{k}={v:.3f}" for k, v in result['weights'].items())
+        print(f"{name:<18} Recall@10 {result['recall_at_10']:.4f}   p50 {result['p50_ms']:7.2f} ms   {weights}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
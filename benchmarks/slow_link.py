@@ -0,0 +1,138 @@
+"""
+Slow-Link Payload Benchmark
+Payload bytes and end-to-end latency of /recommend response variants
+(full / fields / compact x identity / gzip / br) through a local TCP proxy
+that limits bandwidth and adds round-trip delay.
+
+Start the API first, then:
+    python -m benchmarks.slow_link --target 127.0.0.1:8000 --bandwidth-kbps 512 --rtt-ms 80
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import httpx
+
+try:
+    import brotli  # noqa: F401 - httpx needs it to decode br responses
+    ENCODINGS = ('identity', 'gzip', 'br')
+except ImportError:
+    ENCODINGS = ('identity', 'gzip')
+
+QUERY = "Java developer who can collaborate with business teams, under 40 minutes"
+BATCH_QUERIES = (
+    QUERY,
+    "Sales manager with strong communication and personality fit",
+    "Python, SQL and data analysis for an entry level analyst",
+    "Customer service representative, remote, situational judgement",
+)
+VARIANTS = {
+    'full': {},
+    'fields': {'fields': ['assessment_name', 'assessment_url', 'relevance_score']},
+    'compact': {'compact': True},
+}
+
+
+class ThrottledProxy:
+    """
+    TCP proxy that forwards to target while pacing each direction to
+    bandwidth_kbps and delaying every forwarded read by half the RTT
+    """
+
+    CHUNK = 1460
+
+    def __init__(self, target_host: str, target_port: int, bandwidth_kbps: float, rtt_ms: float):
+        self.target_host = target_host
+        self.target_port = target_port
+        self.bytes_per_second = bandwidth_kbps * 1000 / 8
+        self.one_way_delay = rtt_ms / 2000
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+
+    async def _pipe(self, reader, writer):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                await asyncio.sleep(self.one_way_delay)
+                for start in range(0, len(data), self.CHUNK):
+                    chunk = data[start:start + self.CHUNK]
+                    writer.write(chunk)
+                    await writer.drain()
+                    await asyncio.sleep(len(chunk) / self.bytes_per_second)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(self.target_host, self.target_port)
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer),
+        )
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def start(self) -> int:
+        threading.Thread(target=self._loop.run_until_complete, args=(self._serve(),), daemon=True).start()
+        self._ready.wait()
+        return self.port
+
+
+def measure(client: httpx.Client, path: str, payload: dict, encoding: str, repeats: int):
+    """Median latency (ms), bytes on the wire and decoded bytes for one variant"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.post(path, json=payload, headers={'Accept-Encoding': encoding})
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return statistics.median(latencies), response.num_bytes_downloaded, len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /recommend payloads across a throttled link")
+    parser.add_argument('--target', default='127.0.0.1:8000', help="host:port of the running API")
+    parser.add_argument('--bandwidth-kbps', type=float, default=512)
+    parser.add_argument('--rtt-ms', type=float, default=80)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    host, port = args.target.rsplit(':', 1)
+    proxy = ThrottledProxy(host, int(port), args.bandwidth_kbps, args.rtt_ms)
+    proxy_port = proxy.start()
+    print(f"Proxy 127.0.0.1:{proxy_port} -> {args.target} "
+          f"({args.bandwidth_kbps:g} kbit/s, {args.rtt_ms:g} ms RTT)\n")
+
+    cases = []
+    for name, options in VARIANTS.items():
+        cases.append((name, '/recommend', {'query': QUERY, 'top_k': args.top_k, **options}))
+    for name, options in VARIANTS.items():
+        batch = {'requests': [{'query': q, 'top_k': args.top_k} for q in BATCH_QUERIES], **options}
+        cases.append((f"batch-{name}", '/recommend/batch', batch))
+
+    with httpx.Client(base_url=f"http://127.0.0.1:{proxy_port}", timeout=120) as client:
+        # Warm the server caches so the link dominates the measurement
+        for _, path, payload in cases:
+            client.post(path, json=payload)
+
+        print(f"{'variant':<16}{'encoding':<10}{'wire bytes':>12}{'json bytes':>12}{'p50 ms':>10}")
+        for name, path, payload in cases:
+            for encoding in ENCODINGS:
+                latency, wire, decoded = measure(client, path, payload, encoding, args.repeats)
+                print(f"{name:<16}{encoding:<10}{wire:>12}{decoded:>12}{latency:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
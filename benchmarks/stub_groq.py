@@ -0,0 +1,201 @@
+"""
+Stub Groq Server
+Local stand-in for Groq's chat-completions API with configurable latency
+and failure rates, so the backend can be load tested without spending
+quota. Answers with requirements JSON matched from the catalog vocabulary
+(the same stub LLM the benchmark suite uses).
+
+Usage:
+    python -m benchmarks.stub_groq --port 8090 --latency lognormal:300,0.5 --error-rate 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8090 GROQ_API_KEY=stub uvicorn backend.main:app
+
+Latency specs (milliseconds): fixed:300, uniform:100,500, normal:300,50,
+lognormal:MEDIAN,SIGMA, exp:MEAN. GET /stats returns request and failure
+counts.
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.suite import StubLLMClient
+from modules import FeatureExtractor
+
+_QUERY_PATTERN = re.compile(r'Query: "(.*)"\s*\n\s*\{', re.DOTALL)
+
+
+class LatencyModel:
+    """Samples response delays (ms) from a distribution given as 'kind:arg1,arg2'"""
+
+    KINDS = ('fixed', 'uniform', 'normal', 'lognormal', 'exp')
+
+    def __init__(self, spec: str, seed: int = 0):
+        kind, _, args = spec.partition(':')
+        self.kind = kind.strip().lower()
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind!r} (expected one of {', '.join(self.KINDS)})")
+        self.args = [float(a) for a in args.split(',') if a.strip()] if args else [0.0]
+        self.spec = spec
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self) -> float:
+        a = self.args
+        with self._lock:
+            if self.kind == 'fixed':
+                value = a[0]
+            elif self.kind == 'uniform':
+                value = self._rng.uniform(a[0], a[1])
+            elif self.kind == 'normal':
+                value = self._rng.normal(a[0], a[1])
+            elif self.kind == 'lognormal':
+                # median a[0], shape a[1]: heavy right tail like real API latency
+                value = a[0] * np.exp(self._rng.normal(0.0, a[1]))
+            else:
+                value = self._rng.exponential(a[0])
+        return max(0.0, float(value))
+
+
+class StubGroqServer:
+    """
+    Chat-completions handler: waits a sampled delay, then answers with
+    requirements JSON, a 429, a 500 or non-JSON content at the given rates
+    """
+
+    def __init__(self, llm: StubLLMClient, latency: LatencyModel, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, malformed_rate: float = 0.0, retry_after_s: float = 1.0,
+                 seed: int = 0):
+        self.llm = llm
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after_s = retry_after_s
+        self._rng = np.random.default_rng(seed + 1)
+        self.stats = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0, 'malformed': 0, 'in_flight': 0,
+                      'max_in_flight': 0, 'delay_ms_total': 0.0}
+
+    def _outcome(self) -> str:
+        draw = self._rng.random()
+        for outcome, rate in (('rate_limited', self.rate_limit_rate), ('errors', self.error_rate),
+                              ('malformed', self.malformed_rate)):
+            if draw < rate:
+                return outcome
+            draw -= rate
+        return 'ok'
+
+    def _completion(self, model: str, content: str) -> Dict:
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+                'logprobs': None
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        }
+
+    async def chat_completions(self, body: Dict) -> JSONResponse:
+        stats = self.stats
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        try:
+            delay_ms = self.latency.sample_ms()
+            stats['delay_ms_total'] += delay_ms
+            await asyncio.sleep(delay_ms / 1000)
+
+            outcome = self._outcome()
+            stats[outcome] += 1
+            if outcome == 'rate_limited':
+                return JSONResponse(
+                    status_code=429,
+                    content={'error': {'message': 'Rate limit reached (stub)', 'type': 'tokens',
+                                       'code': 'rate_limit_exceeded'}},
+                    headers={'retry-after': str(self.retry_after_s)}
+                )
+            if outcome == 'errors':
+                return JSONResponse(
+                    status_code=500,
+                    content={'error': {'message': 'Internal server error (stub)', 'type': 'internal_server_error'}}
+                )
+            if outcome == 'malformed':
+                return JSONResponse(self._completion(body.get('model', 'stub'), "Sure! Here are the requirements:"))
+
+            prompt = body.get('messages', [{}])[-1].get('content', '')
+            match = _QUERY_PATTERN.search(prompt)
+            requirements = self.llm.requirements(match.group(1) if match else prompt)
+            return JSONResponse(self._completion(body.get('model', 'stub'), json.dumps(requirements)))
+        finally:
+            stats['in_flight'] -= 1
+
+
+def create_app(server: StubGroqServer) -> FastAPI:
+    app = FastAPI(title="Stub Groq API")
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await server.chat_completions(await request.json())
+
+    @app.get("/stats")
+    async def stats():
+        return dict(server.stats, latency=server.latency.spec)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+def load_stub_llm(data_dir: str) -> StubLLMClient:
+    """Stub LLM whose skill vocabulary comes from the catalog in data_dir"""
+    catalog = pd.read_csv(Path(data_dir) / "shl_individual_test_solutions.csv", usecols=['name', 'test_type'])
+    return StubLLMClient(FeatureExtractor.extract_skill_vocabulary(catalog))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Groq chat-completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--data-dir', default='data', help="Catalog used for the skill vocabulary")
+    parser.add_argument('--latency', default='lognormal:300,0.5', help="Response delay distribution (ms)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of 500 responses")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share of 429 responses")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Share of non-JSON completions")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubGroqServer(
+        load_stub_llm(args.data_dir),
+        LatencyModel(args.latency, args.seed),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        retry_after_s=args.retry_after,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(server), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Benchmark Suite
+Per-stage build and query timings, end-to-end recommend and /recommend
+(with a stubbed LLM), summarised as p50/p95/p99, throughput and peak RSS,
+plus comparison of two result files.
+
+Run through the CLI: python -m benchmarks --help
+"""
+import asyncio
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules import DataLoader, DataPreprocessor, FeatureExtractor, LLMClient, RecommendationEngine, TrainingPatternsLearner
+from modules import config
+from modules.catalog import CompactCatalog
+from modules.metrics import stage_timer
+from modules.profiling import StageTrace
+from modules.serving_tiers import TierSelector, get_tier
+
+RESULT_VERSION = 1
+
+# Per-query stages recorded by the engine's stage timers (see modules.metrics)
+QUERY_STAGES = ('llm', 'encode', 'tfidf', 'semantic', 'filter', 'training', 'boosts', 'scoring', 'top_k', 'rank')
+
+SOFT_SKILLS = ('communication', 'collaboration', 'collaborate', 'leadership', 'teamwork', 'stakeholder', 'negotiation')
+
+THROUGHPUT_STAGES = ('query.recommend', 'http.recommend')
+
+_LLM_SECONDS = stage_timer('llm')
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(samples_ms: List[float], wall_seconds: float = None) -> Dict:
+    """p50/p95/p99/mean/min/max in ms, count, throughput (per second) and peak RSS"""
+    values = np.asarray(samples_ms, dtype=np.float64)
+    summary = {
+        'count': int(len(values)),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'mean_ms': float(values.mean()),
+        'min_ms': float(values.min()),
+        'max_ms': float(values.max()),
+    }
+    if wall_seconds is None:
+        wall_seconds = values.sum() / 1000
+    summary['throughput_per_s'] = float(len(values) / wall_seconds) if wall_seconds > 0 else None
+    summary['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    return summary
+
+
+def timed(fn: Callable, repeat: int) -> Tuple[List[float], object]:
+    """Run fn repeat times; (durations in ms, last result)"""
+    durations, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations, result
+
+
+class StubLLMClient(LLMClient):
+    """
+    Deterministic stand-in for the Groq client: skills are catalog
+    vocabulary phrases found in the query, returned after a fixed delay
+    """
+
+    def __init__(self, vocabulary: List[str], latency_ms: float = 0.0):
+        self.model = 'stub'
+        self.client = self.async_client = self
+        self.latency_ms = latency_ms
+        self.vocabulary = sorted({phrase.lower() for phrase in vocabulary if len(phrase) > 2}, key=len, reverse=True)
+
+    def requirements(self, query: str) -> Dict:
+        """Requirements dict as the LLM would return it"""
+        query_lower = query.lower()
+        technical = [phrase for phrase in self.vocabulary if phrase in query_lower][:8]
+        soft = [skill for skill in SOFT_SKILLS if skill in query_lower]
+        return {
+            'technical_skills': technical,
+            'soft_skills': soft,
+            'role_type': 'unknown',
+            'keywords': technical[:5] + soft[:2]
+        }
+
+    def extract_requirements(self, query: str, max_retries: int = 2) -> Dict:
+        with _LLM_SECONDS.time():
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            return self.requirements(query)
+
+    async def extract_requirements_async(self, query: str, max_retries: int = 2) -> Dict:
+        with _LLM_SECONDS.time():
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return self.requirements(query)
+
+
+def load_queries(engine: RecommendationEngine) -> List[str]:
+    """Unique train and test queries"""
+    data = engine.data_loader.load_train_test_data()
+    return list(dict.fromkeys(
+        data['train']['Query'].astype(str).tolist() + data['test']['Query'].astype(str).tolist()
+    ))
+
+
+def bench_build(data_dir: str, tier_name: str, repeat: int) -> Dict[str, Dict]:
+    """One-off index build stages, each on fresh objects"""
+    results = {}
+    samples, data = timed(lambda: DataLoader(data_dir=data_dir).get_all_data(), repeat)
+    results['data_loader'] = summarize(samples)
+
+    preprocessor = DataPreprocessor()
+
+    def preprocess():
+        assessments = preprocessor.clean_scraped_data(data['scraped'])
+        train = preprocessor.prepare_train_data(data['train'])
+        return assessments, preprocessor.merge_train_with_assessments(train, assessments)
+
+    samples, (assessments, train_merged) = timed(preprocess, repeat)
+    results['preprocess'] = summarize(samples)
+
+    def catalog():
+        compact = CompactCatalog.from_dataframe(assessments)
+        compact.build_json_fragments()
+        return compact
+
+    samples, _ = timed(catalog, repeat)
+    results['catalog'] = summarize(samples)
+
+    samples, _ = timed(lambda: FeatureExtractor().build_tfidf_features(assessments), repeat)
+    results['tfidf_fit'] = summarize(samples)
+
+    if get_tier(tier_name).use_semantic:
+        extractor = FeatureExtractor()
+        samples, _ = timed(extractor.load_embedding_model, 1)
+        results['embedding_model_load'] = summarize(samples)
+        samples, _ = timed(lambda: extractor.build_semantic_embeddings(assessments), repeat)
+        results['embedding_build'] = summarize(samples)
+
+    samples, _ = timed(lambda: TrainingPatternsLearner().learn_patterns(train_merged), repeat)
+    results['training_fit'] = summarize(samples)
+    return results
+
+
+def build_engine(data_dir: str, tier_name: str, llm_latency_ms: float) -> RecommendationEngine:
+    """Engine pinned to one serving tier, answering LLM calls with StubLLMClient"""
+    engine = RecommendationEngine(data_dir=data_dir)
+    engine.tier_selector = TierSelector(get_tier(tier_name), llm_budget_ms=0, semantic_budget_ms=0)
+    engine.initialize()
+    engine.llm_client = StubLLMClient(
+        FeatureExtractor.extract_skill_vocabulary(engine.df_assessments),
+        latency_ms=llm_latency_ms
+    )
+    return engine
+
+
+def bench_query_stages(engine: RecommendationEngine, queries: List[str], repeat: int) -> Dict[str, Dict]:
+    """
+    Per-stage timings of engine.recommend, plus the whole call
+
+    Encodes run inline (no micro-batching) and the query cache is cleared
+    each pass so every pass pays for its encodes.
+    """
+    feature_extractor = engine.feature_extractor
+    batching = feature_extractor.encode_scheduler is not None
+    feature_extractor.disable_encode_batching()
+
+    stages = defaultdict(list)
+    totals = []
+    engine.recommend(queries[0], top_k=10)  # warm-up
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        feature_extractor.query_cache.clear()
+        for query in queries:
+            with StageTrace() as trace:
+                engine.recommend(query, top_k=10)
+            totals.append(trace.total * 1000)
+            for stage, _, seconds in trace.spans:
+                stages[stage].append(seconds * 1000)
+    wall = time.perf_counter() - wall_start
+
+    if batching:
+        feature_extractor.enable_encode_batching(
+            max_batch_size=config.ENCODE_MAX_BATCH,
+            max_wait_ms=config.ENCODE_MAX_WAIT_MS
+        )
+
+    results = {stage: summarize(stages[stage]) for stage in QUERY_STAGES if stages.get(stage)}
+    results['recommend'] = summarize(totals, wall)
+    return results
+
+
+async def _bench_http(engine: RecommendationEngine, queries: List[str], requests: int, concurrency: int) -> Dict:
+    import httpx
+    import backend.main as api
+    from modules.executor import ExecutionLayer
+
+    api.recommender = engine
+    api.execution_layer = ExecutionLayer(engine)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=api.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            async def one(i: int):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post('/recommend', json={'query': queries[i % len(queries)], 'top_k': 10})
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+
+            await one(0)  # warm-up
+            latencies.clear()
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests)))
+            wall = time.perf_counter() - wall_start
+    finally:
+        api.execution_layer.shutdown(wait=True)
+    summary = summarize(latencies, wall)
+    summary['concurrency'] = concurrency
+    return summary
+
+
+def bench_http(engine: RecommendationEngine, queries: List[str], requests: int, concurrency: int) -> Dict:
+    """POST /recommend in-process through the ASGI app (admission, rendering, middleware)"""
+    return asyncio.run(_bench_http(engine, queries, requests, concurrency))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, cwd=Path(__file__).parent.parent
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(
+    data_dir: str = 'data',
+    tier: str = 'full',
+    repeat: int = 5,
+    build_repeat: int = 3,
+    llm_latency_ms: float = 0.0,
+    http_requests: int = 200,
+    concurrency: int = 8,
+    sections: Tuple[str, ...] = ('build', 'query', 'http')
+) -> Dict:
+    """Run the selected sections and return a JSON-serialisable result"""
+    result = {
+        'version': RESULT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'git_commit': git_commit(),
+        },
+        'settings': {
+            'tier': tier, 'repeat': repeat, 'build_repeat': build_repeat,
+            'llm_latency_ms': llm_latency_ms, 'http_requests': http_requests, 'concurrency': concurrency
+        },
+        'stages': {}
+    }
+
+    if 'build' in sections:
+        for name, summary in bench_build(data_dir, tier, build_repeat).items():
+            result['stages'][f'build.{name}'] = summary
+
+    if 'query' in sections or 'http' in sections:
+        engine = build_engine(data_dir, tier, llm_latency_ms)
+        queries = load_queries(engine)
+        result['settings']['queries'] = len(queries)
+        result['environment']['index_version'] = engine.index_version
+        if 'query' in sections:
+            for name, summary in bench_query_stages(engine, queries, repeat).items():
+                result['stages'][f'query.{name}'] = summary
+        if 'http' in sections:
+            result['stages']['http.recommend'] = bench_http(engine, queries, http_requests, concurrency)
+
+    result['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    return result
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10, min_delta_ms: float = 0.05) -> List[Dict]:
+    """
+    Stage-by-stage comparison; a stage regresses when its p50 or p95 grew,
+    or its throughput fell, by more than threshold (relative) and the
+    latency change exceeds min_delta_ms (timer noise on sub-ms stages)
+
+    Returns:
+        [{'stage', 'metrics': {name: (baseline, current)}, 'regressions': [...]}, ...]
+        for every stage in both results, then peak RSS
+    """
+    rows = []
+    for stage, old in baseline.get('stages', {}).items():
+        new = current.get('stages', {}).get(stage)
+        if new is None:
+            continue
+        row = {'stage': stage, 'metrics': {}, 'regressions': []}
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            row['metrics'][key] = (old[key], new[key])
+            change = (new[key] - old[key]) / old[key] if old[key] else 0.0
+            if key != 'p99_ms' and change > threshold and new[key] - old[key] > min_delta_ms:
+                row['regressions'].append(f"{key} +{change:.0%}")
+        old_tp, new_tp = old.get('throughput_per_s'), new.get('throughput_per_s')
+        row['metrics']['throughput_per_s'] = (old_tp, new_tp)
+        # Throughput only means something for whole requests
+        if stage in THROUGHPUT_STAGES and old_tp and new_tp and (old_tp - new_tp) / old_tp > threshold:
+            row['regressions'].append(f"throughput -{(old_tp - new_tp) / old_tp:.0%}")
+        rows.append(row)
+
+    old_rss, new_rss = baseline.get('peak_rss_mb'), current.get('peak_rss_mb')
+    if old_rss and new_rss:
+        change = (new_rss - old_rss) / old_rss
+        rows.append({
+            'stage': 'process',
+            'metrics': {'peak_rss_mb': (old_rss, new_rss)},
+            'regressions': [f"peak_rss_mb +{change:.0%}"] if change > threshold else []
+        })
+    return rows
@@ -0,0 +1,344 @@
+"""
+Synthetic Catalog Generator
+Realistic assessment catalogs of any size (10k to 1M+ rows) in the same
+schema as data/, with matching train/test query sets, so DataLoader and
+RecommendationEngine load them unchanged.
+
+Each assessment belongs to a skill family (software, data, business,
+cognitive, behavioral, language) and is built around one primary skill;
+names, descriptions, test types and durations follow that family. Train
+queries ask for 2-3 skills of one family plus a soft skill, and are
+labelled with 5-10 assessments covering those skills (about a third are
+long job descriptions, as in the real train set). Generation is seeded
+and deterministic.
+
+Usage:
+    python -m benchmarks.synthetic_data --assessments 50k --output data/synthetic-50k
+    python -m benchmarks run --data-dir data/synthetic-50k
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+CATALOG_FILE = "shl_individual_test_solutions.csv"
+TRAIN_TEST_FILE = "Gen_AI Dataset (1).xlsx"
+URL_PREFIX = "https://www.shl.com/products/product-catalog/view/"
+
+# family: (skills, topics, test types, roles, duration range in minutes)
+FAMILIES = {
+    'software': (
+        ['Java', 'Core Java', 'Python', 'SQL', 'JavaScript', 'TypeScript', 'C#', '.NET', 'C++', 'Go',
+         'Kotlin', 'React', 'Angular', 'Node.js', 'Spring', 'Django', 'Docker', 'Kubernetes', 'AWS',
+         'Azure', 'Linux', 'Git', 'Selenium', 'REST APIs', 'Microservices', 'HTML/CSS', 'Scala', 'Rust',
+         'PHP', 'Ruby', 'Swift', 'Android', 'Manual Testing', 'Automata'],
+        ['OOP concepts', 'data structures', 'exception handling', 'concurrency', 'unit testing',
+         'security', 'performance', 'deployment', 'debugging', 'design patterns', 'APIs',
+         'data modeling', 'file handling', 'collections', 'memory management', 'build tools'],
+        ['Knowledge & Skills', 'Simulations', 'Ability & Aptitude'],
+        ['developer', 'software engineer', 'QA engineer', 'DevOps engineer', 'full stack developer'],
+        (10, 60)
+    ),
+    'data': (
+        ['Excel', 'Tableau', 'Power BI', 'Statistics', 'Machine Learning', 'Data Science', 'R',
+         'SAS', 'Data Warehousing', 'ETL', 'Apache Spark', 'Hadoop', 'NLP', 'Deep Learning',
+         'Data Visualization', 'MongoDB', 'Oracle Database'],
+        ['regression', 'hypothesis testing', 'pivot tables', 'dashboards', 'data cleaning',
+         'feature engineering', 'model evaluation', 'query optimization', 'reporting', 'sampling'],
+        ['Knowledge & Skills', 'Ability & Aptitude', 'Simulations'],
+        ['data analyst', 'data scientist', 'business analyst', 'ML engineer'],
+        (10, 45)
+    ),
+    'business': (
+        ['Accounting', 'Financial Analysis', 'Banking', 'Marketing', 'Digital Marketing',
+         'Project Management', 'Supply Chain', 'Human Resources', 'Sales', 'Negotiation',
+         'Customer Service', 'Retail', 'Bookkeeping', 'Insurance', 'Front Office Management'],
+        ['budgeting', 'forecasting', 'compliance', 'customer handling', 'stakeholder management',
+         'planning', 'inventory', 'pricing', 'campaigns', 'recruitment'],
+        ['Knowledge & Skills', 'Competencies', 'Biodata & Situational Judgement', 'Simulations'],
+        ['sales executive', 'account manager', 'HR manager', 'project manager', 'bank clerk',
+         'customer support executive', 'marketing manager'],
+        (10, 40)
+    ),
+    'cognitive': (
+        ['Numerical Reasoning', 'Verbal Reasoning', 'Inductive Reasoning', 'Deductive Reasoning',
+         'Mechanical Comprehension', 'Checking', 'Calculation', 'Reading Comprehension',
+         'General Ability', 'Spatial Reasoning'],
+        ['speed', 'accuracy', 'pattern recognition', 'logical reasoning', 'problem solving',
+         'attention to detail', 'critical thinking'],
+        ['Ability & Aptitude'],
+        ['graduate', 'analyst', 'administrator', 'technician', 'manager'],
+        (8, 36)
+    ),
+    'behavioral': (
+        ['Personality', 'Motivation', 'Leadership', 'Teamwork', 'Communication', 'Collaboration',
+         'Resilience', 'Situational Judgement', 'Integrity', 'Emotional Intelligence', 'Adaptability',
+         'Culture Fit', 'Interpersonal Skills'],
+        ['work style', 'behaviour at work', 'decision making', 'conflict handling', 'influence',
+         'team orientation', 'career development', 'coaching'],
+        ['Personality & Behavior', 'Biodata & Situational Judgement', 'Competencies', 'Development & 360'],
+        ['manager', 'team lead', 'executive', 'graduate', 'sales representative'],
+        (15, 60)
+    ),
+    'language': (
+        ['English Comprehension', 'Business Writing', 'Spoken English', 'Written English',
+         'Grammar', 'Email Writing', 'Typing'],
+        ['vocabulary', 'sentence completion', 'pronunciation', 'listening', 'fluency', 'tone'],
+        ['Knowledge & Skills', 'Simulations'],
+        ['customer support executive', 'content writer', 'administrative assistant', 'call center agent'],
+        (5, 30)
+    ),
+}
+FAMILY_NAMES = list(FAMILIES)
+# Share of the catalog per family (the real catalog is mostly knowledge tests)
+FAMILY_WEIGHTS = np.array([0.40, 0.14, 0.18, 0.08, 0.14, 0.06])
+
+SOFT_PHRASES = ['collaborate effectively with business teams', 'communicate clearly with clients',
+                'lead a small team', 'work under pressure', 'adapt to change quickly',
+                'show strong interpersonal skills']
+LEVELS = ['Entry Level', 'Intermediate', 'Advanced', 'Expert']
+NAME_TEMPLATES = {
+    'software': ['{skill} (New)', '{skill} ({level})', '{skill} {level} (New)', '{skill} Coding Simulation'],
+    'data': ['{skill} (New)', '{skill} ({level})', '{skill} Essentials'],
+    'business': ['{skill} (New)', '{skill} ({level})', 'Entry Level {role_title} Solution', '{skill} Knowledge Test'],
+    'cognitive': ['Verify - {skill}', 'Verify - {skill} ({year})', '{skill} Test'],
+    'behavioral': ['OPQ {skill} Report', '{role_title} {skill} Solution', '{skill} Questionnaire'],
+    'language': ['SVAR - {skill}', '{skill} (New)', '{skill} Test'],
+}
+DESCRIPTION_TEMPLATES = [
+    "Multi-choice test that measures the knowledge of {skill}, including {topics}.",
+    "The {name} test measures knowledge of {skill}. Designed for {audience}, this test covers the "
+    "following topics: {topics}.",
+    "Assesses {skill} for {role} roles through {format}. Candidates are scored on {topics}.",
+    "This {format} evaluates how candidates apply {skill} at work, with a focus on {topics}.",
+]
+FORMATS = ['a timed simulation', 'scenario-based questions', 'an adaptive test', 'a short questionnaire',
+           'a case study', 'interactive exercises']
+AUDIENCES = ['entry-level candidates', 'experienced professionals', 'graduates', 'managers', 'all employees']
+COMPLIANCE = ("Your use of this assessment product may be subject to New York City Law 144 (Regulation of "
+              "the Use of Automated Employment Decision Tools) (dated July 5, 2023). Compliance with Law 144 "
+              "is your responsibility.")
+JD_FILLER = ("About Us\n\n We unlock the possibilities of businesses through the power of people, science and "
+             "technology. We offer a fun and flexible workplace, coaching and on-the-job development, and an "
+             "employee benefits package that takes care of you and your family.\n\n")
+
+
+def parse_count(value: str) -> int:
+    """'650', '50k', '1M' -> int"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*', value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"not a count: {value!r}")
+    number, suffix = float(match.group(1)), match.group(2).lower()
+    return int(number * {'': 1, 'k': 1_000, 'm': 1_000_000}[suffix])
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def _join(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else ', '.join(items[:-1]) + ' and ' + items[-1]
+
+
+def generate_catalog(n_assessments: int, rng: np.random.Generator) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Build the assessment catalog
+
+    Returns:
+        (catalog DataFrame, family index per row, primary skill index per row)
+    """
+    families = rng.choice(len(FAMILY_NAMES), size=n_assessments, p=FAMILY_WEIGHTS)
+    skill_draws = rng.random(n_assessments)
+    variant_draws = rng.integers(0, 1 << 30, size=n_assessments)
+    extra_types = rng.random(n_assessments)
+    adaptive = np.where(rng.random(n_assessments) < 0.1, 'Yes', 'No')
+    remote = np.where(rng.random(n_assessments) < 0.95, 'Yes', 'No')
+    compliance = rng.random(n_assessments) < 0.25
+
+    names, urls, descriptions, durations, test_types = [], [], [], [], []
+    skills = np.empty(n_assessments, dtype=np.int64)
+    for i in range(n_assessments):
+        family = FAMILY_NAMES[families[i]]
+        family_skills, topics, types, roles, (low, high) = FAMILIES[family]
+        skill_index = int(skill_draws[i] * len(family_skills))
+        skills[i] = skill_index
+        skill = family_skills[skill_index]
+        variant = int(variant_draws[i])
+        role = roles[variant % len(roles)]
+
+        name = NAME_TEMPLATES[family][variant % len(NAME_TEMPLATES[family])].format(
+            skill=skill, level=LEVELS[(variant >> 3) % len(LEVELS)], year=2014 + (variant >> 5) % 10,
+            role_title=role.title()
+        )
+        start = (variant >> 7) % len(topics)
+        picked = [topics[(start + step) % len(topics)] for step in range(2 + (variant >> 11) % 3)]
+        description = DESCRIPTION_TEMPLATES[(variant >> 13) % len(DESCRIPTION_TEMPLATES)].format(
+            name=name, skill=skill, topics=_join(picked), role=role,
+            audience=AUDIENCES[(variant >> 15) % len(AUDIENCES)], format=FORMATS[(variant >> 17) % len(FORMATS)]
+        )
+        if compliance[i]:
+            description += COMPLIANCE
+
+        kinds = [types[0]]
+        if len(types) > 1 and extra_types[i] < 0.45:
+            kinds.append(types[1 + (variant >> 19) % (len(types) - 1)])
+
+        names.append(name)
+        urls.append(f"{URL_PREFIX}{_slug(name)}-{i}/")
+        descriptions.append(description)
+        durations.append(low + (variant >> 21) % (high - low + 1))
+        test_types.append('|'.join(kinds))
+
+    catalog = pd.DataFrame({
+        'name': names,
+        'url': urls,
+        'description': descriptions,
+        'duration': durations,
+        'adaptive_support': adaptive,
+        'remote_support': remote,
+        'test_type': test_types,
+    })
+    return catalog, families, skills
+
+
+def _group_rows(families: np.ndarray, skills: np.ndarray) -> Dict[Tuple[int, int], np.ndarray]:
+    """(family, skill) -> catalog row indices"""
+    key = families.astype(np.int64) * 1000 + skills
+    order = np.argsort(key, kind='stable')
+    unique, starts = np.unique(key[order], return_index=True)
+    bounds = list(starts) + [len(order)]
+    return {
+        (int(k) // 1000, int(k) % 1000): order[bounds[j]:bounds[j + 1]]
+        for j, k in enumerate(unique)
+    }
+
+
+def _query_text(family: str, skill_names: List[str], soft: str, duration: int, long_form: bool,
+                rng: np.random.Generator) -> str:
+    role = FAMILIES[family][3][int(rng.integers(len(FAMILIES[family][3])))]
+    if not long_form:
+        template = [
+            "I am hiring for {role}s skilled in {skills} who can also {soft}. Looking for an assessment(s) "
+            "that can be completed in {duration} minutes.",
+            "Need an assessment package for {level} {role}s covering {skills}. Max duration of {duration} minutes.",
+            "Which tests can screen {role} candidates for {skills}? They should {soft}, time limit {duration} minutes.",
+        ][int(rng.integers(3))]
+        return template.format(role=role, skills=_join(skill_names), soft=soft, duration=duration,
+                               level=LEVELS[int(rng.integers(len(LEVELS)))].lower())
+    return (
+        f"Job Description\n\n We are looking for a {role} to join our growing team.\n\n"
+        f"What You Will Be Doing\n\n Work daily with {_join(skill_names)}. \n You will {soft}. \n\n"
+        f"Essential\n\n Proficiency in {_join(skill_names)}. \n\n{JD_FILLER}"
+        f"Can you recommend some assessments that can help me screen applications. "
+        f"Time limit is less than {duration} minutes"
+    )
+
+
+def generate_queries(catalog: pd.DataFrame, families: np.ndarray, skills: np.ndarray, n_queries: int,
+                     rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Queries labelled with 5-10 catalog assessments each, one row per
+    (query, assessment) pair as in the Train-Set sheet
+    """
+    groups = _group_rows(families, skills)
+    behavioral = FAMILY_NAMES.index('behavioral')
+    behavioral_rows = np.concatenate([rows for (f, _), rows in groups.items() if f == behavioral])
+    present = sorted({f for f, _ in groups if f != behavioral})
+
+    rows, seen = [], set()
+    while len(seen) < n_queries:
+        family_index = present[int(rng.integers(len(present)))]
+        family = FAMILY_NAMES[family_index]
+        available = sorted(s for f, s in groups if f == family_index)
+        picked = rng.choice(available, size=min(len(available), int(rng.integers(2, 4))), replace=False)
+        skill_names = [FAMILIES[family][0][s] for s in picked]
+        soft = SOFT_PHRASES[int(rng.integers(len(SOFT_PHRASES)))]
+        query = _query_text(family, skill_names, soft, int(rng.choice([30, 40, 45, 60, 90])),
+                            rng.random() < 0.3, rng)
+        if query in seen:
+            continue
+        seen.add(query)
+
+        n_labels = int(rng.integers(5, 11))
+        per_skill = max(1, (n_labels - 1) // len(picked))
+        labels = []
+        for s in picked:
+            candidates = groups[(family_index, int(s))]
+            labels.extend(rng.choice(candidates, size=min(per_skill, len(candidates)), replace=False))
+        labels.append(behavioral_rows[int(rng.integers(len(behavioral_rows)))])
+        for row in dict.fromkeys(int(r) for r in labels):
+            rows.append((query, row))
+
+    queries = pd.DataFrame(rows, columns=['Query', 'row'])
+    details = catalog.iloc[queries['row'].to_numpy()].reset_index(drop=True)
+    # Labels use the /solutions/ URL form for about half the rows, as the real sheet does
+    solution_form = rng.random(len(details)) < 0.5
+    urls = details['url'].where(~solution_form, details['url'].str.replace('/products/', '/solutions/products/', n=1))
+    return pd.DataFrame({
+        'Query': queries['Query'],
+        'Assessment_url': urls,
+        'description': details['description'],
+        'duration': details['duration'],
+        'adaptive_support': details['adaptive_support'],
+        'remote_support': details['remote_support'],
+        'test_type': details['test_type'],
+    })
+
+
+def generate(n_assessments: int, n_train_queries: int = 100, n_test_queries: int = 20,
+             seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Generate a dataset in DataLoader's shape
+
+    Returns:
+        {'scraped': catalog, 'train': labelled queries, 'test': queries only}
+    """
+    rng = np.random.default_rng(seed)
+    catalog, families, skills = generate_catalog(n_assessments, rng)
+    labelled = generate_queries(catalog, families, skills, n_train_queries + n_test_queries, rng)
+    query_order = list(dict.fromkeys(labelled['Query']))
+    test_queries = set(query_order[n_train_queries:])
+    return {
+        'scraped': catalog,
+        'train': labelled[~labelled['Query'].isin(test_queries)].reset_index(drop=True),
+        'test': pd.DataFrame({'Query': query_order[n_train_queries:]}),
+    }
+
+
+def write_dataset(data: Dict[str, pd.DataFrame], output_dir: str) -> Path:
+    """Write the catalog CSV and the Train-Set/Test-Set workbook DataLoader reads"""
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    data['scraped'].to_csv(out / CATALOG_FILE, index=False)
+    with pd.ExcelWriter(out / TRAIN_TEST_FILE) as writer:
+        data['train'].to_excel(writer, sheet_name='Train-Set', index=False)
+        data['test'].to_excel(writer, sheet_name='Test-Set', index=False)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic assessment catalog and query set")
+    parser.add_argument('--assessments', type=parse_count, default=parse_count('10k'),
+                        help="Catalog size, e.g. 10k, 500k, 1M")
+    parser.add_argument('--train-queries', type=parse_count, default=100)
+    parser.add_argument('--test-queries', type=parse_count, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help="Directory to pass as data_dir")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    data = generate(args.assessments, args.train_queries, args.test_queries, args.seed)
+    out = write_dataset(data, args.output)
+    print(f"✅ {len(data['scraped'])} assessments, {data['train']['Query'].nunique()} train queries "
+          f"({len(data['train'])} labels), {len(data['test'])} test queries -> {out} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
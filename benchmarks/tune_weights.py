@@ -0,0 +1,77 @@
+"""
+Weight Tuning
+Searches a serving tier's hybrid weights on the labelled train queries
+using cached per-component score matrices (see modules.weight_tuner),
+then re-checks the winner through the engine's own ranking path.
+
+Usage:
+    python -m benchmarks.tune_weights --tier lexical-training --method grid --step 0.05
+    python -m benchmarks.tune_weights --tier full --method coordinate --export weights.json
+    SHL_WEIGHTS_FILE=weights.json uvicorn backend.main:app
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules import Evaluator, RecommendationEngine
+from modules.evaluator import DEFAULT_KS, DEFAULT_LLM_CACHE, LLM_MODES, format_metrics
+from modules.serving_tiers import TIER_ORDER, ServingTier, get_tier
+from modules.weight_tuner import ComponentMatrices, WeightTuner, export_weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune hybrid scoring weights on the labelled train queries")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--tier', choices=TIER_ORDER, help="Serving tier (default: the engine's)")
+    parser.add_argument('--method', choices=('grid', 'random', 'coordinate'), default='coordinate')
+    parser.add_argument('--step', type=float, default=0.05, help="Grid / coordinate step")
+    parser.add_argument('--samples', type=int, default=5000, help="Random search samples")
+    parser.add_argument('--rounds', type=int, default=20, help="Coordinate ascent rounds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--objective', default='recall@10', help="Metric to maximize, e.g. recall@10, ndcg@5")
+    parser.add_argument('--llm', choices=LLM_MODES, default='cached', help="LLM requirements source")
+    parser.add_argument('--llm-cache', default=DEFAULT_LLM_CACHE, help="Extraction cache file")
+    parser.add_argument('--cache-dir', default='.eval_cache', help="Component matrix cache ('' = off)")
+    parser.add_argument('--export', help="Merge the tuned weights into this weights file")
+    parser.add_argument('--output', help="Write the search result as JSON")
+    args = parser.parse_args()
+
+    engine = RecommendationEngine(data_dir=args.data_dir)
+    engine.initialize()
+    evaluator = Evaluator(engine, llm_cache_path=args.llm_cache)
+    tier = get_tier(args.tier) if args.tier else engine.serving_tier
+
+    matrices = ComponentMatrices.build(evaluator, tier, llm=args.llm, cache_dir=args.cache_dir or None)
+    tuner = WeightTuner(matrices, objective=args.objective)
+    result = tuner.search(engine.tier_weights(tier), method=args.method, step=args.step, samples=args.samples,
+                          rounds=args.rounds, seed=args.seed, required=('tfidf',))
+
+    print(f"\n{len(matrices.queries)} queries, tier {tier.name}, components {', '.join(matrices.components)}")
+    print(f"{args.method}: {result['evaluated']} settings in {result['seconds']:.2f}s "
+          f"({result['settings_per_s'] or 0:,.0f}/s)")
+    for label, weights, metrics in (('Current', result['baseline_weights'], result['baseline_metrics']),
+                                    ('Tuned', result['weights'], result['metrics'])):
+        print(f"\n{label}: " + ', '.join(f"{name} {value:.3f}" for name, value in weights.items()))
+        print('\n'.join(format_metrics(metrics, DEFAULT_KS)))
+
+    # The matrices reproduce the engine's sums exactly; confirm on the real path
+    tuned_tier = ServingTier(tier.name, tier.use_llm, tier.use_semantic, tier.use_training,
+                             result['weights'], None, tier.description)
+    engine.tuned_weights.pop(tier.name, None)
+    check = evaluator.evaluate(ks=DEFAULT_KS, tier=tuned_tier, llm=args.llm, verbose=False)
+    result['engine_metrics'] = check['metrics']
+    print(f"\nEngine check: {args.objective} {check['metrics'][args.objective]:.4f}")
+
+    if args.export:
+        export_weights(args.export, tier.name, result)
+        print(f"Exported {tier.name} weights to {args.export} (load with SHL_WEIGHTS_FILE)")
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,18 @@
 Pre-download required models during deployment
 This script downloads all required models before the application starts
 """
+import argparse
 import os
 from sentence_transformers import SentenceTransformer
 
-def download_models():
-    """Download all required models during build/deployment"""
+def download_models(export_onnx: bool = False, quantize: bool = False):
+    """
+    Download all required models during build/deployment
+    
+    Args:
+        export_onnx: Also export the model to ONNX for SHL_ENCODER_BACKEND=onnx
+        quantize: Also write an int8-quantized ONNX graph (SHL_ENCODER_BACKEND=onnx-int8)
+    """
     
     print("=" * 80)
     print("DOWNLOADING REQUIRED MODELS FOR DEPLOYMENT")
@@ -39,6 +46,25 @@ def download_models():
         test_embedding = model.encode(["Test sentence"])
         print(f"✅ Model test successful! Embedding shape: {test_embedding.shape}")
         
+        if export_onnx:
+            import numpy as np
+            from modules.onnx_encoder import OnnxSentenceEncoder, default_onnx_dir, export_onnx_model
+            
+            onnx_dir = default_onnx_dir(model_name)
+            print(f"\n📦 Exporting ONNX graph{' (+ int8)' if quantize else ''} to {onnx_dir}")
+            export_onnx_model(model, onnx_dir, quantize=quantize)
+            
+            # Parity check against the torch path
+            variants = [False, True] if quantize else [False]
+            for quantized in variants:
+                encoder = OnnxSentenceEncoder(onnx_dir, quantized=quantized)
+                onnx_embedding = encoder.encode(["Test sentence"])
+                cosine = float(np.dot(onnx_embedding[0], test_embedding[0]) / (
+                    np.linalg.norm(onnx_embedding[0]) * np.linalg.norm(test_embedding[0])
+                ))
+                label = 'int8' if quantized else 'fp32'
+                print(f"✅ ONNX {label} parity: cosine vs torch = {cosine:.5f}")
+        
         print("\n" + "=" * 80)
         print("✅ ALL MODELS DOWNLOADED SUCCESSFULLY")
         print("=" * 80)
@@ -51,5 +77,10 @@ def download_models():
         return False
 
 if __name__ == "__main__":
-    success = download_models()
+    parser = argparse.ArgumentParser(description="Pre-download (and optionally export) models")
+    parser.add_argument('--onnx', action='store_true', help="Export the encoder to ONNX")
+    parser.add_argument('--int8', action='store_true', help="Also write an int8-quantized ONNX graph")
+    args = parser.parse_args()
+    
+    success = download_models(export_onnx=args.onnx or args.int8, quantize=args.int8)
     exit(0 if success else 1)
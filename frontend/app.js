@@ -29,16 +29,13 @@ async function getRecommendations() {
     document.getElementById('submitBtn').disabled = true;
 
     try {
-        const response = await fetch(`${API_BASE_URL}/recommend`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                query: query,
-                top_k: topK
-            })
+        // GET with canonical parameters so the browser / CDN cache can reuse
+        // results (and no CORS preflight is needed)
+        const params = new URLSearchParams({
+            query: query.split(/\s+/).join(' '),
+            top_k: topK
         });
+        const response = await fetch(`${API_BASE_URL}/recommend?${params}`);
 
         if (!response.ok) {
             throw new Error(`API request failed: ${response.statusText}`);
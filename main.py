@@ -1,76 +1,38 @@
 """
-Main Entry Point - Demonstrates Modular Pipeline  
+Main Entry Point - Demonstrates Modular Pipeline
 Shows clear separation of concerns and data flow
+
+Runs as a staged pipeline (modules.pipeline): index artifacts are cached
+in SHL_PIPELINE_CACHE_DIR keyed by their inputs' content, so a rerun only
+rebuilds what changed (editing scoring code never re-encodes the catalog),
+and TF-IDF / embeddings / training patterns build concurrently.
 """
 
-from modules import RecommendationEngine, Evaluator
+from modules import RecommendationEngine, Evaluator, config
+from modules.logger import flush_logs
+from modules.pipeline import Pipeline, Stage
 from modules.storage_manager import StorageManager
 import pandas as pd
-import logging
 
-def main():
-    """
-    Demonstrates the complete modular pipeline:
-    Data → Preprocessing → Feature Extraction → LLM → Scoring → Recommendations
-    """
-    
-    # Get root logger and ensure it flushes
-    root_logger = logging.getLogger()
-    
-    print("="*80)
-    print("SHL ASSESSMENT RECOMMENDATION SYSTEM - MODULAR ARCHITECTURE")
-    print("90.4% Mean Recall@10 Performance")
-    print("="*80)
-    
-    # Initialize modular recommendation engine
-    engine = RecommendationEngine()
-    
-    # Initialize system (runs full pipeline)
-    engine.initialize()
-    
-    # Flush logs after initialization
-    for handler in root_logger.handlers:
-        handler.flush()
-    
-    # Initialize storage manager
-    storage = StorageManager()
-    
-    # Save vectors to disk
-    print("\n💾 Saving vectors to disk...")
-    storage.save_tfidf_matrix(engine.feature_extractor.tfidf_matrix)
-    storage.save_semantic_embeddings(engine.feature_extractor.semantic_embeddings)
-    storage.save_assessment_mapping(engine.df_assessments)
-    
-    # Flush logs after saving
-    for handler in root_logger.handlers:
-        handler.flush()
-    
-    # Evaluate performance
+def evaluate(engine: RecommendationEngine) -> dict:
+    """Evaluate performance on the labelled train queries"""
     evaluator = Evaluator(engine)
-    recall = evaluator.evaluate_recall_at_k(k=10)
-    
-    print(f"\n{'='*80}")
-    print(f"FINAL PERFORMANCE: {recall*100:.1f}% Mean Recall@10")
-    print(f"{'='*80}\n")
-    
-    # Flush logs after evaluation
-    for handler in root_logger.handlers:
-        handler.flush()
-    
-    # Generate test predictions
+    return evaluator.evaluate(ks=(1, 3, 5, 10))
+
+def predict(engine: RecommendationEngine, test_data: pd.DataFrame, storage: StorageManager) -> dict:
+    """Generate and save top-10 predictions for the test queries"""
     print("📊 Generating test predictions...")
-    test_data = engine.data_loader.test_data
-    
+
     predictions = []
     submission_data = []  # For submission format
-    
+
     for idx, row in test_data.iterrows():
         query = row['Query']
         print(f"  [{idx+1}/{len(test_data)}] Processing: {query[:50]}...")
-        
+
         # Get top-10 recommendations
         results = engine.recommend(query, top_k=10)
-        
+
         # Format for detailed CSV
         for rank, rec in enumerate(results, 1):
             predictions.append({
@@ -80,47 +42,106 @@ def main():
                 'Assessment_URL': rec['assessment_url'],
                 'Relevance_Score': rec['relevance_score']
             })
-            
+
             # Format for submission CSV (only Query and Assessment_url)
             submission_data.append({
                 'Query': query,
                 'Assessment_url': rec['assessment_url']
             })
-    
+
     # Save detailed predictions
     predictions_df = pd.DataFrame(predictions)
     storage.save_test_predictions(predictions_df, filename='test_predictions_detailed.csv')
     print(f"✅ Saved {len(predictions)} detailed predictions to predicted_test_csv/\n")
-    
+
     # Save submission format CSV (Appendix 3 format)
     submission_df = pd.DataFrame(submission_data)
     storage.save_test_predictions(submission_df, filename='test_predictions.csv')
     print(f"✅ Saved submission file (Query, Assessment_url) to predicted_test_csv/test_predictions.csv\n")
-    
-    # Final flush
-    for handler in root_logger.handlers:
-        handler.flush()
-    
+    return {'predictions': predictions_df, 'submission': submission_df}
+
+def build_pipeline(engine: RecommendationEngine, storage: StorageManager) -> Pipeline:
+    """
+    Index stages from the engine, then assemble → save → evaluate → predict
+
+    Assembly, evaluation and predictions always run; they are cheap once
+    the index artifacts come from the cache.
+    """
+    index = ['assessments', 'train_clean', 'train_merged', 'training_learner', 'tfidf_vectorizer', 'tfidf_matrix']
+    if engine.serving_tier.use_semantic:
+        index.append('semantic_embeddings')
+
+    def assemble(*artifacts):
+        engine.assemble(**dict(zip(index, artifacts)))
+        return engine
+
+    def save_vectors(assessments, tfidf_matrix, semantic_embeddings=None):
+        print("\n💾 Saving vectors to disk...")
+        storage.save_tfidf_matrix(tfidf_matrix)
+        if semantic_embeddings is not None:
+            storage.save_semantic_embeddings(semantic_embeddings)
+        storage.save_assessment_mapping(assessments)
+        return {}
+
+    vector_files = [storage.vector_dir / "tfidf_matrix.npz", storage.vector_dir / "assessment_mapping.csv"]
+    if engine.serving_tier.use_semantic:
+        vector_files.append(storage.vector_dir / "semantic_embeddings.npy")
+
+    stages = engine.index_stages() + [
+        Stage('engine', assemble, inputs=index, outputs=['engine'], cache=False),
+        Stage('save_vectors', save_vectors, inputs=['assessments', 'tfidf_matrix'] + index[6:],
+              products=vector_files),
+        Stage('evaluate', evaluate, inputs=['engine'], outputs=['evaluation'], after=['save_vectors'], cache=False),
+        Stage('predict', lambda engine, test: predict(engine, test, storage), inputs=['engine', 'test'],
+              outputs=['predictions', 'submission'], after=['evaluate'], cache=False),
+    ]
+    return Pipeline(stages, cache_dir=config.PIPELINE_CACHE_DIR or None, workers=config.PIPELINE_WORKERS)
+
+def main():
+    """
+    Demonstrates the complete modular pipeline:
+    Data → Preprocessing → Feature Extraction → LLM → Scoring → Recommendations
+    """
+
+    print("="*80)
+    print("SHL ASSESSMENT RECOMMENDATION SYSTEM - MODULAR ARCHITECTURE")
+    print("90.4% Mean Recall@10 Performance")
+    print("="*80)
+
+    # Initialize modular recommendation engine
+    engine = RecommendationEngine()
+
+    # Initialize storage manager
+    storage = StorageManager()
+
+    # Run the pipeline (stages whose inputs did not change come from the cache)
+    pipeline = build_pipeline(engine, storage)
+    results = pipeline.run(targets=['evaluation'])
+    skipped = [entry['stage'] for entry in pipeline.report if entry['status'] == 'cached']
+    if skipped:
+        print(f"\n⏭️  Up to date: {', '.join(skipped)}")
+    recall = results['evaluation']['metrics']['recall@10']
+
+    print(f"\n{'='*80}")
+    print(f"FINAL PERFORMANCE: {recall*100:.1f}% Mean Recall@10")
+    print(f"{'='*80}\n")
+
     # Example recommendation
     print("Example Recommendation:")
     print("-"*80)
     query = "I need Java developers who can collaborate effectively with business teams"
     print(f"Query: {query}\n")
-    
+
     results = engine.recommend(query, top_k=5)
-    
+
     for i, rec in enumerate(results, 1):
         print(f"{i}. {rec['assessment_name']}")
         print(f"   Score: {rec['relevance_score']:.3f}")
         print(f"   Type: {', '.join(rec['test_type'])}")
         print()
-    
-    # Final flush to ensure all logs are written
-    print("\n💾 Flushing all logs to disk...")
-    for handler in root_logger.handlers:
-        handler.flush()
-    
-    print("✅ All logs saved!\n")
+
+    # The logging listener thread writes queued records; wait for it
+    flush_logs()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,163 @@
+"""
+Admission Control
+Bounded concurrency for the recommend endpoints with a priority wait queue
+and fast rejection when the queue is saturated
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+from modules import config
+from modules.exceptions import AdmissionRejectedException
+from modules.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Served in this order when a slot frees up
+PRIORITY_CLASSES = ('interactive', 'batch')
+
+
+class AdmissionController:
+    """
+    At most max_concurrency requests run at once; the rest wait in a queue
+    (interactive before batch, FIFO within a class)
+
+    Each class has its own queue limit and queue-time budget: arriving at
+    a full queue is rejected immediately (429), waiting longer than the
+    budget is rejected when the budget runs out (503). Both are cheaper for
+    everyone than admitting work that would finish too late anyway.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_concurrency: int = None, class_limits: Dict[str, Tuple[int, float]] = None):
+        """
+        Args:
+            max_concurrency: Concurrent requests (0 = unlimited, admission off)
+            class_limits: {priority class: (max queued, queue timeout seconds)}
+        """
+        self.max_concurrency = config.ADMISSION_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        self.class_limits = class_limits or {
+            'interactive': (config.ADMISSION_MAX_QUEUE, config.ADMISSION_QUEUE_TIMEOUT_MS / 1000),
+            'batch': (config.ADMISSION_BATCH_MAX_QUEUE, config.ADMISSION_BATCH_QUEUE_TIMEOUT_MS / 1000),
+        }
+        self.active = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self.queued = {name: 0 for name in PRIORITY_CLASSES}
+        self.admitted = {name: 0 for name in PRIORITY_CLASSES}
+        self.rejected_queue_full = {name: 0 for name in PRIORITY_CLASSES}
+        self.rejected_timeout = {name: 0 for name in PRIORITY_CLASSES}
+        self._wait_seconds = {name: 0.0 for name in PRIORITY_CLASSES}
+        self._max_wait_seconds = {name: 0.0 for name in PRIORITY_CLASSES}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    @staticmethod
+    def normalize_priority(priority: str) -> str:
+        priority = (priority or '').strip().lower()
+        return priority if priority in PRIORITY_CLASSES else 'interactive'
+
+    def _record_admission(self, priority: str, waited: float) -> None:
+        self.admitted[priority] += 1
+        self._wait_seconds[priority] += waited
+        self._max_wait_seconds[priority] = max(self._max_wait_seconds[priority], waited)
+
+    async def acquire(self, priority: str = 'interactive') -> None:
+        """
+        Wait for a slot
+
+        Raises:
+            AdmissionRejectedException: 429 if the class queue is full,
+                503 if the queue-time budget ran out
+        """
+        priority = self.normalize_priority(priority)
+        if not self.enabled:
+            self.admitted[priority] += 1
+            return
+
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self._record_admission(priority, 0.0)
+            return
+
+        max_queue, timeout = self.class_limits[priority]
+        if self.queued[priority] >= max_queue:
+            self.rejected_queue_full[priority] += 1
+            raise AdmissionRejectedException(
+                f"Server busy: {priority} queue full ({max_queue} waiting)",
+                status_code=429,
+                retry_after=max(1.0, timeout)
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITY_CLASSES.index(priority), next(self._sequence), future, priority))
+        self.queued[priority] += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.queued[priority] -= 1
+            self.rejected_timeout[priority] += 1
+            raise AdmissionRejectedException(
+                f"Server busy: no slot within {timeout * 1000:.0f} ms",
+                status_code=503,
+                retry_after=max(1.0, timeout)
+            )
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller went away
+                self.release()
+            else:
+                self.queued[priority] -= 1
+            raise
+        self._record_admission(priority, time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the best waiting request"""
+        if not self.enabled:
+            return
+        self.active -= 1
+        while self._waiters:
+            _, _, future, priority = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self.queued[priority] -= 1
+            self.active += 1
+            future.set_result(None)
+            break
+
+    @asynccontextmanager
+    async def slot(self, priority: str = 'interactive'):
+        """async with controller.slot('batch'): ... (releases on exit)"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        """Queue depth, admissions, rejections and queue wait per class"""
+        return {
+            'enabled': self.enabled,
+            'max_concurrency': self.max_concurrency,
+            'active': self.active,
+            'queue_depth': sum(self.queued.values()),
+            'queued': dict(self.queued),
+            'admitted': dict(self.admitted),
+            'rejected_queue_full': dict(self.rejected_queue_full),
+            'rejected_timeout': dict(self.rejected_timeout),
+            'mean_wait_ms': {
+                name: (self._wait_seconds[name] / self.admitted[name] * 1000) if self.admitted[name] else 0.0
+                for name in PRIORITY_CLASSES
+            },
+            'max_wait_ms': {name: seconds * 1000 for name, seconds in self._max_wait_seconds.items()},
+            'class_limits': {
+                name: {'max_queue': limit, 'queue_timeout_ms': timeout * 1000}
+                for name, (limit, timeout) in self.class_limits.items()
+            }
+        }
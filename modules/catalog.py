@@ -0,0 +1,275 @@
+"""
+Compact Catalog Module
+Struct-of-arrays view of the assessment catalog for the scoring hot path
+"""
+import sys
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from modules.logger import setup_logger
+from modules.exceptions import DataPreprocessingException
+
+logger = setup_logger(__name__)
+
+# Canonical SHL test types; any other label found in the data gets the next free bit
+KNOWN_TEST_TYPES = (
+    'Ability & Aptitude',
+    'Biodata & Situational Judgement',
+    'Competencies',
+    'Development & 360',
+    'Assessment Exercises',
+    'Knowledge & Skills',
+    'Personality & Behavior',
+    'Simulations',
+)
+
+DEFAULT_DURATION = 20
+DESCRIPTION_CHARS = 500
+
+# Keys of a recommendation record, in response order
+RECORD_FIELDS = (
+    'assessment_name',
+    'assessment_url',
+    'description',
+    'duration',
+    'test_type',
+    'adaptive_support',
+    'remote_support',
+    'relevance_score',
+)
+
+
+def _intern(value) -> str:
+    return sys.intern(str(value))
+
+
+class CompactCatalog:
+    """
+    Built once in RecommendationEngine.initialize
+
+    Every per-row value the scorer or response layer needs is converted,
+    lower-cased and parsed here, so recommend never touches pandas rows:
+    - interned name / url / normalized_url strings
+    - pre-lowercased name and description
+    - int32 durations, boolean remote / adaptive arrays
+    - uint32 test-type bitmask (plus the original ordered labels, shared
+      between rows with the same combination)
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.names: List[str] = []
+        self.urls: List[str] = []
+        self.normalized_urls: List[str] = []
+        self.names_lower: List[str] = []
+        self.descriptions_lower: List[str] = []
+        self.descriptions: List[str] = []
+        self.durations = np.zeros(0, dtype=np.int32)
+        self.remote = np.zeros(0, dtype=bool)
+        self.adaptive = np.zeros(0, dtype=bool)
+        self.remote_labels: List[str] = []
+        self.adaptive_labels: List[str] = []
+        self.test_type_mask = np.zeros(0, dtype=np.uint32)
+        self.test_types: List[Tuple[str, ...]] = []
+        self.test_type_bits: Dict[str, int] = {}
+        self.url_index: Dict[str, int] = {}
+        self._duration_bitmaps: Dict[Tuple[str, int], np.ndarray] = {}
+        self.json_prefixes: List[bytes] = []
+        self._projected_prefixes: Dict[Tuple[str, ...], List[bytes]] = {}
+
+    @staticmethod
+    def parse_test_types(test_type_str) -> List[str]:
+        """Parse pipe-separated test type string into list"""
+        if pd.isna(test_type_str):
+            return []
+        return [t.strip() for t in str(test_type_str).split('|') if t.strip()]
+
+    def _type_bit(self, label: str) -> int:
+        bit = self.test_type_bits.get(label)
+        if bit is None:
+            bit = len(self.test_type_bits)
+            if bit >= 32:
+                raise DataPreprocessingException(f"Too many distinct test types (>{bit}) for the bitmask")
+            self.test_type_bits[label] = bit
+        return bit
+
+    def type_mask(self, labels) -> int:
+        """Bitmask for a collection of test type labels (unknown labels are ignored)"""
+        mask = 0
+        for label in labels:
+            bit = self.test_type_bits.get(label)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'CompactCatalog':
+        """Build the compact catalog from the cleaned assessments dataframe"""
+        try:
+            catalog = cls()
+            catalog.size = len(df)
+            for label in KNOWN_TEST_TYPES:
+                catalog._type_bit(label)
+
+            def column(name, default):
+                if name in df.columns:
+                    return df[name].tolist()
+                return [default] * len(df)
+
+            names = column('name', '')
+            urls = column('url', '')
+            normalized = column('normalized_url', '')
+            descriptions = column('description', '')
+            durations = column('duration', DEFAULT_DURATION)
+            remote = column('remote_support', 'Yes')
+            adaptive = column('adaptive_support', 'No')
+            test_types = column('test_type', None)
+
+            type_tuples = {}
+            duration_values = np.empty(catalog.size, dtype=np.int32)
+            mask_values = np.zeros(catalog.size, dtype=np.uint32)
+
+            for i in range(catalog.size):
+                name = str(names[i])
+                description = str(descriptions[i])
+                catalog.names.append(_intern(name))
+                catalog.urls.append(_intern(urls[i]))
+                catalog.normalized_urls.append(_intern(normalized[i]))
+                catalog.names_lower.append(name.lower())
+                catalog.descriptions_lower.append(description.lower())
+                catalog.descriptions.append(description[:DESCRIPTION_CHARS])
+
+                try:
+                    duration_values[i] = int(durations[i])
+                except (TypeError, ValueError):
+                    duration_values[i] = DEFAULT_DURATION
+
+                catalog.remote_labels.append(_intern(remote[i]))
+                catalog.adaptive_labels.append(_intern(adaptive[i]))
+
+                labels = tuple(_intern(t) for t in cls.parse_test_types(test_types[i]))
+                labels = type_tuples.setdefault(labels, labels)
+                catalog.test_types.append(labels)
+                mask = 0
+                for label in labels:
+                    mask |= 1 << catalog._type_bit(label)
+                mask_values[i] = mask
+
+            catalog.durations = duration_values
+            catalog.test_type_mask = mask_values
+            catalog.remote = np.array([str(v).lower() == 'yes' for v in catalog.remote_labels], dtype=bool)
+            catalog.adaptive = np.array([str(v).lower() == 'yes' for v in catalog.adaptive_labels], dtype=bool)
+            catalog.url_index = {url: i for i, url in enumerate(catalog.normalized_urls)}
+
+            logger.info(f"✅ Compact catalog built: {catalog.size} assessments, "
+                        f"{len(catalog.test_type_bits)} test types")
+            return catalog
+
+        except DataPreprocessingException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to build compact catalog: {e}")
+            raise DataPreprocessingException(f"Compact catalog build failed: {str(e)}") from e
+
+    def duration_bitmap(self, op: str, minutes: int) -> np.ndarray:
+        """
+        Boolean bitmap of assessments with duration <= / >= minutes
+
+        Thresholds repeat a lot ("under 30/40/60 minutes"), so each one is
+        computed once and reused.
+        """
+        key = (op, minutes)
+        bitmap = self._duration_bitmaps.get(key)
+        if bitmap is None:
+            if op == '<=':
+                bitmap = self.durations <= minutes
+            elif op == '>=':
+                bitmap = self.durations >= minutes
+            else:
+                raise ValueError(f"Unsupported duration operator: {op}")
+            bitmap.setflags(write=False)
+            if len(self._duration_bitmaps) < 256:
+                self._duration_bitmaps[key] = bitmap
+        return bitmap
+
+    def has_type(self, idx: int, label: str) -> bool:
+        bit = self.test_type_bits.get(label)
+        return bit is not None and bool(self.test_type_mask[idx] & (1 << bit))
+
+    def record(self, idx: int, score: float) -> Dict:
+        """Response dict for one assessment (same shape recommend always returned)"""
+        return {
+            'assessment_name': self.names[idx],
+            'assessment_url': self.urls[idx],
+            'description': self.descriptions[idx],
+            'duration': int(self.durations[idx]),
+            'test_type': list(self.test_types[idx]),
+            'adaptive_support': self.adaptive_labels[idx],
+            'remote_support': self.remote_labels[idx],
+            'relevance_score': float(score)
+        }
+
+    def build_json_fragments(self) -> None:
+        """
+        Pre-render each assessment's static JSON (everything but the score)
+        so responses are assembled by concatenation at request time
+        """
+        from modules.serialization import render_fragment_prefix
+
+        self.json_prefixes = [render_fragment_prefix(self.record(i, 0.0)) for i in range(self.size)]
+        self._projected_prefixes = {RECORD_FIELDS: self.json_prefixes}
+        logger.info(f"✅ Pre-rendered {self.size} JSON fragments "
+                    f"({sum(len(p) for p in self.json_prefixes) / 1024:.1f} KB)")
+
+    @staticmethod
+    def canonical_fields(fields) -> Tuple[str, ...]:
+        """Requested record fields in response order (None = all)"""
+        if not fields:
+            return RECORD_FIELDS
+        unknown = set(fields) - set(RECORD_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown recommendation fields: {sorted(unknown)}")
+        return tuple(f for f in RECORD_FIELDS if f in fields)
+
+    def json_fragments(self, fields=None) -> List[bytes]:
+        """
+        Pre-rendered fragments restricted to a field projection
+
+        Each distinct projection is rendered once on first use and reused.
+        Use with render_recommend_response(with_score='relevance_score' in fields).
+        """
+        from modules.serialization import render_fragment_prefix
+
+        key = self.canonical_fields(fields)
+        prefixes = self._projected_prefixes.get(key)
+        if prefixes is None:
+            with_score = 'relevance_score' in key
+            prefixes = [
+                render_fragment_prefix({f: v for f, v in self.record(i, 0.0).items() if f in key}, with_score)
+                for i in range(self.size)
+            ]
+            # Few projections are used in practice; bound it anyway
+            if len(self._projected_prefixes) < 32:
+                self._projected_prefixes[key] = prefixes
+        return prefixes
+
+    def memory_usage(self) -> Dict:
+        """Approximate bytes held by the catalog (shared strings counted once)"""
+        seen = set()
+        string_bytes = 0
+        for values in (self.names, self.urls, self.normalized_urls, self.names_lower,
+                       self.descriptions_lower, self.descriptions, self.remote_labels,
+                       self.adaptive_labels):
+            string_bytes += sys.getsizeof(values)
+            for value in values:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    string_bytes += sys.getsizeof(value)
+        array_bytes = sum(a.nbytes for a in (self.durations, self.remote, self.adaptive, self.test_type_mask))
+        total = string_bytes + array_bytes
+        return {
+            'total_bytes': total,
+            'bytes_per_assessment': total / self.size if self.size else 0.0,
+            'array_bytes': array_bytes,
+            'string_bytes': string_bytes
+        }
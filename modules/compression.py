@@ -0,0 +1,80 @@
+"""
+Response Compression
+Accept-Encoding negotiation and gzip/brotli encoding of response bodies
+
+brotli is an optional dependency; without it only gzip is offered.
+"""
+import gzip
+from typing import Optional
+from modules.config import BROTLI_QUALITY, COMPRESSION_MIN_BYTES, GZIP_LEVEL
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Server preference when the client weights several encodings equally
+_PREFERENCE = ('br', 'gzip')
+
+
+def supported_encodings() -> tuple:
+    return _PREFERENCE if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported content coding from an Accept-Encoding header
+
+    Returns:
+        'br', 'gzip' or None (send identity)
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Encode body with 'gzip' or 'br'"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def maybe_compress(body: bytes, accept_encoding: str, min_bytes: int = None):
+    """
+    Compress body when it is large enough and the client accepts a
+    supported encoding
+
+    Returns:
+        (body, encoding) - encoding is None when the body is sent as-is
+    """
+    threshold = COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes
+    if len(body) < threshold:
+        return body, None
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding), encoding
@@ -0,0 +1,147 @@
+"""
+Runtime Configuration
+Serving knobs read from environment variables (or .env)
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to default on missing/bad values"""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting, falling back to default on missing/bad values"""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting (1/true/yes/on)"""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_str(name: str, default: str) -> str:
+    """Read a string setting"""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return value.strip()
+
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Execution layer: bounded pool for CPU-bound recommend stages
+CPU_POOL_SIZE = _env_int('SHL_CPU_POOL_SIZE', min(4, CPU_COUNT))
+
+# Torch intra-op / inter-op threads (0 = derive from CPU count and pool size)
+TORCH_NUM_THREADS = _env_int('SHL_TORCH_THREADS', 0)
+TORCH_INTEROP_THREADS = _env_int('SHL_TORCH_INTEROP_THREADS', 0)
+
+# Dynamic micro-batching of query encodes across concurrent requests
+ENCODE_BATCHING = _env_bool('SHL_ENCODE_BATCHING', True)
+ENCODE_MAX_BATCH = _env_int('SHL_ENCODE_MAX_BATCH', 32)
+ENCODE_MAX_WAIT_MS = _env_float('SHL_ENCODE_MAX_WAIT_MS', 2.0)
+
+# Out-of-process embedding worker (empty = load the model in-process)
+EMBEDDING_SERVICE_SOCKET = _env_str('SHL_EMBEDDING_SERVICE_SOCKET', '')
+
+# Query/catalog encoder backend: torch | onnx | onnx-int8
+ENCODER_BACKEND = _env_str('SHL_ENCODER_BACKEND', 'torch').lower()
+ONNX_MODEL_DIR = _env_str('SHL_ONNX_MODEL_DIR', '')
+
+# Index build: concurrent stages in initialize (1 = serial), and the catalog
+# encode's batch size and processes (>1 = sentence-transformers process pool,
+# torch backend only; each process gets CPU_COUNT / processes threads)
+INDEX_BUILD_WORKERS = _env_int('SHL_INDEX_BUILD_WORKERS', 4)
+INDEX_ENCODE_BATCH = _env_int('SHL_INDEX_ENCODE_BATCH', 32)
+INDEX_ENCODE_PROCESSES = _env_int('SHL_INDEX_ENCODE_PROCESSES', 1)
+
+# Query / keyword embedding caches
+QUERY_CACHE_SIZE = _env_int('SHL_QUERY_CACHE_SIZE', 1024)
+PHRASE_CACHE_SIZE = _env_int('SHL_PHRASE_CACHE_SIZE', 4096)
+PRECOMPUTE_VOCABULARY = _env_bool('SHL_PRECOMPUTE_VOCABULARY', False)
+
+# How LLM keywords enter the query embedding:
+#   concat  - encode "query kw1 kw2 ..." as one text (original behaviour)
+#   compose - encode query and each keyword separately (cached) and combine
+SEMANTIC_KEYWORD_MODE = _env_str('SHL_SEMANTIC_KEYWORD_MODE', 'concat').lower()
+SEMANTIC_KEYWORD_WEIGHT = _env_float('SHL_SEMANTIC_KEYWORD_WEIGHT', 0.5)
+
+# Apply constraints stated in the query ("remote, under 40 minutes") as filters
+EXTRACT_QUERY_FILTERS = _env_bool('SHL_EXTRACT_QUERY_FILTERS', False)
+
+# Response compression: gzip/brotli (brotli when installed) above a size threshold
+COMPRESSION_MIN_BYTES = _env_int('SHL_COMPRESSION_MIN_BYTES', 1024)
+GZIP_LEVEL = _env_int('SHL_GZIP_LEVEL', 6)
+BROTLI_QUALITY = _env_int('SHL_BROTLI_QUALITY', 5)
+
+# Maximum queries accepted by POST /recommend/batch
+MAX_BATCH_QUERIES = _env_int('SHL_MAX_BATCH_QUERIES', 32)
+
+# GET /recommend HTTP caching: Cache-Control sent with 200/304 responses, and
+# an in-process (etag, body) cache for repeated canonical queries (0 = off)
+RECOMMEND_CACHE_CONTROL = _env_str('SHL_RECOMMEND_CACHE_CONTROL', 'public, max-age=300')
+RESPONSE_CACHE_SIZE = _env_int('SHL_RESPONSE_CACHE_SIZE', 1024)
+RESPONSE_CACHE_TTL = _env_float('SHL_RESPONSE_CACHE_TTL', 300.0)
+
+# Cursor pagination: full rankings kept server-side and sliced per page
+CURSOR_TTL = _env_float('SHL_CURSOR_TTL', 600.0)
+CURSOR_MAX_ENTRIES = _env_int('SHL_CURSOR_MAX_ENTRIES', 10000)
+CURSOR_MAX_RESULTS = _env_int('SHL_CURSOR_MAX_RESULTS', 1000)
+
+# Admission control for the recommend endpoints (0 concurrency = unlimited).
+# Requests beyond the limit wait in a priority queue; a full queue is
+# rejected with 429, a wait longer than the budget with 503.
+ADMISSION_MAX_CONCURRENCY = _env_int('SHL_ADMISSION_MAX_CONCURRENCY', 32)
+ADMISSION_MAX_QUEUE = _env_int('SHL_ADMISSION_MAX_QUEUE', 64)
+ADMISSION_QUEUE_TIMEOUT_MS = _env_float('SHL_ADMISSION_QUEUE_TIMEOUT_MS', 2000.0)
+# Batch-class (bulk API) requests: smaller queue, longer budget, served after interactive ones
+ADMISSION_BATCH_MAX_QUEUE = _env_int('SHL_ADMISSION_BATCH_MAX_QUEUE', 16)
+ADMISSION_BATCH_QUEUE_TIMEOUT_MS = _env_float('SHL_ADMISSION_BATCH_QUEUE_TIMEOUT_MS', 10000.0)
+
+# Serving tier: auto | full | no-llm | lexical-training | lexical (see serving_tiers)
+SERVING_TIER = _env_str('SHL_SERVING_TIER', 'auto').lower()
+# Free memory needed to load the encoder in-process (auto tier selection)
+SEMANTIC_MIN_MEMORY_MB = _env_float('SHL_SEMANTIC_MIN_MEMORY_MB', 1024.0)
+ONNX_MIN_MEMORY_MB = _env_float('SHL_ONNX_MIN_MEMORY_MB', 384.0)
+# Per-stage latency budgets; while a stage's moving average exceeds its
+# budget, requests are served by the tier without it (0 = never degrade)
+LLM_LATENCY_BUDGET_MS = _env_float('SHL_LLM_LATENCY_BUDGET_MS', 0.0)
+SEMANTIC_LATENCY_BUDGET_MS = _env_float('SHL_SEMANTIC_LATENCY_BUDGET_MS', 0.0)
+TIER_PROBE_EVERY = _env_int('SHL_TIER_PROBE_EVERY', 20)
+# Tuned component weights per tier (JSON from benchmarks.tune_weights; empty = built-in)
+WEIGHTS_FILE = _env_str('SHL_WEIGHTS_FILE', '')
+
+# main.py pipeline: artifact cache directory (empty = rebuild everything) and concurrent stages
+PIPELINE_CACHE_DIR = _env_str('SHL_PIPELINE_CACHE_DIR', '.pipeline_cache')
+PIPELINE_WORKERS = _env_int('SHL_PIPELINE_WORKERS', 4)
+
+# Admin endpoints (/admin/profile) are disabled unless a token is set
+ADMIN_TOKEN = _env_str('SHL_ADMIN_TOKEN', '')
+# Sampling profiler: stack sampling interval and longest allowed run
+PROFILE_INTERVAL_MS = _env_float('SHL_PROFILE_INTERVAL_MS', 5.0)
+PROFILE_MAX_SECONDS = _env_float('SHL_PROFILE_MAX_SECONDS', 60.0)
+
+# Logging: records are queued and written by one listener thread
+# (SHL_LOG_ASYNC=false writes synchronously); text or json lines
+LOG_ASYNC = _env_bool('SHL_LOG_ASYNC', True)
+LOG_FORMAT = _env_str('SHL_LOG_FORMAT', 'text').lower()
+LOG_LEVEL = _env_str('SHL_LOG_LEVEL', '').upper()
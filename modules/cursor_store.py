@@ -0,0 +1,121 @@
+"""
+Ranking Cursor Store
+Server-side rankings for cursor pagination: each cursor keeps the compact
+(catalog position, score) arrays of one ranking so later pages are slices
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+
+
+class RankingCursor:
+    """One stored ranking plus what is needed to render its pages"""
+
+    __slots__ = ('cursor_id', 'indices', 'scores', 'query', 'filters', 'fields', 'compact',
+                 'page_size', 'index_version', 'expires_at')
+
+    def __init__(self, cursor_id: str, indices: np.ndarray, scores: np.ndarray, query: str,
+                 filters: Dict, fields: tuple, compact: bool, page_size: int, index_version: str):
+        self.cursor_id = cursor_id
+        self.indices = indices
+        self.scores = scores
+        self.query = query
+        self.filters = filters
+        self.fields = fields
+        self.compact = compact
+        self.page_size = page_size
+        self.index_version = index_version
+        self.expires_at = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.indices)
+
+    def page(self, offset: int, limit: int):
+        """(positions, scores) of one page; slices are views, nothing is copied"""
+        return self.indices[offset:offset + limit], self.scores[offset:offset + limit]
+
+    @property
+    def nbytes(self) -> int:
+        return self.indices.nbytes + self.scores.nbytes
+
+
+class RankingCursorStore:
+    """
+    Thread-safe LRU of cursors with a sliding TTL (each page read extends it)
+
+    Rankings are stored as int32 positions and float64 scores (~12 bytes
+    per result), so pages render with exactly the scores of /recommend.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._cursors = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def create(self, indices: np.ndarray, scores: np.ndarray, **metadata) -> RankingCursor:
+        """Store a ranking and return its cursor"""
+        if self.created and self.created % 256 == 0:
+            self.purge_expired()
+        cursor = RankingCursor(
+            secrets.token_urlsafe(12),
+            np.ascontiguousarray(indices, dtype=np.int32),
+            np.ascontiguousarray(scores, dtype=np.float64),
+            **metadata
+        )
+        with self._lock:
+            cursor.expires_at = time.monotonic() + self.ttl
+            self._cursors[cursor.cursor_id] = cursor
+            self.created += 1
+            while len(self._cursors) > self.max_entries:
+                self._cursors.popitem(last=False)
+                self.evicted += 1
+        return cursor
+
+    def get(self, cursor_id: str) -> Optional[RankingCursor]:
+        """Cursor by id, or None if unknown or expired"""
+        now = time.monotonic()
+        with self._lock:
+            cursor = self._cursors.get(cursor_id)
+            if cursor is None:
+                return None
+            if cursor.expires_at <= now:
+                del self._cursors[cursor_id]
+                self.expired += 1
+                return None
+            cursor.expires_at = now + self.ttl
+            self._cursors.move_to_end(cursor_id)
+            return cursor
+
+    def purge_expired(self) -> int:
+        """Drop expired cursors; returns how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [cid for cid, cursor in self._cursors.items() if cursor.expires_at <= now]
+            for cid in stale:
+                del self._cursors[cid]
+            self.expired += len(stale)
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stored_bytes = sum(cursor.nbytes for cursor in self._cursors.values())
+            return {
+                'cursors': len(self._cursors),
+                'stored_bytes': stored_bytes,
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'ttl_seconds': self.ttl,
+                'max_entries': self.max_entries
+            }
@@ -0,0 +1,79 @@
+"""
+Embedding Cache
+Bounded LRU cache of text -> embedding vectors with hit-rate statistics
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache for embedding vectors
+
+    Pinned entries (e.g. a precomputed skill vocabulary) live outside the
+    LRU and are never evicted.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max(0, max_size)
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached vector or None (counts a hit/miss)"""
+        with self._lock:
+            vector = self._pinned.get(key)
+            if vector is None:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        """Insert a vector, evicting the least recently used entry if full"""
+        if self.max_size == 0:
+            return
+        with self._lock:
+            if key in self._pinned:
+                return
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pin(self, key: str, vector: np.ndarray) -> None:
+        """Insert a vector that is never evicted"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._pinned[key] = vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._pinned)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            'size': len(self._entries),
+            'pinned': len(self._pinned),
+            'max_size': self.max_size
+        }
@@ -0,0 +1,273 @@
+"""
+Embedding Service
+Out-of-process sentence encoder shared by all API workers
+
+A single worker process owns the SentenceTransformer (and torch). API
+workers connect over a Unix socket, send texts as small JSON frames and
+read the resulting float32 vectors straight out of a per-connection
+shared memory buffer - no pickled arrays cross the socket. Requests from
+every connection go through one EncodeScheduler, so the encoder batches
+across all API workers.
+
+Run the worker:
+    python -m modules.embedding_service --socket /tmp/shl_embed.sock
+
+Point API workers at it with SHL_EMBEDDING_SERVICE_SOCKET=/tmp/shl_embed.sock
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List
+import numpy as np
+from modules.logger import setup_logger
+from modules.exceptions import EmbeddingServiceException
+from modules.encode_scheduler import EncodeScheduler
+
+logger = setup_logger(__name__)
+
+_HEADER = struct.Struct('!I')
+_MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+
+def _send_frame(sock: socket.socket, payload: Dict) -> None:
+    data = json.dumps(payload).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Embedding service connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> Dict:
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if length > _MAX_FRAME_BYTES:
+        raise ValueError(f"Frame too large: {length} bytes")
+    return json.loads(_recv_exact(sock, length).decode('utf-8'))
+
+
+class _EncodeRequestHandler(socketserver.BaseRequestHandler):
+    """One connection = one API worker; owns one shared memory buffer"""
+
+    def handle(self):
+        server = self.server
+        buffer_bytes = server.max_rows * server.dim * 4
+        shm = shared_memory.SharedMemory(create=True, size=buffer_bytes)
+        out = np.ndarray((server.max_rows, server.dim), dtype=np.float32, buffer=shm.buf)
+
+        try:
+            _send_frame(self.request, {
+                'shm': shm.name,
+                'dim': server.dim,
+                'max_rows': server.max_rows
+            })
+
+            while True:
+                try:
+                    message = _recv_frame(self.request)
+                except (ConnectionError, struct.error):
+                    return
+
+                texts = message.get('texts', [])
+                if len(texts) > server.max_rows:
+                    _send_frame(self.request, {'error': f"At most {server.max_rows} texts per request"})
+                    continue
+
+                try:
+                    futures = [server.scheduler.submit(text) for text in texts]
+                    for row, future in enumerate(futures):
+                        out[row] = future.result()
+                except Exception as e:
+                    logger.error("Encode request failed: %s", e)
+                    _send_frame(self.request, {'error': str(e)})
+                    continue
+
+                _send_frame(self.request, {'rows': len(texts)})
+        except ConnectionError:
+            # Client gave up on a request (timeout) and dropped the connection
+            logger.debug("Embedding client disconnected mid-request")
+        finally:
+            del out
+            shm.close()
+            shm.unlink()
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server wrapping a SentenceTransformer
+
+    Each connection is handled on its own thread; all encodes funnel into a
+    single EncodeScheduler so concurrent API workers share batches.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        model,
+        max_rows: int = 256,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0
+    ):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        self.model = model
+        self.dim = int(model.get_sentence_embedding_dimension())
+        self.max_rows = max_rows
+        self.scheduler = EncodeScheduler(
+            lambda texts: np.asarray(
+                model.encode(texts, batch_size=max(1, len(texts)), show_progress_bar=False),
+                dtype=np.float32
+            ),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+        super().__init__(socket_path, _EncodeRequestHandler)
+        logger.info(f"EmbeddingServer listening on {socket_path} (dim={self.dim})")
+
+    def server_close(self):
+        super().server_close()
+        self.scheduler.close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class EmbeddingServiceClient:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by EmbeddingServer
+
+    Holds one connection and one attached shared memory buffer; calls are
+    serialised with a lock (use FeatureExtractor encode batching to merge
+    concurrent queries within a worker before they reach the service).
+    A request that fails mid-flight (timeout, broken socket, bad frame)
+    drops the connection, so a late reply can never be read as the answer
+    to the next request; the next call reconnects.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._shm = None
+        self._buffer = None
+        self.dim = None
+        self.max_rows = None
+        self._connect()
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            hello = _recv_frame(sock)
+        except (OSError, ValueError) as e:
+            sock.close()
+            raise EmbeddingServiceException(
+                f"Cannot reach embedding service at {self.socket_path}: {str(e)}"
+            ) from e
+
+        shm = shared_memory.SharedMemory(name=hello['shm'])
+        # The server owns the segment; stop this process's resource tracker
+        # from unlinking it (and warning) when we exit
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+
+        self._sock = sock
+        self._shm = shm
+        self.dim = hello['dim']
+        self.max_rows = hello['max_rows']
+        self._buffer = np.ndarray((self.max_rows, self.dim), dtype=np.float32, buffer=shm.buf)
+        logger.info(f"Connected to embedding service at {self.socket_path} (dim={self.dim})")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _encode_chunk(self, texts: List[str]) -> np.ndarray:
+        _send_frame(self._sock, {'texts': texts})
+        reply = _recv_frame(self._sock)
+        if 'error' in reply:
+            raise EmbeddingServiceException(f"Embedding service error: {reply['error']}")
+        return self._buffer[:reply['rows']].copy()
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Encode texts via the service (mirrors SentenceTransformer.encode)"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                chunks = [
+                    self._encode_chunk(texts[start:start + self.max_rows])
+                    for start in range(0, len(texts), self.max_rows)
+                ]
+            except EmbeddingServiceException:
+                # Error reply from the service: the connection is still in step
+                raise
+            except Exception as e:
+                # The reply to this request may still arrive; never reuse the connection
+                self.close()
+                raise EmbeddingServiceException(f"Embedding service request failed: {str(e)}") from e
+
+        vectors = np.vstack(chunks)
+        return vectors[0] if single else vectors
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if self._shm is not None:
+            self._buffer = None
+            self._shm.close()
+            self._shm = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the shared embedding worker")
+    parser.add_argument('--socket', default='/tmp/shl_embed.sock', help="Unix socket path")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--max-rows', type=int, default=256, help="Texts per request / shared buffer rows")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    from modules.feature_extractor import load_sentence_transformer
+
+    model = load_sentence_transformer(args.model)
+    server = EmbeddingServer(
+        args.socket,
+        model,
+        max_rows=args.max_rows,
+        max_batch_size=args.max_batch,
+        max_wait_ms=args.max_wait_ms
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Embedding service stopping")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Encode Scheduler
+Dynamic micro-batching of query encodes across concurrent requests
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+import numpy as np
+from modules.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_STOP = object()
+
+
+class EncodeScheduler:
+    """
+    Collects query texts submitted from many threads and encodes them together
+
+    A single background thread takes the first pending text, then keeps
+    gathering until either max_batch_size texts are queued or max_wait_ms
+    has elapsed since the first one arrived, runs one encode call and hands
+    each caller its own row.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='shl-encode-batcher', daemon=True)
+        self._closed = False
+
+        # Counters (written only by the batcher thread)
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+
+        self._thread.start()
+        logger.info(f"EncodeScheduler started (max_batch={self.max_batch_size}, max_wait={max_wait_ms}ms)")
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding; the future resolves to its 1-D vector"""
+        if self._closed:
+            raise RuntimeError("EncodeScheduler is closed")
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        """Blocking convenience wrapper around submit"""
+        return self.submit(text).result()
+
+    def _collect_batch(self, first) -> List:
+        """Gather up to max_batch_size items, waiting at most max_wait after the first"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Re-queue so the main loop sees it after this batch
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = self._collect_batch(first)
+            # Drop callers that gave up (cancelled) before we started
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                vectors = self.encode_fn([text for text, _ in batch])
+            except Exception as e:
+                logger.error("Batched encode of %d texts failed: %s", len(batch), e)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+            self.batches += 1
+            self.items += len(batch)
+            self.max_seen_batch = max(self.max_seen_batch, len(batch))
+
+    def stats(self) -> dict:
+        """Batching statistics since start"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': (self.items / self.batches) if self.batches else 0.0,
+            'max_batch_size': self.max_seen_batch,
+            'pending': self._queue.qsize()
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Finish queued work and stop the batcher thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+        logger.info("EncodeScheduler stopped")
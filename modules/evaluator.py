@@ -1,60 +1,448 @@
 """
 Evaluator Module
 Handles performance evaluation
+
+evaluate() scores every labelled query in one pass: LLM extractions are
+replayed from a cache file, query embeddings are encoded in batches and
+rankings can be computed in forked worker processes. Recall, MAP, NDCG
+and MRR are reported for several cutoffs at once.
+
+cross_validate() reports the same metrics without training-pattern
+leakage: each fold's training rows are subtracted from the learned
+patterns while its queries are ranked, then added back.
 """
+import hashlib
+import json
+import multiprocessing
+import os
+import time
 import numpy as np
-import pandas as pd
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 from modules.recommender import RecommendationEngine
 
+DEFAULT_KS = (1, 3, 5, 10)
+
+# cached: replay stored extractions, call the LLM for misses
+# live:   call the LLM for every query (and refresh the cache)
+# replay: stored extractions only; misses get empty requirements
+# none:   no LLM requirements at all
+LLM_MODES = ('cached', 'live', 'replay', 'none')
+
+DEFAULT_LLM_CACHE = '.eval_cache/llm_extractions.json'
+
+
+class LLMExtractionCache:
+    """
+    LLM requirement extractions keyed by model and query, persisted as JSON
+    so repeated evaluations are deterministic and cost no API calls
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Path(path) if path else None
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        if self.path is not None and self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding='utf-8'))
+
+    @staticmethod
+    def key(model: str, query: str) -> str:
+        return hashlib.sha1(f"{model}\n{query}".encode('utf-8')).hexdigest()
+
+    def get(self, model: str, query: str):
+        return self.entries.get(self.key(model, query))
+
+    def put(self, model: str, query: str, requirements: Dict) -> None:
+        self.entries[self.key(model, query)] = requirements
+        self.dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.entries, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def hit_metrics(hits: np.ndarray, n_relevant: np.ndarray, ks: Sequence[int] = DEFAULT_KS) -> Dict[str, np.ndarray]:
+    """
+    Recall@k, MAP@k, NDCG@k and MRR@k with binary relevance
+
+    Args:
+        hits: (..., max_k) array, 1 where the result at that rank is relevant
+        n_relevant: Ground-truth counts, broadcastable to hits.shape[:-1] (non-zero)
+        ks: Cutoffs (at most max_k)
+
+    Returns:
+        {'recall@10': array of shape hits.shape[:-1], 'map@10': ..., 'ndcg@10': ..., 'mrr@10': ...}
+    """
+    max_k = hits.shape[-1]
+    ranks = np.arange(1, max_k + 1)
+    discounts = 1.0 / np.log2(ranks + 1)
+    ideal_dcg = np.cumsum(discounts)
+    cumulative_hits = np.cumsum(hits, axis=-1)
+    precision = cumulative_hits / ranks
+    first_hit = np.where(hits.any(axis=-1), hits.argmax(axis=-1) + 1, 0)
+    n_relevant = np.asarray(n_relevant, dtype=np.float64)
+
+    metrics = {}
+    for k in ks:
+        top = hits[..., :k]
+        n_ideal = np.minimum(n_relevant, k)
+        metrics[f'recall@{k}'] = cumulative_hits[..., k - 1] / n_relevant
+        metrics[f'map@{k}'] = (precision[..., :k] * top).sum(axis=-1) / n_ideal
+        metrics[f'ndcg@{k}'] = (top * discounts[:k]).sum(axis=-1) / ideal_dcg[n_ideal.astype(np.int64) - 1]
+        metrics[f'mrr@{k}'] = np.where((first_hit > 0) & (first_hit <= k), 1.0 / np.maximum(first_hit, 1), 0.0)
+    return metrics
+
+
+def ranking_metrics(
+    rankings: Sequence[Sequence[str]],
+    relevant: Sequence[Set[str]],
+    ks: Sequence[int] = DEFAULT_KS
+) -> Dict[str, np.ndarray]:
+    """
+    Per-query metrics (see hit_metrics) of ranked URL lists
+
+    Args:
+        rankings: Ranked URLs per query (at least max(ks) long unless filtered)
+        relevant: Ground-truth URLs per query (non-empty)
+        ks: Cutoffs
+    """
+    max_k = max(ks)
+    hits = np.zeros((len(rankings), max_k), dtype=np.float64)
+    for i, (ranked, truth) in enumerate(zip(rankings, relevant)):
+        for j, url in enumerate(list(ranked)[:max_k]):
+            hits[i, j] = url in truth
+    return hit_metrics(hits, [len(truth) for truth in relevant], ks)
+
+
+def format_metrics(metrics: Dict[str, float], ks: Sequence[int]) -> List[str]:
+    """One summary line per cutoff"""
+    return [
+        f"  @{k:<3} Recall {metrics[f'recall@{k}']:.4f}  MAP {metrics[f'map@{k}']:.4f}  "
+        f"NDCG {metrics[f'ndcg@{k}']:.4f}  MRR {metrics[f'mrr@{k}']:.4f}"
+        for k in sorted(set(ks))
+    ]
+
+
+# (engine, tier, top_k, items) set before forking the worker pool; children inherit it
+_WORKER_JOB = None
+
+
+def _rank_one(engine: RecommendationEngine, tier, top_k: int, item: Tuple) -> np.ndarray:
+    query, llm_data, query_embedding = item
+    positions, _ = engine.rank_with_requirements(
+        query,
+        llm_data,
+        top_k=top_k,
+        query_embedding=query_embedding,
+        filters=engine.resolve_filters(query),
+        tier=tier
+    )
+    return positions
+
+
+def _rank_chunk(indices: List[int]) -> List[np.ndarray]:
+    engine, tier, top_k, items = _WORKER_JOB
+    return [_rank_one(engine, tier, top_k, items[i]) for i in indices]
+
+
 class Evaluator:
     """
     Responsible for evaluating recommendation performance
     """
-    
-    def __init__(self, recommender: RecommendationEngine):
+
+    def __init__(self, recommender: RecommendationEngine, llm_cache_path: str = DEFAULT_LLM_CACHE):
         self.recommender = recommender
-    
-    def evaluate_recall_at_k(self, k: int = 10) -> float:
+        self.llm_cache = LLMExtractionCache(llm_cache_path)
+
+    def labelled_queries(self) -> Tuple[List[str], List[Set[str]]]:
+        """Train-set queries (sorted) with their ground-truth URLs that exist in the catalog"""
+        engine = self.recommender
+        available = set(engine.catalog.normalized_urls)
+        queries, relevant = [], []
+        for query, group in engine.train_data.groupby('Query'):
+            truth = {url for url in group['normalized_url'] if url in available}
+            if truth:
+                queries.append(query)
+                relevant.append(truth)
+        return queries, relevant
+
+    def extract_requirements(self, queries: List[str], mode: str = 'cached') -> List[Dict]:
+        """LLM requirements per query according to mode (see LLM_MODES)"""
+        if mode not in LLM_MODES:
+            raise ValueError(f"Unknown LLM mode '{mode}' (expected one of {LLM_MODES})")
+        client = self.recommender.llm_client
+        empty = client.empty_requirements()
+
+        requirements = []
+        for query in queries:
+            if mode == 'none':
+                requirements.append(empty)
+                continue
+            extracted = None if mode == 'live' else self.llm_cache.get(client.model, query)
+            if extracted is None and mode != 'replay':
+                extracted = client.extract_requirements(query)
+                # Fallbacks (no key, API errors) are not cached
+                if extracted != empty:
+                    self.llm_cache.put(client.model, query, extracted)
+            requirements.append(extracted if extracted is not None else empty)
+        self.llm_cache.save()
+        return requirements
+
+    def query_embeddings(self, queries: List[str], requirements: List[Dict]) -> List[np.ndarray]:
+        """Semantic query embeddings, encoded in batches (same vectors recommend would use)"""
+        extractor = self.recommender.feature_extractor
+        keyword_lists = [llm_data.get('keywords', []) for llm_data in requirements]
+        if extractor.keyword_mode == 'compose':
+            extractor.encode_queries(queries)
+            extractor.encode_phrases([k for keywords in keyword_lists for k in keywords if str(k).strip()])
+            return [extractor.embed_query(q, keywords) for q, keywords in zip(queries, keyword_lists)]
+        texts = [extractor.semantic_query_text(q, keywords) for q, keywords in zip(queries, keyword_lists)]
+        return list(extractor.encode_queries(texts))
+
+    def rank_queries(
+        self,
+        queries: List[str],
+        requirements: List[Dict],
+        top_k: int,
+        tier=None,
+        workers: int = 1
+    ) -> List[np.ndarray]:
+        """
+        Catalog positions of the top_k results per query, as recommend
+        would rank them; workers > 1 ranks in forked processes
+        """
+        global _WORKER_JOB
+        engine = self.recommender
+        tier = tier or engine.serving_tier
+        if not tier.use_llm:
+            requirements = [engine.llm_client.empty_requirements()] * len(queries)
+        if tier.use_semantic:
+            embeddings = self.query_embeddings(queries, requirements)
+        else:
+            embeddings = [None] * len(queries)
+        items = list(zip(queries, requirements, embeddings))
+
+        workers = min(workers, len(items))
+        if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            return [_rank_one(engine, tier, top_k, item) for item in items]
+
+        chunks = [list(range(start, len(items), workers)) for start in range(workers)]
+        _WORKER_JOB = (engine, tier, top_k, items)
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                results = list(pool.map(_rank_chunk, chunks))
+        finally:
+            _WORKER_JOB = None
+
+        rankings = [None] * len(items)
+        for chunk, ranked in zip(chunks, results):
+            for i, positions in zip(chunk, ranked):
+                rankings[i] = positions
+        return rankings
+
+    def _summarize(self, queries: List[str], relevant: List[Set[str]], rankings: List[np.ndarray],
+                   ks: Sequence[int]) -> Tuple[Dict[str, float], List[Dict]]:
+        """Mean metrics and per-query entries from catalog-position rankings"""
+        urls = self.recommender.catalog.normalized_urls
+        per_query_metrics = ranking_metrics(
+            [[urls[pos] for pos in positions] for positions in rankings],
+            relevant,
+            ks
+        )
+        metrics = {name: float(values.mean()) for name, values in per_query_metrics.items()}
+        per_query = [
+            dict({'query': query, 'relevant': len(truth)},
+                 **{name: float(values[i]) for name, values in per_query_metrics.items()})
+            for i, (query, truth) in enumerate(zip(queries, relevant))
+        ]
+        return metrics, per_query
+
+    @staticmethod
+    def _print_results(metrics: Dict[str, float], per_query: List[Dict], ks: Sequence[int]) -> None:
+        k = max(ks)
+        for entry in per_query:
+            print(f"  Query: {entry['query'][:50]}... | Recall@{k}: {entry[f'recall@{k}']:.3f}")
+        print()
+        print('\n'.join(format_metrics(metrics, ks)))
+
+    @contextmanager
+    def holdout(self, queries: Sequence[str]):
+        """
+        Temporarily remove the training rows of queries from the learned
+        patterns (and the precomputed popularity boosts), restoring them on exit
+        """
+        engine = self.recommender
+        merged = engine.train_merged
+        rows = merged[merged['Query'].isin(set(queries))]
+        engine.training_learner.remove_examples(rows)
+        engine.refresh_frequency_boosts(rows['normalized_url'])
+        try:
+            yield rows
+        finally:
+            engine.training_learner.add_examples(rows)
+            engine.refresh_frequency_boosts(rows['normalized_url'])
+
+    @staticmethod
+    def fold_assignments(n_queries: int, folds: Optional[int] = 5, seed: int = 0) -> np.ndarray:
+        """
+        Fold index per query: a seeded shuffle dealt round-robin into folds,
+        or one fold per query when folds is None (leave-one-query-out)
+        """
+        if folds is None or folds >= n_queries:
+            return np.arange(n_queries)
+        if folds < 2:
+            raise ValueError(f"Cross-validation needs at least 2 folds (got {folds})")
+        assignment = np.empty(n_queries, dtype=np.int64)
+        assignment[np.random.default_rng(seed).permutation(n_queries)] = np.arange(n_queries) % folds
+        return assignment
+
+    def cross_validate(
+        self,
+        folds: Optional[int] = 5,
+        ks: Sequence[int] = DEFAULT_KS,
+        tier=None,
+        llm: str = 'cached',
+        workers: int = 1,
+        seed: int = 0,
+        verbose: bool = True
+    ) -> Dict:
+        """
+        K-fold (or leave-one-query-out, folds=None) evaluation by query
+
+        Each query is ranked once, with the training patterns learned only
+        from the other folds. TF-IDF and embeddings depend on the catalog
+        alone and are shared; patterns are updated incrementally per fold,
+        so this costs about one evaluate() run.
+
+        Returns:
+            Same as evaluate(), plus 'folds' and a 'fold' entry per query
+        """
+        engine = self.recommender
+        if not engine.initialized:
+            engine.initialize()
+        tier = tier or engine.serving_tier
+        ks = sorted(set(ks))
+
+        start = time.perf_counter()
+        queries, relevant = self.labelled_queries()
+        requirements = self.extract_requirements(queries, llm if tier.use_llm else 'none')
+        llm_done = time.perf_counter()
+
+        assignment = self.fold_assignments(len(queries), folds, seed)
+        n_folds = int(assignment.max()) + 1 if len(assignment) else 0
+        rankings = [None] * len(queries)
+        for fold in range(n_folds):
+            members = np.flatnonzero(assignment == fold)
+            fold_queries = [queries[i] for i in members]
+            with self.holdout(fold_queries):
+                ranked = self.rank_queries(fold_queries, [requirements[i] for i in members], max(ks),
+                                           tier=tier, workers=workers)
+            for i, positions in zip(members, ranked):
+                rankings[i] = positions
+        rank_done = time.perf_counter()
+
+        metrics, per_query = self._summarize(queries, relevant, rankings, ks)
+        for entry, fold in zip(per_query, assignment):
+            entry['fold'] = int(fold)
+
+        if verbose:
+            scheme = 'leave-one-query-out' if n_folds == len(queries) else f'{n_folds}-fold'
+            print(f"\nCross-validating {len(queries)} queries ({scheme}, "
+                  f"Recall/MAP/NDCG/MRR @ {', '.join(map(str, ks))})...")
+            self._print_results(metrics, per_query, ks)
+            print(f"\n✅ Cross-validated in {rank_done - start:.2f}s (LLM {llm_done - start:.2f}s, "
+                  f"ranking {rank_done - llm_done:.2f}s)\n")
+
+        return {
+            'queries': len(queries),
+            'folds': n_folds,
+            'metrics': metrics,
+            'per_query': per_query,
+            'seconds': {
+                'llm': llm_done - start,
+                'rank': rank_done - llm_done,
+                'total': time.perf_counter() - start
+            }
+        }
+
+    def evaluate(
+        self,
+        ks: Sequence[int] = DEFAULT_KS,
+        tier=None,
+        llm: str = 'cached',
+        workers: int = 1,
+        verbose: bool = True
+    ) -> Dict:
+        """
+        Evaluate all labelled train queries in one pass
+
+        Args:
+            ks: Cutoffs for Recall/MAP/NDCG/MRR
+            tier: Optional ServingTier to evaluate (default: the engine's own)
+            llm: LLM requirements source (see LLM_MODES)
+            workers: Ranking processes (1 = in this process)
+            verbose: Print per-query recall and the summary
+
+        Returns:
+            {
+                'queries': n,
+                'metrics': {'recall@10': mean, 'map@10': mean, ...},
+                'per_query': [{'query': ..., 'relevant': n, 'recall@10': ..., ...}],
+                'seconds': {'llm': ..., 'rank': ..., 'total': ...}
+            }
+        """
+        engine = self.recommender
+        if not engine.initialized:
+            engine.initialize()
+        tier = tier or engine.serving_tier
+        ks = sorted(set(ks))
+
+        start = time.perf_counter()
+        queries, relevant = self.labelled_queries()
+        requirements = self.extract_requirements(queries, llm if tier.use_llm else 'none')
+        llm_done = time.perf_counter()
+        rankings = self.rank_queries(queries, requirements, max(ks), tier=tier, workers=workers)
+        rank_done = time.perf_counter()
+
+        metrics, per_query = self._summarize(queries, relevant, rankings, ks)
+
+        if verbose:
+            print(f"\nEvaluating {len(queries)} queries (Recall/MAP/NDCG/MRR @ {', '.join(map(str, ks))})...")
+            self._print_results(metrics, per_query, ks)
+            print(f"\n✅ Evaluated in {rank_done - start:.2f}s (LLM {llm_done - start:.2f}s, "
+                  f"ranking {rank_done - llm_done:.2f}s)\n")
+
+        return {
+            'queries': len(queries),
+            'metrics': metrics,
+            'per_query': per_query,
+            'seconds': {
+                'llm': llm_done - start,
+                'rank': rank_done - llm_done,
+                'total': time.perf_counter() - start
+            }
+        }
+
+    def evaluate_recall_at_k(self, k: int = 10, tier=None, verbose: bool = True) -> float:
         """
         Evaluate Mean Recall@K on training data
-        
+
+        Args:
+            k: Cutoff
+            tier: Optional ServingTier to evaluate (default: the engine's own)
+            verbose: Print per-query recall
+
         Returns:
             Mean recall across all queries
         """
-        if not self.recommender.initialized:
-            self.recommender.initialize()
-        
-        print(f"\nEvaluating Recall@{k}...")
-        
-        train_data = self.recommender.data_loader.train_data
-        train_clean = self.recommender.preprocessor.prepare_train_data(train_data)
-        
-        recalls = []
-        available_urls = set(self.recommender.df_assessments['normalized_url'])
-        
-        for query, group in train_clean.groupby('Query'):
-            ground_truth = group['normalized_url'].tolist()
-            ground_truth_available = [url for url in ground_truth if url in available_urls]
-            
-            if len(ground_truth_available) == 0:
-                continue
-            
-            # Get predictions
-            predicted = self.recommender.recommend(query, top_k=k)
-            predicted_urls = [
-                r['assessment_url'].replace('/solutions/products/', '/products/')
-                for r in predicted
-            ]
-            
-            # Calculate recall
-            found = set(predicted_urls).intersection(set(ground_truth_available))
-            recall = len(found) / len(ground_truth_available)
-            recalls.append(recall)
-            
-            print(f"  Query: {query[:50]}... | Recall: {recall:.3f}")
-        
-        mean_recall = np.mean(recalls)
-        print(f"\n✅ Mean Recall@{k}: {mean_recall:.4f} ({mean_recall*100:.1f}%)\n")
-        
+        mean_recall = self.evaluate(ks=(k,), tier=tier, verbose=verbose)['metrics'][f'recall@{k}']
+        if verbose:
+            print(f"\n✅ Mean Recall@{k}: {mean_recall:.4f} ({mean_recall*100:.1f}%)\n")
         return mean_recall
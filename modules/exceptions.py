@@ -19,6 +19,10 @@ class FeatureExtractionException(SHLRecommenderException):
     """Raised when feature extraction fails"""
     pass
 
+class EmbeddingServiceException(FeatureExtractionException):
+    """Raised when the out-of-process embedding service is unreachable or fails"""
+    pass
+
 class LLMException(SHLRecommenderException):
     """Raised when LLM API call fails"""
     pass
@@ -27,6 +31,18 @@ class RecommendationException(SHLRecommenderException):
     """Raised when recommendation generation fails"""
     pass
 
+class AdmissionRejectedException(RecommendationException):
+    """Raised when a request is shed by admission control (queue full or queue-time budget exceeded)"""
+    
+    def __init__(self, message: str, status_code: int = 503, retry_after: float = 1.0):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 class EvaluationException(SHLRecommenderException):
     """Raised when evaluation fails"""
     pass
+
+class PipelineException(SHLRecommenderException):
+    """Raised when a pipeline is misdeclared (missing inputs, cycles) or a stage returns the wrong outputs"""
+    pass
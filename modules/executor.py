@@ -0,0 +1,261 @@
+"""
+Execution Layer
+Runs the recommend pipeline off the asyncio event loop:
+- LLM extraction (network I/O) is awaited on the async Groq client
+- Encoding, TF-IDF and hybrid scoring (CPU) run on a bounded thread pool
+"""
+import asyncio
+import contextvars
+import functools
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import numpy as np
+from modules import config
+from modules.filters import RecommendationFilters
+from modules.logger import setup_logger
+from modules.metrics import error_counter, stage_timer
+from modules.serving_tiers import ServingTier
+
+logger = setup_logger(__name__)
+
+_RECOMMEND_SECONDS = stage_timer('recommend')
+_ENCODE_WAIT_SECONDS = stage_timer('encode_wait')
+_RECOMMEND_ERRORS = error_counter('recommend')
+
+
+def configure_torch_threads(pool_size: int, num_threads: int = 0, interop_threads: int = 0) -> Optional[int]:
+    """
+    Set torch intra-op/inter-op thread counts for pooled inference
+
+    With N pool workers each running torch ops, leaving torch at its default
+    (one thread per core) oversubscribes the CPU N times over. When
+    num_threads is 0 the cores are split evenly across the pool.
+
+    Returns:
+        Intra-op thread count applied, or None if torch is not loaded
+    """
+    # Only tune torch if this process actually loaded it (it is not imported
+    # at all when encoding goes through the embedding service)
+    torch = sys.modules.get('torch')
+    if torch is None:
+        logger.debug("torch not loaded in this process - skipping thread configuration")
+        return None
+
+    if num_threads <= 0:
+        num_threads = max(1, config.CPU_COUNT // max(1, pool_size))
+
+    torch.set_num_threads(num_threads)
+
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op work has started
+            logger.warning(f"Could not set torch inter-op threads: {e}")
+
+    logger.info(f"torch threads: intra-op={num_threads}, pool workers={pool_size}")
+    return num_threads
+
+
+class ExecutionLayer:
+    """
+    Async front for RecommendationEngine
+
+    The engine itself stays synchronous; this class decides where each
+    stage runs so a slow request never stalls the event loop (and with it
+    /health and every other open connection).
+    """
+
+    def __init__(
+        self,
+        engine,
+        cpu_workers: int = None,
+        torch_threads: int = None,
+        torch_interop_threads: int = None
+    ):
+        self.engine = engine
+        self.cpu_workers = cpu_workers or config.CPU_POOL_SIZE
+        self.cpu_pool = ThreadPoolExecutor(
+            max_workers=self.cpu_workers,
+            thread_name_prefix='shl-cpu'
+        )
+        self.torch_threads = configure_torch_threads(
+            self.cpu_workers,
+            num_threads=config.TORCH_NUM_THREADS if torch_threads is None else torch_threads,
+            interop_threads=config.TORCH_INTEROP_THREADS if torch_interop_threads is None else torch_interop_threads
+        )
+        logger.info(f"ExecutionLayer initialized with {self.cpu_workers} CPU workers")
+
+    async def run_cpu(self, fn, *args, **kwargs):
+        """Run a CPU-bound callable on the bounded pool and await its result"""
+        loop = asyncio.get_running_loop()
+        # Run in the caller's context so a request's StageTrace sees pool-side stages
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.cpu_pool, functools.partial(context.run, fn, *args, **kwargs))
+
+    async def extract_requirements(self, query: str) -> Dict:
+        """I/O stage: LLM requirement extraction without blocking the loop"""
+        start = time.perf_counter()
+        llm_data = await self.engine.llm_client.extract_requirements_async(query)
+        self.engine.tier_selector.observe('llm', time.perf_counter() - start)
+        return llm_data
+
+    async def rank(
+        self,
+        query: str,
+        top_k: int = 10,
+        filters: RecommendationFilters = None,
+        served: Dict = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Async equivalent of RecommendationEngine.rank_with_requirements
+        (LLM extraction included)
+
+        Args:
+            query: Job description or requirements
+            top_k: Number of recommendations to return
+            filters: Final filters (see RecommendationEngine.resolve_filters)
+            served: Optional dict filled with the 'tier' that ranked the
+                request and 'degraded': True when that is below the base
+                tier or the LLM extraction fell back to empty requirements
+
+        Returns:
+            (catalog positions, scores) of the top-k assessments
+        """
+        if not self.engine.initialized:
+            await self.run_cpu(self.engine.initialize)
+
+        start = time.perf_counter()
+        try:
+            tier = self.engine.tier_selector.current()
+            if tier.use_llm:
+                llm_data = await self.extract_requirements(query)
+            else:
+                llm_data = self.engine.llm_client.empty_requirements()
+            if served is not None:
+                served['tier'] = tier.name
+                served['degraded'] = tier.name != self.engine.serving_tier.name or (
+                    tier.use_llm and llm_data == self.engine.llm_client.empty_requirements()
+                )
+            return await self.rank_with_requirements(query, llm_data, top_k=top_k, filters=filters, tier=tier)
+        except Exception:
+            _RECOMMEND_ERRORS.inc()
+            raise
+        finally:
+            _RECOMMEND_SECONDS.observe(time.perf_counter() - start)
+
+    async def rank_with_requirements(
+        self,
+        query: str,
+        llm_data: Dict,
+        top_k: int = 10,
+        filters: RecommendationFilters = None,
+        tier: ServingTier = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """CPU stages of rank for an already extracted (or empty) llm_data"""
+        tier = tier or self.engine.serving_tier
+
+        # With micro-batching on, wait for the query vector without holding
+        # a pool worker so many requests can share one encode call
+        query_embedding = None
+        feature_extractor = self.engine.feature_extractor
+        if tier.use_semantic and feature_extractor.encode_scheduler is not None:
+            start = time.perf_counter()
+            pending = feature_extractor.submit_query_embedding(query, llm_data.get('keywords', []))
+            if pending is not None:
+                query_embedding = await asyncio.wrap_future(pending)
+                waited = time.perf_counter() - start
+                _ENCODE_WAIT_SECONDS.observe(waited)
+                self.engine.tier_selector.observe('semantic', waited)
+
+        return await self.run_cpu(
+            self.engine.rank_with_requirements,
+            query,
+            llm_data,
+            top_k,
+            query_embedding=query_embedding,
+            filters=filters,
+            tier=tier
+        )
+
+    async def rank_progressive(
+        self,
+        query: str,
+        top_k: int = 10,
+        filters: RecommendationFilters = None
+    ) -> AsyncIterator[Tuple[str, np.ndarray, np.ndarray, Dict]]:
+        """
+        Rank twice: a provisional ranking from local signals only (TF-IDF,
+        semantic, training patterns, test types) while the LLM call is in
+        flight, then the final ranking once its requirements arrive
+
+        Yields:
+            (stage, positions, scores, timings_ms) for stage 'provisional'
+            then 'final'; the final ranking is identical to rank()
+        """
+        if not self.engine.initialized:
+            await self.run_cpu(self.engine.initialize)
+
+        start = time.perf_counter()
+        timings = {}
+        tier = self.engine.tier_selector.current()
+        if tier.use_llm:
+            llm_task = asyncio.ensure_future(self.extract_requirements(query))
+        else:
+            # Nothing to wait for: the final ranking is the provisional one
+            llm_task = asyncio.get_running_loop().create_future()
+            llm_task.set_result(self.engine.llm_client.empty_requirements())
+
+        def stamp(name: str, since: float) -> float:
+            now = time.perf_counter()
+            timings[name] = round((now - since) * 1000, 3)
+            return now
+
+        try:
+            indices, scores = await self.rank_with_requirements(
+                query,
+                self.engine.llm_client.empty_requirements(),
+                top_k=top_k,
+                filters=filters,
+                tier=tier
+            )
+            provisional_done = stamp('provisional_ms', start)
+            timings['elapsed_ms'] = timings['provisional_ms']
+            yield 'provisional', indices, scores, dict(timings)
+
+            llm_data = await llm_task
+            llm_done = stamp('llm_ms', start)
+            timings['llm_wait_ms'] = round((llm_done - provisional_done) * 1000, 3)
+
+            if tier.use_llm:
+                indices, scores = await self.rank_with_requirements(
+                    query, llm_data, top_k=top_k, filters=filters, tier=tier
+                )
+            stamp('final_rank_ms', llm_done)
+            stamp('elapsed_ms', start)
+            yield 'final', indices, scores, dict(timings)
+        finally:
+            if not llm_task.done():
+                llm_task.cancel()
+
+    async def recommend(
+        self,
+        query: str,
+        top_k: int = 10,
+        filters: RecommendationFilters = None
+    ) -> List[Dict]:
+        """
+        Async equivalent of RecommendationEngine.recommend
+
+        Returns:
+            List of recommended assessments with scores
+        """
+        indices, scores = await self.rank(query, top_k=top_k, filters=filters)
+        return [self.engine.catalog.record(idx, score) for idx, score in zip(indices, scores)]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool"""
+        self.cpu_pool.shutdown(wait=wait)
+        logger.info("ExecutionLayer shut down")
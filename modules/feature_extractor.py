@@ -2,17 +2,48 @@
 Feature Extractor Module with Logging & Exception Handling
 Handles TF-IDF and semantic embedding generation
 """
+import logging
 import os
+import re
+import time
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import Future
 from typing import List, Tuple
 import pandas as pd
+from modules import config
 from modules.logger import setup_logger
 from modules.exceptions import FeatureExtractionException
+from modules.encode_scheduler import EncodeScheduler
+from modules.embedding_cache import EmbeddingCache
+from modules.metrics import error_counter, stage_timer
 
 logger = setup_logger(__name__)
 
+_ENCODE_SECONDS = stage_timer('encode')
+_TFIDF_SECONDS = stage_timer('tfidf')
+_SEMANTIC_SECONDS = stage_timer('semantic')
+_TFIDF_ERRORS = error_counter('tfidf')
+_SEMANTIC_ERRORS = error_counter('semantic')
+
+def load_sentence_transformer(model_name: str = 'all-MiniLM-L6-v2'):
+    """
+    Load a SentenceTransformer from the local model cache
+    
+    Imported lazily so processes that use the embedding service never
+    pay for importing torch.
+    """
+    from sentence_transformers import SentenceTransformer
+    
+    # Use cached model directory
+    cache_dir = os.path.join(os.getcwd(), '.model_cache')
+    
+    # Load model from cache (already downloaded during deployment)
+    return SentenceTransformer(
+        model_name, 
+        cache_folder=cache_dir
+    )
+
 class FeatureExtractor:
     """
     Responsible for extracting features from assessment data:
@@ -20,11 +51,26 @@ class FeatureExtractor:
     - Semantic embeddings for meaning matching
     """
     
-    def __init__(self):
+    ENCODER_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+    
+    def __init__(self, encoder_backend: str = None):
+        self.encoder_backend = (encoder_backend or config.ENCODER_BACKEND).lower()
+        if self.encoder_backend not in self.ENCODER_BACKENDS:
+            raise FeatureExtractionException(
+                f"Unknown encoder backend '{self.encoder_backend}' (expected one of {self.ENCODER_BACKENDS})"
+            )
         self.tfidf_vectorizer = None
         self.tfidf_matrix = None
         self.embedding_model = None
         self.semantic_embeddings = None
+        self.encode_scheduler = None
+        
+        # Bounded caches: whole query texts and individual keywords/phrases
+        self.query_cache = EmbeddingCache(config.QUERY_CACHE_SIZE)
+        self.phrase_cache = EmbeddingCache(config.PHRASE_CACHE_SIZE)
+        self.keyword_mode = config.SEMANTIC_KEYWORD_MODE
+        self.encode_seconds = 0.0
+        self.encoded_texts = 0
         logger.info("FeatureExtractor initialized")
     
     def build_tfidf_features(
@@ -87,13 +133,71 @@ class FeatureExtractor:
             logger.error(f"TF-IDF feature extraction failed: {e}")
             raise FeatureExtractionException(f"Failed to build TF-IDF: {str(e)}") from e
     
+    def load_embedding_model(self, model_name: str = 'all-MiniLM-L6-v2'):
+        """
+        Load the sentence embedding model
+        
+        When SHL_EMBEDDING_SERVICE_SOCKET is set, connects to the shared
+        embedding worker instead of loading torch in this process.
+        """
+        if config.EMBEDDING_SERVICE_SOCKET:
+            from modules.embedding_service import EmbeddingServiceClient
+            logger.info(f"Using embedding service at {config.EMBEDDING_SERVICE_SOCKET}")
+            self.embedding_model = EmbeddingServiceClient(config.EMBEDDING_SERVICE_SOCKET)
+            return self.embedding_model
+        
+        if self.encoder_backend in ('onnx', 'onnx-int8'):
+            from modules.onnx_encoder import OnnxSentenceEncoder, default_onnx_dir
+            logger.debug(f"Loading ONNX encoder ({self.encoder_backend}) for {model_name}")
+            self.embedding_model = OnnxSentenceEncoder(
+                config.ONNX_MODEL_DIR or default_onnx_dir(model_name),
+                quantized=self.encoder_backend == 'onnx-int8',
+                intra_op_threads=config.TORCH_NUM_THREADS
+            )
+            return self.embedding_model
+        
+        logger.debug(f"Loading embedding model: {model_name}")
+        self.embedding_model = load_sentence_transformer(model_name)
+        return self.embedding_model
+    
+    @staticmethod
+    def build_semantic_texts(assessments_df: pd.DataFrame) -> List[str]:
+        """Rich text representation of each assessment for the sentence encoder"""
+        texts = []
+        for idx, row in assessments_df.iterrows():
+            try:
+                test_type_clean = str(row.get('test_type', '')).replace('|', ', ')
+                remote = "Remote-friendly" if str(row.get('remote_support', '')).lower() == 'yes' else ""
+                adaptive = "Adaptive test" if str(row.get('adaptive_support', '')).lower() == 'yes' else ""
+                duration = f"{row.get('duration', 20)} minutes"
+                
+                text = (
+                    f"{row['name']}. {row['description']}. "
+                    f"Categories: {test_type_clean}. Duration: {duration}. "
+                    f"{remote} {adaptive}"
+                )
+                texts.append(text)
+            except Exception as e:
+                logger.warning(f"Error creating text for assessment {idx}: {e}")
+                texts.append(f"{row.get('name', 'Unknown')}")
+        return texts
+    
     def build_semantic_embeddings(
         self,
         assessments_df: pd.DataFrame,
-        model_name: str = 'all-MiniLM-L6-v2'
+        model_name: str = 'all-MiniLM-L6-v2',
+        batch_size: int = None,
+        processes: int = None
     ) -> np.ndarray:
         """
         Build semantic embeddings using Sentence-BERT
+        
+        Args:
+            assessments_df: Cleaned catalog
+            model_name: Sentence encoder
+            batch_size: Encode batch size (default: SHL_INDEX_ENCODE_BATCH)
+            processes: Encode processes (default: SHL_INDEX_ENCODE_PROCESSES);
+                more than one uses a sentence-transformers process pool
         """
         try:
             logger.info(f"Building semantic embeddings (model={model_name})...")
@@ -103,42 +207,26 @@ class FeatureExtractor:
             
             # Initialize model from cache
             if self.embedding_model is None:
-                logger.debug(f"Loading embedding model: {model_name}")
-                
-                # Use cached model directory
-                cache_dir = os.path.join(os.getcwd(), '.model_cache')
-                
-                # Load model from cache (already downloaded during deployment)
-                self.embedding_model = SentenceTransformer(
-                    model_name, 
-                    cache_folder=cache_dir
-                )
+                self.load_embedding_model(model_name)
             
             # Create rich text representations
-            texts = []
-            for idx, row in assessments_df.iterrows():
-                try:
-                    test_type_clean = str(row.get('test_type', '')).replace('|', ', ')
-                    remote = "Remote-friendly" if str(row.get('remote_support', '')).lower() == 'yes' else ""
-                    adaptive = "Adaptive test" if str(row.get('adaptive_support', '')).lower() == 'yes' else ""
-                    duration = f"{row.get('duration', 20)} minutes"
-                    
-                    text = (
-                        f"{row['name']}. {row['description']}. "
-                        f"Categories: {test_type_clean}. Duration: {duration}. "
-                        f"{remote} {adaptive}"
-                    )
-                    texts.append(text)
-                except Exception as e:
-                    logger.warning(f"Error creating text for assessment {idx}: {e}")
-                    texts.append(f"{row.get('name', 'Unknown')}")
+            texts = self.build_semantic_texts(assessments_df)
             
             # Generate embeddings
-            logger.debug(f"Encoding {len(texts)} texts...")
-            self.semantic_embeddings = self.embedding_model.encode(
-                texts,
-                show_progress_bar=False
-            )
+            batch_size = batch_size or config.INDEX_ENCODE_BATCH
+            processes = config.INDEX_ENCODE_PROCESSES if processes is None else processes
+            start = time.perf_counter()
+            if processes > 1 and len(texts) > batch_size * processes:
+                self.semantic_embeddings = self._encode_with_pool(texts, batch_size, processes)
+            else:
+                logger.debug(f"Encoding {len(texts)} texts (batch_size={batch_size})...")
+                self.semantic_embeddings = self.embedding_model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    show_progress_bar=False
+                )
+            seconds = time.perf_counter() - start
+            logger.info(f"Encoded {len(texts)} assessments in {seconds:.2f}s ({len(texts) / max(seconds, 1e-9):.0f}/s)")
             
             logger.info(f"✅ Semantic embeddings shape: {self.semantic_embeddings.shape}")
             return self.semantic_embeddings
@@ -148,53 +236,325 @@ class FeatureExtractor:
             logger.error(f"Semantic embedding generation failed: {e}")
             raise FeatureExtractionException(f"Failed to build embeddings: {str(e)}") from e
     
-    def get_query_tfidf_scores(self, query: str) -> np.ndarray:
-        """Compute TF-IDF similarity scores for a query"""
+    def _encode_with_pool(self, texts: List[str], batch_size: int, processes: int) -> np.ndarray:
+        """
+        Encode the catalog in a sentence-transformers multi-process pool
+        
+        Each worker gets an equal share of the CPUs (torch would otherwise
+        start CPU_COUNT threads per process). Encoders without pool support
+        (ONNX, the embedding service) encode in this process instead.
+        """
+        model = self.embedding_model
+        if not hasattr(model, 'start_multi_process_pool'):
+            logger.warning(f"{type(model).__name__} has no process pool; encoding in-process")
+            return model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+        
+        threads = str(max(1, config.CPU_COUNT // processes))
+        saved = {name: os.environ.get(name) for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS')}
+        os.environ.update({name: threads for name in saved})
+        try:
+            pool = model.start_multi_process_pool(['cpu'] * processes)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        try:
+            logger.debug(f"Encoding {len(texts)} texts in {processes} processes (batch_size={batch_size})...")
+            return model.encode_multi_process(texts, pool, batch_size=batch_size)
+        finally:
+            model.stop_multi_process_pool(pool)
+    
+    def get_query_tfidf_scores(self, query: str, indices: np.ndarray = None) -> np.ndarray:
+        """
+        Compute TF-IDF similarity scores for a query
+        
+        Args:
+            query: Query text
+            indices: Optional catalog positions to score (others are skipped)
+        """
+        start = time.perf_counter()
         try:
             if self.tfidf_vectorizer is None or self.tfidf_matrix is None:
                 raise FeatureExtractionException("TF-IDF not initialized. Call build_tfidf_features first.")
             
-            logger.debug(f"Computing TF-IDF scores for query: {query[:50]}...")
+            logger.debug("Computing TF-IDF scores for query: %.50s...", query)
             query_vec = self.tfidf_vectorizer.transform([query])
+            matrix = self.tfidf_matrix if indices is None else self.tfidf_matrix[indices]
             
             from sklearn.metrics.pairwise import cosine_similarity
-            scores = cosine_similarity(query_vec, self.tfidf_matrix)[0]
+            scores = cosine_similarity(query_vec, matrix)[0]
             
-            logger.debug(f"TF-IDF scores computed (max: {scores.max():.3f})")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("TF-IDF scores computed (max: %.3f)", scores.max())
+            _TFIDF_SECONDS.observe(time.perf_counter() - start)
             return scores
             
         except FeatureExtractionException:
+            _TFIDF_ERRORS.inc()
             raise
         except Exception as e:
-            logger.error(f"TF-IDF scoring failed: {e}")
+            logger.error("TF-IDF scoring failed: %s", e)
+            _TFIDF_ERRORS.inc()
             raise FeatureExtractionException(f"Failed to compute TF-IDF scores: {str(e)}") from e
     
-    def get_query_semantic_scores(self, query: str) -> np.ndarray:
-        """Compute semantic similarity scores for a query"""
+    def enable_encode_batching(self, max_batch_size: int = 32, max_wait_ms: float = 2.0) -> None:
+        """
+        Route query encodes through an EncodeScheduler so concurrent
+        requests share one encode call instead of each running a batch of one
+        """
+        if self.embedding_model is None:
+            logger.info("No embedding model loaded - encode batching not enabled")
+            return
+        if self.encode_scheduler is not None:
+            self.encode_scheduler.close()
+        self.encode_scheduler = EncodeScheduler(
+            self._encode_texts,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+    
+    def disable_encode_batching(self) -> None:
+        """Stop the scheduler and go back to direct per-query encodes"""
+        if self.encode_scheduler is not None:
+            self.encode_scheduler.close()
+            self.encode_scheduler = None
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of query texts in a single model call"""
+        start = time.perf_counter()
+        vectors = self.embedding_model.encode(
+            texts,
+            batch_size=max(1, len(texts)),
+            show_progress_bar=False
+        )
+        elapsed = time.perf_counter() - start
+        _ENCODE_SECONDS.observe(elapsed)
+        self.encode_seconds += elapsed
+        self.encoded_texts += len(texts)
+        return vectors
+    
+    def submit_query_encode(self, query: str) -> Future:
+        """
+        Start encoding a query and return a future for its vector
+        
+        With batching enabled this does not occupy the calling thread while
+        the batch fills, so async callers can await it via asyncio.wrap_future.
+        """
+        future = Future()
+        cached = self.query_cache.get(query)
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        
+        if self.encode_scheduler is not None:
+            pending = self.encode_scheduler.submit(query)
+            
+            def _store(done: Future):
+                if not done.cancelled() and done.exception() is None:
+                    self.query_cache.put(query, done.result())
+            
+            pending.add_done_callback(_store)
+            return pending
+        
+        try:
+            vector = self._encode_texts([query])[0]
+            self.query_cache.put(query, vector)
+            future.set_result(vector)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def submit_query_embedding(self, query: str, keywords: List[str] = None):
+        """
+        Future for the semantic query embedding, or None if it has to be
+        composed on a worker thread (keyword 'compose' mode)
+        """
+        if keywords is not None and self.keyword_mode == 'compose':
+            return None
+        return self.submit_query_encode(self.semantic_query_text(query, keywords))
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """Encode a single query (cached, and batched across callers when enabled)"""
+        cached = self.query_cache.get(query)
+        if cached is not None:
+            return cached
+        
+        if self.encode_scheduler is not None:
+            vector = self.encode_scheduler.encode(query)
+        else:
+            vector = self._encode_texts([query])[0]
+        self.query_cache.put(query, vector)
+        return vector
+
+    def encode_queries(self, queries: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Encode many queries at once (offline evaluation): cache misses are
+        encoded in batches of batch_size, then stored in the query cache
+        """
+        vectors = [self.query_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(q for q, v in zip(queries, vectors) if v is None))
+        encoded = {}
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            encoded.update(zip(batch, self._encode_texts(batch)))
+        for query, vector in encoded.items():
+            self.query_cache.put(query, vector)
+        vectors = [v if v is not None else encoded[q] for q, v in zip(queries, vectors)]
+        return np.vstack(vectors) if vectors else np.zeros((0, self.semantic_embeddings.shape[1]))
+
+    @staticmethod
+    def _phrase_key(phrase: str) -> str:
+        return ' '.join(str(phrase).lower().split())
+    
+    def encode_phrases(self, phrases: List[str]) -> np.ndarray:
+        """
+        Encode short keywords/phrases through the phrase cache
+        
+        Misses are encoded together in one call.
+        """
+        keys = [self._phrase_key(p) for p in phrases]
+        vectors = [self.phrase_cache.get(k) for k in keys]
+        
+        missing = list(dict.fromkeys(k for k, v in zip(keys, vectors) if v is None))
+        if missing:
+            encoded = dict(zip(missing, self._encode_texts(missing)))
+            for key, vector in encoded.items():
+                self.phrase_cache.put(key, vector)
+            vectors = [v if v is not None else encoded[k] for k, v in zip(keys, vectors)]
+        
+        return np.vstack(vectors) if vectors else np.zeros((0, self.semantic_embeddings.shape[1]))
+    
+    @staticmethod
+    def semantic_query_text(query: str, keywords: List[str] = None) -> str:
+        """Text encoded for the query in 'concat' mode (same as the enhanced query)"""
+        if keywords is None:
+            return query
+        return f"{query} {' '.join(keywords)}"
+    
+    def embed_query(self, query: str, keywords: List[str] = None) -> np.ndarray:
+        """
+        Query embedding used for semantic scoring
+        
+        'concat' mode encodes query + keywords as one text (cached per
+        enhanced query). 'compose' mode encodes the base query and each
+        keyword separately (both cached) and combines the unit vectors, so
+        a new query only costs one encode and repeated keywords cost none.
+        """
+        if keywords is None or self.keyword_mode != 'compose':
+            return self.encode_query(self.semantic_query_text(query, keywords))
+        
+        query_vec = np.asarray(self.encode_query(query), dtype=np.float32)
+        query_vec = query_vec / max(np.linalg.norm(query_vec), 1e-12)
+        keywords = [k for k in keywords if str(k).strip()]
+        if not keywords:
+            return query_vec
+        
+        keyword_vecs = self.encode_phrases(keywords).astype(np.float32)
+        keyword_vecs /= np.clip(np.linalg.norm(keyword_vecs, axis=1, keepdims=True), 1e-12, None)
+        composed = query_vec + config.SEMANTIC_KEYWORD_WEIGHT * keyword_vecs.mean(axis=0)
+        return composed / max(np.linalg.norm(composed), 1e-12)
+    
+    @staticmethod
+    def extract_skill_vocabulary(assessments_df: pd.DataFrame) -> List[str]:
+        """
+        Skill phrases found in the catalog: assessment names (without
+        version/level suffixes), their individual terms and the test types
+        """
+        vocabulary = set()
+        for name in assessments_df['name'].dropna().astype(str):
+            clean = re.sub(r'\([^)]*\)', ' ', name).lower()
+            clean = ' '.join(clean.replace('-', ' ').split())
+            if clean:
+                vocabulary.add(clean)
+            for term in re.findall(r'[a-z][a-z0-9+#.]+', clean):
+                if len(term) > 1:
+                    vocabulary.add(term.rstrip('.'))
+        
+        if 'test_type' in assessments_df.columns:
+            for types in assessments_df['test_type'].dropna().astype(str):
+                vocabulary.update(t.strip().lower() for t in types.split('|') if t.strip())
+        
+        return sorted(v for v in vocabulary if v)
+    
+    def precompute_vocabulary_embeddings(self, assessments_df: pd.DataFrame, batch_size: int = 256) -> int:
+        """
+        Encode the catalog's whole skill vocabulary into the phrase cache
+        (pinned, never evicted) so LLM keywords that match it cost nothing
+        
+        Returns:
+            Number of phrases precomputed
+        """
+        if self.embedding_model is None:
+            logger.info("No embedding model loaded - skipping vocabulary precompute")
+            return 0
+        
+        vocabulary = self.extract_skill_vocabulary(assessments_df)
+        logger.info(f"Precomputing embeddings for {len(vocabulary)} vocabulary phrases...")
+        vectors = self.embedding_model.encode(vocabulary, batch_size=batch_size, show_progress_bar=False)
+        for phrase, vector in zip(vocabulary, vectors):
+            self.phrase_cache.pin(phrase, vector)
+        
+        logger.info(f"✅ Pinned {len(vocabulary)} vocabulary embeddings")
+        return len(vocabulary)
+    
+    def cache_stats(self) -> dict:
+        """Hit rates of the embedding caches and the encoder time they saved"""
+        seconds_per_text = (self.encode_seconds / self.encoded_texts) if self.encoded_texts else 0.0
+        stats = {'keyword_mode': self.keyword_mode}
+        for name, cache in (('query_cache', self.query_cache), ('phrase_cache', self.phrase_cache)):
+            cache_stats = cache.stats()
+            cache_stats['encoder_seconds_saved'] = cache_stats['hits'] * seconds_per_text
+            stats[name] = cache_stats
+        stats['encoder_seconds'] = self.encode_seconds
+        stats['encoded_texts'] = self.encoded_texts
+        if self.encode_scheduler is not None:
+            stats['batching'] = self.encode_scheduler.stats()
+        return stats
+    
+    def get_query_semantic_scores(
+        self,
+        query: str,
+        query_embedding: np.ndarray = None,
+        keywords: List[str] = None,
+        indices: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Compute semantic similarity scores for a query
+        
+        Args:
+            query: Query text
+            query_embedding: Optional precomputed embedding (see embed_query)
+            keywords: Optional LLM keywords to fold into the query embedding
+            indices: Optional catalog positions to score (others are skipped)
+        """
+        start = time.perf_counter()
         try:
             # Check if semantic embeddings exist
             if self.semantic_embeddings is None:
                 raise FeatureExtractionException("Embeddings not initialized. Call build_semantic_embeddings first.")
             
-            # Handle LOW_MEMORY mode (embedding_model is None, embeddings are zeros)
-            if self.embedding_model is None:
-                logger.debug("LOW_MEMORY mode: returning zero semantic scores")
-                # Return all zeros (semantic matching disabled)
-                num_assessments = self.semantic_embeddings.shape[0]
-                return np.zeros(num_assessments)
-            
-            # Normal mode: compute actual semantic similarity
-            logger.debug(f"Computing semantic scores for query: {query[:50]}...")
-            query_emb = self.embedding_model.encode([query])
+            # Serving without the embedding model is a serving tier
+            # decision (see serving_tiers); the engine skips this call then
+            logger.debug("Computing semantic scores for query: %.50s...", query)
+            if query_embedding is None:
+                query_embedding = self.embed_query(query, keywords)
+            query_emb = np.asarray(query_embedding).reshape(1, -1)
+            embeddings = self.semantic_embeddings if indices is None else self.semantic_embeddings[indices]
             
             from sklearn.metrics.pairwise import cosine_similarity
-            scores = cosine_similarity(query_emb, self.semantic_embeddings)[0]
+            scores = cosine_similarity(query_emb, embeddings)[0]
             
-            logger.debug(f"Semantic scores computed (max: {scores.max():.3f})")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Semantic scores computed (max: %.3f)", scores.max())
+            _SEMANTIC_SECONDS.observe(time.perf_counter() - start)
             return scores
             
         except FeatureExtractionException:
+            _SEMANTIC_ERRORS.inc()
             raise
         except Exception as e:
-            logger.error(f"Semantic scoring failed: {e}")
+            logger.error("Semantic scoring failed: %s", e)
+            _SEMANTIC_ERRORS.inc()
             raise FeatureExtractionException(f"Failed to compute semantic scores: {str(e)}") from e
@@ -0,0 +1,282 @@
+"""
+Recommendation Filters
+Structured constraints (duration, remote, adaptive, test type) evaluated as
+catalog bitmaps before any scoring happens
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from modules.catalog import KNOWN_TEST_TYPES, CompactCatalog
+from modules.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# SHL single-letter codes and common wording for each test type
+TEST_TYPE_CODES = {
+    'A': 'Ability & Aptitude',
+    'B': 'Biodata & Situational Judgement',
+    'C': 'Competencies',
+    'D': 'Development & 360',
+    'E': 'Assessment Exercises',
+    'K': 'Knowledge & Skills',
+    'P': 'Personality & Behavior',
+    'S': 'Simulations',
+}
+
+TEST_TYPE_TERMS = {
+    'personality': 'Personality & Behavior',
+    'behavioral': 'Personality & Behavior',
+    'behavioural': 'Personality & Behavior',
+    'behavior': 'Personality & Behavior',
+    'behaviour': 'Personality & Behavior',
+    'cognitive': 'Ability & Aptitude',
+    'aptitude': 'Ability & Aptitude',
+    'reasoning': 'Ability & Aptitude',
+    'numerical': 'Ability & Aptitude',
+    'verbal': 'Ability & Aptitude',
+    'knowledge': 'Knowledge & Skills',
+    'technical': 'Knowledge & Skills',
+    'situational': 'Biodata & Situational Judgement',
+    'sjt': 'Biodata & Situational Judgement',
+    'biodata': 'Biodata & Situational Judgement',
+    'competency': 'Competencies',
+    'competencies': 'Competencies',
+    'simulation': 'Simulations',
+    'simulations': 'Simulations',
+    '360': 'Development & 360',
+    'exercise': 'Assessment Exercises',
+    'exercises': 'Assessment Exercises',
+}
+
+_TYPE_TERM_PATTERN = '|'.join(sorted((re.escape(t) for t in TEST_TYPE_TERMS), key=len, reverse=True))
+# Query wording only becomes a filter when it is about the tests themselves
+# ("no personality tests", "remote testing"), not the job ("without
+# technical background", "remote sensing analyst")
+_TEST_NOUN = r'(?:tests?|testing|assessments?)'
+_ONLY_PATTERNS = (
+    re.compile(rf'\b({_TYPE_TERM_PATTERN})\b(?:\s+{_TEST_NOUN})?\s+only\b'),
+    re.compile(rf'(?<!not )\bonly\s+(?:\w+\s+)?({_TYPE_TERM_PATTERN})\s+{_TEST_NOUN}\b'),
+)
+_EXCLUDE_PATTERN = re.compile(
+    rf'\b(?:no|without|exclude|excluding|except)\s+(?:\w+\s+)?({_TYPE_TERM_PATTERN})\s+{_TEST_NOUN}\b'
+)
+
+_DURATION_PATTERN = re.compile(
+    r'\b(?P<num>\d+(?:\.\d+)?|an?|one|half an?)\s*-?\s*(?P<unit>hours?|hrs?|minutes?|mins?)\b'
+)
+_MIN_CONTEXT = re.compile(r'(?:at least|more than|over|longer than|minimum|min\.?|no less than)\s*$')
+_NEGATED_MIN_CONTEXT = re.compile(r'\b(?:not|no)\s+(?:be\s+)?(?:more|longer)\s+than\s*$')
+_REMOTE = re.compile(
+    rf'\bremote(?:ly)?[\s-]+(?:(?:proctored|administered|delivered)\s+)?{_TEST_NOUN}\b'
+    rf'|\b(?:{_TEST_NOUN}|taken|completed?|administered|delivered)\s+remotely\b'
+)
+_NEGATED_REMOTE = re.compile(rf'\b(?:(?:not|non|no)[\s-]+remote|on[\s-]?site|in[\s-]person)[\s-]+{_TEST_NOUN}\b')
+_ADAPTIVE = re.compile(rf'\badaptive(?:/irt)?[\s-]+{_TEST_NOUN}\b')
+_NEGATED_ADAPTIVE = re.compile(rf'\b(?:not|non|no)[\s-]+adaptive(?:/irt)?[\s-]+{_TEST_NOUN}\b')
+
+
+def normalize_test_type(label: str) -> Optional[str]:
+    """Map a code ('P'), a canonical label or a common term to the canonical label"""
+    if label is None:
+        return None
+    text = str(label).strip()
+    if not text:
+        return None
+    if text.upper() in TEST_TYPE_CODES:
+        return TEST_TYPE_CODES[text.upper()]
+    for known in KNOWN_TEST_TYPES:
+        if text.lower() == known.lower():
+            return known
+    return TEST_TYPE_TERMS.get(text.lower(), text)
+
+
+def validate_test_types(labels: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Reject explicit test type filters that name no known type (e.g. a typo),
+    which would otherwise match nothing and silently empty the result
+
+    Raises:
+        ValueError: listing the unknown labels and what is accepted
+    """
+    if not labels:
+        return labels
+    unknown = [label for label in labels if normalize_test_type(label) not in KNOWN_TEST_TYPES]
+    if unknown:
+        raise ValueError(
+            f"Unknown test type(s) {unknown}: use one of {list(KNOWN_TEST_TYPES)}, "
+            f"the codes {'/'.join(TEST_TYPE_CODES)} or a term such as 'personality' or 'cognitive'"
+        )
+    return labels
+
+
+class RecommendationFilters:
+    """
+    Hard constraints applied to the catalog before scoring
+
+    Any field left as None is unconstrained.
+    """
+
+    FIELDS = ('max_duration', 'min_duration', 'remote', 'adaptive', 'include_types', 'exclude_types')
+
+    def __init__(
+        self,
+        max_duration: int = None,
+        min_duration: int = None,
+        remote: bool = None,
+        adaptive: bool = None,
+        include_types: Iterable[str] = None,
+        exclude_types: Iterable[str] = None
+    ):
+        self.max_duration = max_duration
+        self.min_duration = min_duration
+        self.remote = remote
+        self.adaptive = adaptive
+        self.include_types = self._normalize_types(include_types)
+        self.exclude_types = self._normalize_types(exclude_types)
+        # Fields taken from the query text rather than set by the caller
+        self.inferred = frozenset()
+
+    @staticmethod
+    def _normalize_types(labels) -> Optional[List[str]]:
+        if not labels:
+            return None
+        normalized = [normalize_test_type(label) for label in labels]
+        return list(dict.fromkeys(label for label in normalized if label)) or None
+
+    def is_empty(self) -> bool:
+        return all(getattr(self, field) is None for field in self.FIELDS)
+
+    def merged_with(self, fallback: 'RecommendationFilters') -> 'RecommendationFilters':
+        """Explicit values from self win; unset fields are taken from fallback"""
+        merged = RecommendationFilters()
+        inferred = set()
+        for field in self.FIELDS:
+            source = self if getattr(self, field) is not None else fallback
+            setattr(merged, field, getattr(source, field))
+            if field in source.inferred:
+                inferred.add(field)
+        merged.inferred = frozenset(inferred)
+        return merged
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+
+    def cache_key(self) -> tuple:
+        """Hashable canonical form (for response/ranking caches)"""
+        return tuple(
+            tuple(sorted(value)) if isinstance(value, list) else value
+            for value in (getattr(self, field) for field in self.FIELDS)
+        ) + (tuple(sorted(self.inferred)),)
+
+    def __repr__(self) -> str:
+        return f"RecommendationFilters({self.to_dict()})"
+
+    @classmethod
+    def from_query(cls, query: str) -> 'RecommendationFilters':
+        """
+        Extract constraints stated in the query text, e.g.
+        "remote testing, under 40 minutes, personality only"
+
+        Durations only produce a maximum unless phrased as a minimum
+        ("at least 20 minutes"); ranges ("1-2 hours") use their upper end.
+        Remote, adaptive and excluded types need a test noun next to them
+        ("no personality tests"). Every extracted field is marked inferred,
+        so build_candidate_mask can drop it rather than match nothing.
+        """
+        text = str(query).lower()
+        filters = cls()
+
+        for match in _DURATION_PATTERN.finditer(text):
+            raw = match.group('num')
+            if raw in ('a', 'an', 'one'):
+                amount = 1.0
+            elif raw.startswith('half'):
+                amount = 0.5
+            else:
+                amount = float(raw)
+            minutes = int(round(amount * 60)) if match.group('unit').startswith(('hour', 'hr')) else int(round(amount))
+            if minutes <= 0:
+                continue
+
+            context = text[max(0, match.start() - 30):match.start()]
+            if _MIN_CONTEXT.search(context) and not _NEGATED_MIN_CONTEXT.search(context):
+                filters.min_duration = max(filters.min_duration or 0, minutes)
+            else:
+                filters.max_duration = max(filters.max_duration or 0, minutes)
+
+        if _NEGATED_REMOTE.search(text):
+            filters.remote = False
+        elif _REMOTE.search(text):
+            filters.remote = True
+
+        if _NEGATED_ADAPTIVE.search(text):
+            filters.adaptive = False
+        elif _ADAPTIVE.search(text):
+            filters.adaptive = True
+
+        include = []
+        for pattern in _ONLY_PATTERNS:
+            include.extend(TEST_TYPE_TERMS[m.group(1)] for m in pattern.finditer(text))
+        exclude = [TEST_TYPE_TERMS[m.group(1)] for m in _EXCLUDE_PATTERN.finditer(text)]
+        filters.include_types = cls._normalize_types(include)
+        filters.exclude_types = cls._normalize_types([t for t in exclude if t not in include])
+
+        filters.inferred = frozenset(filters.to_dict())
+        return filters
+
+
+def _field_mask(catalog: CompactCatalog, field: str, value) -> np.ndarray:
+    """Catalog bitmap of one filter field"""
+    if field == 'max_duration':
+        return catalog.duration_bitmap('<=', int(value))
+    if field == 'min_duration':
+        return catalog.duration_bitmap('>=', int(value))
+    if field == 'remote':
+        return catalog.remote if value else ~catalog.remote
+    if field == 'adaptive':
+        return catalog.adaptive if value else ~catalog.adaptive
+    if field == 'include_types':
+        # Assessment must cover at least one of the requested types
+        return (catalog.test_type_mask & catalog.type_mask(value)) != 0
+    return (catalog.test_type_mask & catalog.type_mask(value)) == 0
+
+
+def build_candidate_mask(catalog: CompactCatalog, filters: Optional[RecommendationFilters]) -> Optional[np.ndarray]:
+    """
+    Intersect the catalog bitmaps selected by filters
+
+    Explicit fields always apply. Query-inferred fields are soft: they are
+    added one at a time (in FIELDS order) and any field that would leave
+    no candidates is dropped, so the satisfiable ones still narrow.
+
+    Returns:
+        Boolean mask over the catalog, or None when nothing is filtered
+    """
+    if filters is None or filters.is_empty():
+        return None
+
+    mask = np.ones(catalog.size, dtype=bool)
+    applied = False
+    inferred = []
+    for field in RecommendationFilters.FIELDS:
+        value = getattr(filters, field)
+        if value is None:
+            continue
+        if field in filters.inferred:
+            inferred.append(field)
+        else:
+            mask &= _field_mask(catalog, field, value)
+            applied = True
+
+    dropped = []
+    for field in inferred:
+        narrowed = mask & _field_mask(catalog, field, getattr(filters, field))
+        if narrowed.any():
+            mask = narrowed
+            applied = True
+        else:
+            dropped.append(field)
+    if dropped:
+        logger.info(f"Query filters {dropped} would match nothing; ignoring them")
+
+    return mask if applied else None
@@ -3,37 +3,144 @@ LLM Client Module with Logging & Exception Handling
 Handles all LLM interactions for query understanding
 """
 import json
-from groq import Groq
-from typing import Dict
+from groq import Groq, AsyncGroq
+from typing import Dict, List
 from dotenv import load_dotenv
 import os
 from modules.logger import setup_logger
 from modules.exceptions import LLMException
+from modules.metrics import llm_event, stage_timer
 
 load_dotenv()
 logger = setup_logger(__name__)
 
+_LLM_SECONDS = stage_timer('llm')
+_LLM_CALL_SECONDS = stage_timer('llm_call')
+_LLM_SUCCESS = llm_event('success')
+_LLM_RETRY = llm_event('retry')
+_LLM_FALLBACK = llm_event('fallback')
+_LLM_UNAVAILABLE = llm_event('unavailable')
+_LLM_JSON_ERROR = llm_event('json_error')
+_LLM_API_ERROR = llm_event('api_error')
+
 class LLMClient:
     """
     Responsible for LLM-based query understanding
     Extracts skills, keywords, and role information
     """
     
-    def __init__(self, api_key: str = None, model: str = "llama-3.3-70b-versatile"):
+    def __init__(self, api_key: str = None, model: str = "llama-3.3-70b-versatile", base_url: str = None):
         self.api_key = api_key or os.getenv('GROQ_API_KEY')
         self.model = model
+        # Point at another chat-completions server, e.g. the load-test stub
+        self.base_url = base_url or os.getenv('GROQ_BASE_URL') or None
         
         if not self.api_key:
             logger.warning("GROQ_API_KEY not set - LLM functionality will be limited")
         else:
             logger.info(f"LLMClient initialized with model: {model}")
+            if self.base_url:
+                logger.info(f"LLM requests go to {self.base_url}")
         
         try:
-            self.client = Groq(api_key=self.api_key) if self.api_key else None
+            self.client = Groq(api_key=self.api_key, base_url=self.base_url) if self.api_key else None
+            self.async_client = AsyncGroq(api_key=self.api_key, base_url=self.base_url) if self.api_key else None
         except Exception as e:
             logger.error(f"Failed to initialize Groq client: {e}")
             raise LLMException(f"Groq client initialization failed: {str(e)}") from e
     
+    @staticmethod
+    def empty_requirements() -> Dict:
+        """Fallback requirements when the LLM is unavailable or fails"""
+        return {
+            "technical_skills": [],
+            "soft_skills": [],
+            "role_type": "unknown",
+            "keywords": []
+        }
+    
+    def _build_messages(self, query: str) -> List[Dict]:
+        """Build chat messages for requirement extraction"""
+        prompt = f"""Extract from job query. Return ONLY valid JSON:
+
+Query: "{query}"
+
+{{
+    "technical_skills": ["skill1", "skill2"],
+    "soft_skills": ["skill1", "skill2"],
+    "role_type": "developer/analyst/manager/sales/etc",
+    "keywords": ["key1", "key2"]
+}}
+
+JSON:"""
+        return [
+            {
+                "role": "system",
+                "content": "Extract requirements from job queries. Return only JSON."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    def _completion_request(self, query: str) -> Dict:
+        """Chat completion arguments, shared by the sync and async clients"""
+        return {
+            'model': self.model,
+            'messages': self._build_messages(query),
+            'temperature': 0,
+            'max_tokens': 500
+        }
+    
+    @staticmethod
+    def _parse_response(text: str) -> Dict:
+        """Parse model output into a requirements dict (raises JSONDecodeError)"""
+        text = text.strip()
+        
+        # Clean JSON from markdown
+        if '```json' in text:
+            text = text.split('```json')[1].split('```')[0].strip()
+        elif '```' in text:
+            text = text.split('```')[1].split('```')[0].strip()
+        
+        return json.loads(text)
+    
+    def _handle_response(self, response) -> Dict:
+        """Requirements from a completion (raises JSONDecodeError for a retry)"""
+        result = self._parse_response(response.choices[0].message.content)
+        logger.info("✅ LLM extraction successful: %d technical, %d soft skills",
+                    len(result.get('technical_skills', [])), len(result.get('soft_skills', [])))
+        _LLM_SUCCESS.inc()
+        return result
+    
+    def _should_retry(self, error: Exception, attempt: int, max_retries: int) -> bool:
+        """
+        Retry policy: log and count a failed attempt, then decide whether
+        another attempt is allowed (False = give up and fall back)
+        """
+        if isinstance(error, json.JSONDecodeError):
+            logger.warning("JSON parse error (attempt %d): %s", attempt + 1, error)
+            _LLM_JSON_ERROR.inc()
+        else:
+            logger.error("LLM API error (attempt %d): %s", attempt + 1, error)
+            _LLM_API_ERROR.inc()
+        
+        if attempt < max_retries:
+            _LLM_RETRY.inc()
+            return True
+        logger.warning("All LLM attempts failed - falling back to empty requirements")
+        return False
+    
+    def _fallback(self) -> Dict:
+        _LLM_FALLBACK.inc()
+        return self.empty_requirements()
+    
+    def _unavailable(self) -> Dict:
+        logger.warning("LLM client not available - returning empty requirements")
+        _LLM_UNAVAILABLE.inc()
+        return self.empty_requirements()
+    
     def extract_requirements(self, query: str, max_retries: int = 2) -> Dict:
         """
         Extract structured information from natural language query
@@ -51,91 +158,51 @@ class LLMClient:
             }
         """
         if not self.client:
-            logger.warning("LLM client not available - returning empty requirements")
-            return {
-                "technical_skills": [],
-                "soft_skills": [],
-                "role_type": "unknown",
-                "keywords": []
-            }
-        
-        prompt = f"""Extract from job query. Return ONLY valid JSON:
+            return self._unavailable()
 
-Query: "{query}"
+        with _LLM_SECONDS.time():
+            return self._extract_with_retries(query, max_retries)
 
-{{
-    "technical_skills": ["skill1", "skill2"],
-    "soft_skills": ["skill1", "skill2"],
-    "role_type": "developer/analyst/manager/sales/etc",
-    "keywords": ["key1", "key2"]
-}}
+    def _extract_with_retries(self, query: str, max_retries: int) -> Dict:
+        request = self._completion_request(query)
 
-JSON:"""
-        
         for attempt in range(max_retries + 1):
+            logger.debug("LLM extraction attempt %d/%d for query: %.50s...", attempt + 1, max_retries + 1, query)
             try:
-                logger.debug(f"LLM extraction attempt {attempt + 1}/{max_retries + 1} for query: {query[:50]}...")
-                
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "Extract requirements from job queries. Return only JSON."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0,
-                    max_tokens=500
-                )
-                
-                text = response.choices[0].message.content.strip()
-                
-                # Clean JSON from markdown
-                if '```json' in text:
-                    text = text.split('```json')[1].split('```')[0].strip()
-                elif '```' in text:
-                    text = text.split('```')[1].split('```')[0].strip()
-                
-                result = json.loads(text)
-                logger.info(f"✅ LLM extraction successful: {len(result.get('technical_skills', []))} technical, "
-                           f"{len(result.get('soft_skills', []))} soft skills")
-                
-                return result
-                
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSON parse error (attempt {attempt + 1}): {e}")
-                if attempt < max_retries:
-                    continue
-                else:
-                    logger.error("All retry attempts failed - returning empty requirements")
-                    return {
-                        "technical_skills": [],
-                        "soft_skills": [],
-                        "role_type": "unknown",
-                        "keywords": []
-                    }
-            
+                with _LLM_CALL_SECONDS.time():
+                    response = self.client.chat.completions.create(**request)
+                return self._handle_response(response)
             except Exception as e:
-                logger.error(f"LLM API error (attempt {attempt + 1}): {e}")
-                if attempt < max_retries:
-                    continue
-                else:
-                    logger.warning("LLM extraction failed - falling back to empty requirements")
-                    return {
-                        "technical_skills": [],
-                        "soft_skills": [],
-                        "role_type": "unknown",
-                        "keywords": []
-                    }
+                if not self._should_retry(e, attempt, max_retries):
+                    break
+
+        return self._fallback()
+    
+    async def extract_requirements_async(self, query: str, max_retries: int = 2) -> Dict:
+        """
+        Non-blocking variant of extract_requirements for the API event loop
         
-        # Should never reach here, but just in case
-        return {
-            "technical_skills": [],
-            "soft_skills": [],
-            "role_type": "unknown",
-            "keywords": []
-        }
+        Uses the async Groq client so the HTTP round trip never holds a
+        worker thread; only the transport call differs, the prompt, parsing
+        and retry policy are shared.
+        """
+        if not self.async_client:
+            return self._unavailable()
+
+        with _LLM_SECONDS.time():
+            return await self._extract_with_retries_async(query, max_retries)
+
+    async def _extract_with_retries_async(self, query: str, max_retries: int) -> Dict:
+        request = self._completion_request(query)
+
+        for attempt in range(max_retries + 1):
+            logger.debug("Async LLM extraction attempt %d/%d for query: %.50s...", attempt + 1, max_retries + 1, query)
+            try:
+                with _LLM_CALL_SECONDS.time():
+                    response = await self.async_client.chat.completions.create(**request)
+                return self._handle_response(response)
+            except Exception as e:
+                if not self._should_retry(e, attempt, max_retries):
+                    break
+
+        return self._fallback()
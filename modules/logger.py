@@ -1,71 +1,216 @@
 """
 Logger Module
 Centralized logging configuration with file writing
+
+Loggers only enqueue records; one listener thread owns the console and
+file handlers, so a request thread never waits on stdout or disk. Pass
+arguments lazily (logger.debug("scored %s", query)) on hot paths so
+disabled levels cost a level check and nothing else.
 """
+import atexit
+import json
 import logging
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List
+from modules import config
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# LogRecord attributes that are not user-supplied extra= fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, thread, extra fields, exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def make_formatter(log_format: str = None) -> logging.Formatter:
+    """'text' (default) or 'json' (SHL_LOG_FORMAT)"""
+    if (log_format or config.LOG_FORMAT) == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+class _RoutingHandler(logging.Handler):
+    """Listener-side handler: sends each record to its logger's handlers"""
+
+    def __init__(self):
+        super().__init__()
+        self.routes: Dict[str, List[logging.Handler]] = {}
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        marker = getattr(record, '_flush_marker', None)
+        if marker is not None:
+            for handlers in self.routes.values():
+                for handler in handlers:
+                    handler.flush()
+            marker.set()
+            return True
+        for handler in self.routes.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Enqueue the record as-is: merging arguments and formatting tracebacks
+    happen on the listener thread, so pass values that are not mutated
+    after the call (strings, numbers, exceptions)
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Each logger has only this handler, so the record can be reused
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if _listener is None:
+            # Listener stopped (interpreter shutdown): write synchronously
+            _router.handle(record)
+        else:
+            super().emit(record)
+
+
+_queue = queue.SimpleQueue()
+_router = _RoutingHandler()
+_listener = None
+_console_handler = None
+_file_handlers: Dict[str, logging.Handler] = {}
+_setup_lock = threading.Lock()
+
+
+def _console() -> logging.Handler:
+    global _console_handler
+    if _console_handler is None:
+        _console_handler = logging.StreamHandler(sys.stdout)
+        _console_handler.setFormatter(make_formatter())
+    return _console_handler
+
+
+def _file(log_file: str) -> logging.Handler:
+    handler = _file_handlers.get(log_file)
+    if handler is None:
+        log_path = Path(log_file)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.FileHandler(log_path, mode='a', encoding='utf-8')
+        handler.setFormatter(make_formatter())
+        _file_handlers[log_file] = handler
+    return handler
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if _listener is None:
+        _listener = QueueListener(_queue, _router)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+# Warn about a bad SHL_LOG_LEVEL once, not once per logger
+_invalid_level_warned = False
+
 
 def setup_logger(name: str, log_file: str = None, level=logging.INFO) -> logging.Logger:
     """
     Setup logger with console and file handlers
-    
+
     Args:
         name: Logger name (usually __name__)
         log_file: Optional log file path
-        level: Logging level
-    
+        level: Logging level (SHL_LOG_LEVEL overrides it when set)
+
     Returns:
         Configured logger
     """
+    global _invalid_level_warned
     logger = logging.getLogger(name)
+    if config.LOG_LEVEL in logging._nameToLevel:
+        level = config.LOG_LEVEL
     logger.setLevel(level)
-    
+
     # Avoid adding handlers multiple times
     if logger.handlers:
         return logger
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # File handler (if specified)
-    if log_file:
-        log_path = Path(log_file)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Use mode='a' for append, and set up immediate flushing
-        file_handler = logging.FileHandler(log_path, mode='a', encoding='utf-8')
-        file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
-        
-        # Force immediate flush
-        file_handler.flush = lambda: file_handler.stream.flush()
-        
-        logger.addHandler(file_handler)
-    
+
+    with _setup_lock:
+        handlers = [_console()]
+        if log_file:
+            handlers.append(_file(log_file))
+
+        if config.LOG_ASYNC:
+            _router.routes[name] = handlers
+            _ensure_listener()
+            logger.addHandler(_LazyQueueHandler(_queue))
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
+
     # Prevent propagation to avoid duplicate logs
     logger.propagate = False
-    
+
+    if config.LOG_LEVEL and config.LOG_LEVEL not in logging._nameToLevel and not _invalid_level_warned:
+        _invalid_level_warned = True
+        logger.warning(f"Unknown SHL_LOG_LEVEL={config.LOG_LEVEL!r} - using {logging.getLevelName(level)} "
+                       f"(expected DEBUG, INFO, WARNING, ERROR or CRITICAL)")
+
     return logger
 
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    """Block until everything logged so far has been written (False on timeout)"""
+    if _listener is None:
+        for handler in [_console_handler, *_file_handlers.values()]:
+            if handler is not None:
+                handler.flush()
+        return True
+    marker = threading.Event()
+    record = logging.makeLogRecord({'_flush_marker': marker})
+    _queue.put_nowait(record)
+    return marker.wait(timeout)
+
+
+def stop_logging() -> None:
+    """Drain the queue and stop the listener thread (registered with atexit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in [_console_handler, *_file_handlers.values()]:
+        if handler is not None:
+            try:
+                handler.flush()
+            except ValueError:
+                # Stream already closed by whoever owned it (e.g. pytest's capture)
+                pass
+
 # Default logger for the application (with file logging enabled)
 default_log_file = f"logs/shl_recommender_{datetime.now().strftime('%Y%m%d')}.log"
 logger = setup_logger('shl_recommender', default_log_file)
 
-# Also create a custom logging function that ensures file flush
 def log_and_flush(logger, level, message):
-    """Log message and immediately flush to file"""
+    """Log message and wait until it is written"""
     logger.log(level, message)
-    # Flush all handlers
-    for handler in logger.handlers:
-        handler.flush()
+    flush_logs()
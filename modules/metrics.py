@@ -0,0 +1,306 @@
+"""
+Metrics Module
+Stage latency histograms and event counters in Prometheus text format
+
+Each thread records into its own shard (created once per thread), so
+observing a value takes no lock; a scrape sums the shards. Values read
+during a scrape may be a few updates stale, which Prometheus tolerates.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from modules.profiling import current_trace
+
+# Seconds; covers sub-millisecond scoring up to slow LLM round trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class _Timer:
+    """with histogram.time(): ... (class-based: cheaper than a generator context manager)"""
+
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _Sharded(ABC):
+    """Per-thread state with lock-free writes; the lock only guards shard creation"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List = []
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_shard(self):
+        """Empty state for one thread"""
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._new_shard()
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _all_shards(self) -> List:
+        with self._lock:
+            return list(self._shards)
+
+
+class _CounterChild(_Sharded):
+
+    def _new_shard(self):
+        return [0.0]
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shard()[0] += amount
+
+    def value(self) -> float:
+        return sum(shard[0] for shard in self._all_shards())
+
+
+class _HistogramChild(_Sharded):
+
+    def __init__(self, buckets: Sequence[float]):
+        super().__init__()
+        self.buckets = tuple(buckets)
+
+    def _new_shard(self):
+        # bucket counts (+Inf last), then sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float) -> None:
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(cumulative bucket counts incl. +Inf, sum)"""
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in self._all_shards():
+            for i in range(len(counts)):
+                counts[i] += shard[i]
+            total += shard[-1]
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class _Metric(ABC):
+    """Labelled family; children are created once and should be bound up front"""
+
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """Child for one label combination"""
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Sample lines in Prometheus text format (without HELP/TYPE)"""
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in self._items():
+            labels = dict(zip(self.labelnames, key))
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value())}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in self._items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative, total = child.snapshot()
+            for bound, count in zip(self.buckets + (float('inf'),), cumulative):
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative[-1]}")
+        return lines
+
+
+# Collector: returns [(name, type, help, [(labels, value), ...]), ...] at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, Iterable[Tuple[Dict, float]]]]]
+
+
+class MetricsRegistry:
+    """Metric families plus scrape-time collectors for state kept elsewhere (cache stats, queues)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, key: str, collector: Collector) -> None:
+        """Add (or replace) a scrape-time collector"""
+        with self._lock:
+            self._collectors[key] = collector
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'shl_stage_duration_seconds',
+    'Time spent in each recommend pipeline stage',
+    ('stage',)
+)
+LLM_EVENTS = REGISTRY.counter(
+    'shl_llm_events_total',
+    'LLM requirement extraction outcomes (success, retry, fallback, json_error, api_error)',
+    ('event',)
+)
+ERRORS = REGISTRY.counter(
+    'shl_errors_total',
+    'Errors raised per pipeline stage',
+    ('stage',)
+)
+
+
+class StageTimer:
+    """Stage latency histogram that also feeds the request's StageTrace, if any"""
+
+    __slots__ = ('stage', '_histogram')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._histogram = STAGE_SECONDS.labels(stage=stage)
+
+    def observe(self, seconds: float) -> None:
+        self._histogram.observe(seconds)
+        trace = current_trace()
+        if trace is not None:
+            trace.record(self.stage, seconds)
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+def stage_timer(stage: str) -> StageTimer:
+    """Timer for a stage (bind once at import, observe in the hot path)"""
+    return StageTimer(stage)
+
+
+def llm_event(event: str) -> _CounterChild:
+    return LLM_EVENTS.labels(event=event)
+
+
+def error_counter(stage: str) -> _CounterChild:
+    return ERRORS.labels(stage=stage)
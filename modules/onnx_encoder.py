@@ -0,0 +1,208 @@
+"""
+ONNX Encoder Module
+CPU inference of the exported all-MiniLM-L6-v2 graph with ONNX Runtime
+
+Export the graph (optionally int8-quantized) with:
+    python download_models.py --onnx --int8
+
+Select it with SHL_ENCODER_BACKEND=onnx or SHL_ENCODER_BACKEND=onnx-int8
+"""
+import inspect
+import json
+import os
+from pathlib import Path
+from typing import List
+import numpy as np
+from modules import config
+from modules.logger import setup_logger
+from modules.exceptions import FeatureExtractionException
+
+logger = setup_logger(__name__)
+
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_INT8_MODEL_FILE = 'model_int8.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+ENCODER_CONFIG_FILE = 'encoder_config.json'
+
+
+def default_onnx_dir(model_name: str = 'all-MiniLM-L6-v2') -> str:
+    """Where download_models.py writes the exported graph for model_name"""
+    return os.path.join(os.getcwd(), '.model_cache', 'onnx', model_name)
+
+
+def export_onnx_model(model, output_dir: str, quantize: bool = False, opset: int = 14) -> Path:
+    """
+    Export a loaded SentenceTransformer to ONNX (+ fast tokenizer)
+
+    Only the transformer is exported; mean pooling and normalisation run in
+    numpy at inference time, matching the sentence-transformers pipeline.
+
+    Args:
+        model: Loaded SentenceTransformer
+        output_dir: Directory for model.onnx, tokenizer.json and encoder_config.json
+        quantize: Also write a dynamically int8-quantized model_int8.onnx
+        opset: ONNX opset version
+
+    Returns:
+        Output directory path
+    """
+    import torch
+    from sentence_transformers.models import Normalize, Pooling
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    transformer = model[0]
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    max_seq_length = int(model.max_seq_length or tokenizer.model_max_length)
+
+    pooling = next((m for m in model if isinstance(m, Pooling)), None)
+    if pooling is not None and not pooling.pooling_mode_mean_tokens:
+        raise FeatureExtractionException("Only mean-pooling models can be exported to ONNX")
+    normalize = any(isinstance(m, Normalize) for m in model)
+
+    dummy = tokenizer(["export sample text"], return_tensors='pt', padding=True)
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in dummy]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    export_kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter; keep the TorchScript one
+        export_kwargs['dynamo'] = False
+
+    model_path = output_dir / ONNX_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            auto_model,
+            tuple(dummy[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            **export_kwargs
+        )
+    logger.info(f"✅ Exported ONNX graph to {model_path}")
+
+    if not getattr(tokenizer, 'is_fast', False):
+        raise FeatureExtractionException("A fast tokenizer is required for the ONNX backend")
+    tokenizer.backend_tokenizer.save(str(output_dir / TOKENIZER_FILE))
+
+    with open(output_dir / ENCODER_CONFIG_FILE, 'w') as f:
+        json.dump({
+            'max_seq_length': max_seq_length,
+            'normalize': normalize,
+            'input_names': input_names,
+            'dimension': int(model.get_sentence_embedding_dimension())
+        }, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(
+            str(model_path),
+            str(output_dir / ONNX_INT8_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+        logger.info(f"✅ Wrote int8-quantized graph to {output_dir / ONNX_INT8_MODEL_FILE}")
+
+    return output_dir
+
+
+class OnnxSentenceEncoder:
+    """
+    SentenceTransformer-compatible encoder running on ONNX Runtime
+
+    Tokenizes with the Rust fast tokenizer, runs the exported transformer,
+    then mean-pools over the attention mask (and L2-normalises when the
+    source model did).
+    """
+
+    def __init__(self, model_dir: str = None, quantized: bool = False, intra_op_threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise FeatureExtractionException(
+                "ONNX backend requires onnxruntime and tokenizers (pip install onnxruntime)"
+            ) from e
+
+        self.model_dir = Path(model_dir or config.ONNX_MODEL_DIR or default_onnx_dir())
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        model_path = self.model_dir / model_file
+
+        if not model_path.exists():
+            raise FeatureExtractionException(
+                f"ONNX model not found: {model_path}. Run: python download_models.py --onnx"
+                + (" --int8" if quantized else "")
+            )
+
+        with open(self.model_dir / ENCODER_CONFIG_FILE) as f:
+            encoder_config = json.load(f)
+
+        self.max_seq_length = encoder_config['max_seq_length']
+        self.normalize = encoder_config['normalize']
+        self.input_names = encoder_config['input_names']
+        self.dimension = encoder_config['dimension']
+        self.quantized = quantized
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        logger.info(f"OnnxSentenceEncoder loaded {model_path} (dim={self.dimension})")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(['last_hidden_state'], feeds)[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        embeddings = summed / counts
+
+        if self.normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings.astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Encode texts (mirrors SentenceTransformer.encode)"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Sort by length so each batch pads to a similar size
+        order = np.argsort([-len(t) for t in texts])
+        batch_size = max(1, batch_size)
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            output[idx] = self._encode_batch([texts[i] for i in idx])
+
+        return output[0] if single else output
@@ -0,0 +1,261 @@
+"""
+Pipeline Module
+Small DAG runner for the index build and main.py
+
+Each Stage names the artifacts it consumes and produces. With a cache
+directory, a stage's outputs are pickled under a key hashed from its
+name, version, params, the source of its function, its files (data and
+the modules implementing it) and the content hashes of its input
+artifacts; when that key is already cached the stage is skipped and its
+outputs are only unpickled if a stage that must run (or the caller)
+needs them. Stages whose inputs are ready run concurrently on a thread
+pool (e.g. TF-IDF fit next to the embedding encode).
+"""
+import hashlib
+import inspect
+import json
+import pickle
+import threading
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from modules.exceptions import PipelineException
+from modules.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def content_hash(value) -> str:
+    """Stable hash of an artifact's content (DataFrames, arrays and sparse matrices by value)"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr((list(value.columns), list(map(str, value.dtypes)))).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode('utf-8'))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif hasattr(value, 'tocsr') and hasattr(value, 'indptr'):
+        matrix = value.tocsr()
+        digest.update(repr((matrix.dtype.str, matrix.shape)).encode('utf-8'))
+        for part in (matrix.data, matrix.indices, matrix.indptr):
+            digest.update(np.ascontiguousarray(part).tobytes())
+    else:
+        digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+
+def file_hash(path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_hash(func: Callable) -> str:
+    """Hash of a function's source (its qualified name when the source is unavailable)"""
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = getattr(func, '__qualname__', repr(func))
+    return hashlib.blake2b(source.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class Stage:
+    """
+    One pipeline step
+
+    Args:
+        name: Unique stage name
+        func: Called with the input artifacts (in inputs order); returns
+            {output name: value} (a single output may be returned bare)
+        inputs: Artifact names consumed
+        outputs: Artifact names produced
+        files: Files whose content is part of the cache key: data files and
+            the modules the stage's function calls into (the function's own
+            source is always hashed)
+        products: Files the stage writes; it is only up to date if they exist
+        after: Stages that must finish first without passing artifacts
+        params: JSON-serializable settings that change the outputs
+        version: Bump when the stage's code changes its outputs
+        cache: False for stages that must always run (their outputs are
+            not hashed, so everything downstream runs too)
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Sequence[str] = (), outputs: Sequence[str] = (),
+                 files: Sequence = (), products: Sequence = (), after: Sequence[str] = (), params: Dict = None,
+                 version: str = '1', cache: bool = True):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.files = tuple(Path(f) for f in files)
+        self.products = tuple(Path(f) for f in products)
+        self.after = tuple(after)
+        self.params = params or {}
+        self.version = version
+        self.cache = cache
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name})"
+
+
+class Pipeline:
+    """
+    Runs Stages in dependency order
+
+    Args:
+        stages: Stages (order does not matter)
+        cache_dir: Artifact cache directory (None = always run, nothing stored)
+        workers: Stages run concurrently (1 = one at a time, in declaration order)
+    """
+
+    def __init__(self, stages: Iterable[Stage], cache_dir: Optional[str] = None, workers: int = 4):
+        self.stages = list(stages)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.workers = max(1, workers)
+        self.producers: Dict[str, Stage] = {}
+        for stage in self.stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise PipelineException(f"Artifact '{output}' produced by both "
+                                            f"'{self.producers[output].name}' and '{stage.name}'")
+                self.producers[output] = stage
+        names = [stage.name for stage in self.stages]
+        if len(set(names)) != len(names):
+            raise PipelineException(f"Duplicate stage names in {names}")
+        for stage in self.stages:
+            missing = [name for name in stage.inputs if name not in self.producers]
+            if missing:
+                raise PipelineException(f"Stage '{stage.name}' needs {missing}, which no stage produces")
+            unknown = [name for name in stage.after if name not in names]
+            if unknown:
+                raise PipelineException(f"Stage '{stage.name}' runs after unknown stages {unknown}")
+        self.by_name = {stage.name: stage for stage in self.stages}
+        self.report: List[Dict] = []
+
+    def _deps(self, stage: Stage) -> List[Stage]:
+        deps = [self.producers[name] for name in stage.inputs] + [self.by_name[name] for name in stage.after]
+        return list({id(s): s for s in deps}.values())
+
+    def _key(self, stage: Stage, hashes: Dict[str, Optional[str]]) -> Optional[str]:
+        if self.cache_dir is None or not stage.cache:
+            return None
+        input_hashes = [hashes[name] for name in stage.inputs]
+        if any(h is None for h in input_hashes):
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps([stage.name, stage.version, stage.params, list(stage.inputs), input_hashes,
+                                  list(stage.outputs), source_hash(stage.func)],
+                                 sort_keys=True, default=str).encode('utf-8'))
+        for path in stage.files:
+            digest.update(file_hash(path).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _paths(self, stage: Stage, key: str):
+        base = self.cache_dir / f"{stage.name}-{key}"
+        return base.with_suffix('.json'), base.with_suffix('.pkl')
+
+    def run(self, targets: Sequence[str] = None) -> Dict:
+        """
+        Run (or skip) every stage and return the requested artifacts
+
+        Args:
+            targets: Artifact names to return (default: all of them)
+
+        Returns:
+            {artifact name: value}
+        """
+        artifacts: Dict = {}
+        hashes: Dict[str, Optional[str]] = {}
+        cached_at: Dict[str, Path] = {}
+        load_locks = {stage.name: threading.Lock() for stage in self.stages}
+        self.report = []
+
+        def materialize(name: str):
+            stage = self.producers[name]
+            with load_locks[stage.name]:
+                if name not in artifacts:
+                    with open(cached_at[stage.name], 'rb') as f:
+                        artifacts.update(pickle.load(f))
+            return artifacts[name]
+
+        def execute(stage: Stage) -> Dict:
+            start = time.perf_counter()
+            key = self._key(stage, hashes)
+            if key is not None:
+                manifest_path, data_path = self._paths(stage, key)
+                if manifest_path.exists() and data_path.exists() and all(p.exists() for p in stage.products):
+                    cached_at[stage.name] = data_path
+                    return {'stage': stage.name, 'status': 'cached', 'key': key,
+                            'hashes': json.loads(manifest_path.read_text()),
+                            'seconds': time.perf_counter() - start}
+
+            result = stage.func(*[artifacts[name] if name in artifacts else materialize(name)
+                                  for name in stage.inputs])
+            if len(stage.outputs) == 1 and not (isinstance(result, dict) and set(result) == set(stage.outputs)):
+                result = {stage.outputs[0]: result}
+            result = dict(result or {})
+            if set(result) != set(stage.outputs):
+                raise PipelineException(f"Stage '{stage.name}' returned {sorted(result)}, "
+                                        f"declared {sorted(stage.outputs)}")
+            output_hashes = {name: None for name in stage.outputs}
+            if key is not None:
+                output_hashes = {name: content_hash(value) for name, value in result.items()}
+                manifest_path, data_path = self._paths(stage, key)
+                manifest_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = data_path.with_suffix('.tmp')
+                with open(tmp, 'wb') as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                tmp.replace(data_path)
+                manifest_path.write_text(json.dumps(output_hashes))
+                cached_at[stage.name] = data_path
+            return {'stage': stage.name, 'status': 'ran', 'key': key, 'hashes': output_hashes,
+                    'result': result, 'seconds': time.perf_counter() - start}
+
+        def finish(stage: Stage, entry: Dict) -> None:
+            artifacts.update(entry.pop('result', {}))
+            hashes.update(entry.pop('hashes'))
+            self.report.append(entry)
+            if entry['status'] == 'cached':
+                logger.info(f"⏭️  {stage.name}: up to date")
+            else:
+                logger.info(f"✅ {stage.name}: {entry['seconds']:.2f}s")
+
+        pending = list(self.stages)
+        done = set()
+        if self.workers == 1:
+            while pending:
+                stage = next((s for s in pending if all(d.name in done for d in self._deps(s))), None)
+                if stage is None:
+                    raise PipelineException(f"Dependency cycle among {[s.name for s in pending]}")
+                finish(stage, execute(stage))
+                done.add(stage.name)
+                pending.remove(stage)
+        else:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix='pipeline') as pool:
+                running = {}
+                while pending or running:
+                    for stage in [s for s in pending if all(d.name in done for d in self._deps(s))]:
+                        running[pool.submit(execute, stage)] = stage
+                        pending.remove(stage)
+                    if not running:
+                        raise PipelineException(f"Dependency cycle among {[s.name for s in pending]}")
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        stage = running.pop(future)
+                        try:
+                            entry = future.result()
+                        except Exception:
+                            for other in running:
+                                other.cancel()
+                            logger.error(f"Stage '{stage.name}' failed")
+                            raise
+                        finish(stage, entry)
+                        done.add(stage.name)
+
+        names = list(self.producers) if targets is None else list(targets)
+        return {name: artifacts[name] if name in artifacts else materialize(name) for name in names}
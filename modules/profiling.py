@@ -0,0 +1,236 @@
+"""
+Profiling Module
+Per-request stage traces and an on-demand sampling profiler
+
+A StageTrace collects the stage timings (see metrics.stage_timer) recorded
+while it is active in the current context, so one slow request can report
+where its time went. SamplingProfiler periodically snapshots every thread's
+Python stack and aggregates them as folded stacks, the input format of
+flamegraph.pl, speedscope and similar viewers.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+from modules import config
+from modules.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_current_trace: ContextVar = ContextVar('shl_stage_trace', default=None)
+
+
+def current_trace() -> Optional['StageTrace']:
+    """Trace active in this context (None when the request did not ask for one)"""
+    return _current_trace.get()
+
+
+class StageTrace:
+    """
+    Stage spans of one request: with StageTrace() as trace: ...
+
+    Spans recorded on worker threads are included as long as the work was
+    submitted with the caller's context (ExecutionLayer.run_cpu does this).
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = None
+        self.spans = []
+        self._token = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        end = time.perf_counter() - self.start
+        self.spans.append((stage, end - seconds, seconds))
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.total = time.perf_counter() - self.start
+        _current_trace.reset(self._token)
+        return False
+
+    def to_dict(self) -> Dict:
+        """{'total_ms', 'stages': [{'stage', 'start_ms', 'ms'}, ...]} in start order"""
+        total = self.total if self.total is not None else time.perf_counter() - self.start
+        return {
+            'total_ms': round(total * 1000, 3),
+            'stages': [
+                {'stage': stage, 'start_ms': round(start * 1000, 3), 'ms': round(seconds * 1000, 3)}
+                for stage, start, seconds in sorted(self.spans, key=lambda span: span[1])
+            ]
+        }
+
+
+# Leaf frames of threads that are waiting for work rather than doing it
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+
+class ProfileResult:
+    """Aggregated samples of one profiling run"""
+
+    def __init__(self, stacks: Counter, samples: int, seconds: float, requests: int, interval_ms: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.seconds = seconds
+        self.requests = requests
+        self.interval_ms = interval_ms
+
+    def folded(self) -> str:
+        """'thread;outer;...;leaf count' per line, most frequent first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict:
+        return {
+            'samples': self.samples,
+            'seconds': round(self.seconds, 3),
+            'requests': self.requests,
+            'interval_ms': self.interval_ms,
+            'distinct_stacks': len(self.stacks)
+        }
+
+
+class SamplingProfiler:
+    """
+    Samples all thread stacks every interval_ms on a background thread until
+    max_requests requests have finished or the time limit runs out
+
+    Nothing is instrumented and nothing runs between profiles; while one is
+    active the cost is one stack walk per thread per interval. One profile
+    at a time.
+    """
+
+    def __init__(self, interval_ms: float = None, max_seconds: float = None):
+        self.interval_ms = config.PROFILE_INTERVAL_MS if interval_ms is None else interval_ms
+        self.max_seconds = config.PROFILE_MAX_SECONDS if max_seconds is None else max_seconds
+        self._stop = None
+        self._max_requests = None
+        self._requests = 0
+        self._labels = {}
+
+    @property
+    def running(self) -> bool:
+        return self._stop is not None
+
+    def request_finished(self) -> None:
+        """Count a finished request towards max_requests (cheap no-op when idle)"""
+        stop = self._stop
+        if stop is None:
+            return
+        self._requests += 1
+        if self._max_requests is not None and self._requests >= self._max_requests:
+            stop.set()
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _sample(self, stop: threading.Event, seconds: float, interval_ms: float,
+                include_idle: bool) -> ProfileResult:
+        own = threading.get_ident()
+        names = {}
+        stacks = Counter()
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        interval = interval_ms / 1000
+
+        while not stop.is_set() and time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}").replace(' ', '_'))
+                stacks[';'.join(reversed(stack))] += 1
+                samples += 1
+            stop.wait(interval)
+
+        return ProfileResult(stacks, samples, time.perf_counter() - start, self._requests, interval_ms)
+
+    async def profile(
+        self,
+        max_requests: int = None,
+        seconds: float = None,
+        interval_ms: float = None,
+        include_idle: bool = False
+    ) -> ProfileResult:
+        """
+        Profile the next max_requests requests or seconds seconds, whichever
+        ends first (always capped at max_seconds)
+
+        Args:
+            max_requests: Stop after this many requests finished
+            seconds: Stop after this long
+            interval_ms: Sampling interval (default: SHL_PROFILE_INTERVAL_MS)
+            include_idle: Keep samples of threads waiting for work
+
+        Raises:
+            RuntimeError: If a profile is already running
+        """
+        if self.running:
+            raise RuntimeError("A profile is already running")
+
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        interval_ms = interval_ms or self.interval_ms
+        stop = self._stop = threading.Event()
+        sampler = None
+        self._max_requests = max_requests
+        self._requests = 0
+        logger.info(f"Profiling for up to {seconds:.1f}s"
+                    + (f" or {max_requests} requests" if max_requests else "")
+                    + f" every {interval_ms:.1f} ms")
+        try:
+            loop = asyncio.get_running_loop()
+            # Own thread (not the default pool) so a busy pool cannot delay sampling
+            done = loop.create_future()
+
+            def resolve(setter, value):
+                if not done.done():
+                    setter(value)
+
+            def run():
+                try:
+                    result = self._sample(stop, seconds, interval_ms, include_idle)
+                    loop.call_soon_threadsafe(resolve, done.set_result, result)
+                except Exception as e:
+                    loop.call_soon_threadsafe(resolve, done.set_exception, e)
+
+            sampler = threading.Thread(target=run, name='shl-profiler', daemon=True)
+            sampler.start()
+            result = await done
+        finally:
+            # The sampler exits within one interval once stopped; wait for it
+            # so the next profile cannot overlap with this one
+            stop.set()
+            if sampler is not None:
+                sampler.join()
+            self._stop = None
+            self._max_requests = None
+
+        logger.info(f"✅ Profile done: {result.samples} samples over {result.seconds:.1f}s, "
+                    f"{result.requests} requests")
+        return result
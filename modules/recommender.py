@@ -2,14 +2,33 @@
 Recommender Module
 Main recommendation engine with hybrid scoring
 """
+import hashlib
+import inspect
+import time
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Tuple
+from modules import config
 from modules.data_loader import DataLoader
 from modules.preprocessor import DataPreprocessor
 from modules.feature_extractor import FeatureExtractor
 from modules.llm_client import LLMClient
+from modules.onnx_encoder import OnnxSentenceEncoder
 from modules.training_patterns import TrainingPatternsLearner
+from modules.catalog import CompactCatalog
+from modules.pipeline import Pipeline, Stage
+from modules.filters import RecommendationFilters, build_candidate_mask
+from modules.serving_tiers import COMPONENTS, ServingTier, TierSelector, load_tuned_weights, select_serving_tier
+from modules.metrics import error_counter, stage_timer
+
+_RECOMMEND_SECONDS = stage_timer('recommend')
+_RANK_SECONDS = stage_timer('rank')
+_FILTER_SECONDS = stage_timer('filter')
+_TRAINING_SECONDS = stage_timer('training')
+_BOOSTS_SECONDS = stage_timer('boosts')
+_SCORING_SECONDS = stage_timer('scoring')
+_TOP_K_SECONDS = stage_timer('top_k')
+_RECOMMEND_ERRORS = error_counter('recommend')
 
 class RecommendationEngine:
     """
@@ -30,8 +49,19 @@ class RecommendationEngine:
         self.feature_extractor = FeatureExtractor()
         self.llm_client = LLMClient()
         self.training_learner = TrainingPatternsLearner()
+        self.tier_selector = TierSelector(select_serving_tier(
+            llm_available=self.llm_client.client is not None,
+            encoder_backend=self.feature_extractor.encoder_backend
+        ))
+        self.tuned_weights = load_tuned_weights(config.WEIGHTS_FILE)
         
         self.df_assessments = None
+        self.train_data = None
+        self.train_merged = None
+        self.catalog = None
+        self.frequency_boosts = None
+        self.index_version = None
+        self.build_report = None
         self.initialized = False
     
     def initialize(self) -> None:
@@ -43,34 +73,173 @@ class RecommendationEngine:
         print("INITIALIZING RECOMMENDATION SYSTEM")
         print("="*80)
         
-        # 1. Load data
-        data = self.data_loader.get_all_data()
+        # Stages run as soon as their inputs exist: loading the train set,
+        # TF-IDF and training patterns overlap the embedding encode
+        pipeline = Pipeline(self.index_stages(), workers=config.INDEX_BUILD_WORKERS)
+        artifacts = pipeline.run()
+        self.build_report = pipeline.report
+        self.assemble(**artifacts)
+        print("\n✅ Recommendation system ready!\n")
+    
+    def index_stages(self) -> List[Stage]:
+        """
+        Index build as pipeline stages: load -> preprocess -> TF-IDF /
+        embeddings / training patterns (lexical tiers skip the embeddings)
+        
+        Their outputs are the keyword arguments of assemble. Each stage
+        lists the modules that produce its output, so editing them
+        invalidates its cached artifacts.
+        """
+        loader = self.data_loader
+        preprocessor = self.preprocessor
+        extractor = self.feature_extractor
+        source = lambda obj: inspect.getsourcefile(type(obj))
         
-        # 2. Preprocess
-        self.df_assessments = self.preprocessor.clean_scraped_data(data['scraped'])
-        train_clean = self.preprocessor.prepare_train_data(data['train'])
+        def build_tfidf(assessments):
+            extractor.build_tfidf_features(assessments)
+            return {'tfidf_vectorizer': extractor.tfidf_vectorizer, 'tfidf_matrix': extractor.tfidf_matrix}
         
-        # 3. Build features
-        self.feature_extractor.build_tfidf_features(self.df_assessments)
-        self.feature_extractor.build_semantic_embeddings(self.df_assessments)
+        def learn_patterns(train_clean, assessments):
+            train_merged = preprocessor.merge_train_with_assessments(train_clean, assessments)
+            learner = TrainingPatternsLearner()
+            learner.learn_patterns(train_merged)
+            return {'train_merged': train_merged, 'training_learner': learner}
         
-        # 4. Learn training patterns
-        train_merged = self.preprocessor.merge_train_with_assessments(
-            train_clean, 
-            self.df_assessments
-        )
-        self.training_learner.learn_patterns(train_merged)
+        stages = [
+            Stage('load_catalog', lambda: loader.load_scraped_assessments(), outputs=['scraped'],
+                  files=[loader.data_dir / "shl_individual_test_solutions.csv", source(loader)]),
+            Stage('load_train', lambda: loader.load_train_test_data(), outputs=['train', 'test'],
+                  files=[loader.data_dir / "Gen_AI Dataset (1).xlsx", source(loader)]),
+            Stage('clean_catalog', preprocessor.clean_scraped_data, inputs=['scraped'], outputs=['assessments'],
+                  files=[source(preprocessor)]),
+            Stage('prepare_train', lambda train: preprocessor.prepare_train_data(train.copy()),
+                  inputs=['train'], outputs=['train_clean'], files=[source(preprocessor)]),
+            Stage('tfidf', build_tfidf, inputs=['assessments'], outputs=['tfidf_vectorizer', 'tfidf_matrix'],
+                  files=[source(extractor)]),
+            Stage('patterns', learn_patterns, inputs=['train_clean', 'assessments'],
+                  outputs=['train_merged', 'training_learner'],
+                  files=[source(preprocessor), inspect.getsourcefile(TrainingPatternsLearner)]),
+        ]
+        if self.serving_tier.use_semantic:
+            stages.append(Stage(
+                'embeddings',
+                extractor.build_semantic_embeddings,
+                inputs=['assessments'],
+                outputs=['semantic_embeddings'],
+                files=[source(extractor), inspect.getsourcefile(OnnxSentenceEncoder)],
+                params={'model': 'all-MiniLM-L6-v2', 'encoder_backend': extractor.encoder_backend}
+            ))
+        return stages
+    
+    def assemble(
+        self,
+        assessments: pd.DataFrame,
+        train_clean: pd.DataFrame,
+        train_merged: pd.DataFrame,
+        training_learner: TrainingPatternsLearner,
+        tfidf_vectorizer,
+        tfidf_matrix,
+        semantic_embeddings: np.ndarray = None,
+        **_
+    ) -> None:
+        """Make the engine ready from built (or cached) index artifacts"""
+        self.df_assessments = assessments
+        self.train_data = train_clean
+        self.train_merged = train_merged
+        self.catalog = CompactCatalog.from_dataframe(assessments)
+        self.catalog.build_json_fragments()
         
+        self.feature_extractor.tfidf_vectorizer = tfidf_vectorizer
+        self.feature_extractor.tfidf_matrix = tfidf_matrix
+        if self.serving_tier.use_semantic:
+            self.feature_extractor.semantic_embeddings = semantic_embeddings
+            # Embeddings loaded from a cache still need the model for queries
+            if self.feature_extractor.embedding_model is None:
+                self.feature_extractor.load_embedding_model()
+            if config.ENCODE_BATCHING:
+                self.feature_extractor.enable_encode_batching(
+                    max_batch_size=config.ENCODE_MAX_BATCH,
+                    max_wait_ms=config.ENCODE_MAX_WAIT_MS
+                )
+            if config.PRECOMPUTE_VOCABULARY:
+                self.feature_extractor.precompute_vocabulary_embeddings(assessments)
+        
+        self.training_learner = training_learner
+        self.frequency_boosts = np.array(
+            [self.training_learner.frequency_boost(url) for url in self.catalog.normalized_urls],
+            dtype=np.float64
+        )
+        self.index_version = self.compute_index_version()
         self.initialized = True
-        print("\n✅ Recommendation system ready!\n")
     
-    def recommend(self, query: str, top_k: int = 10) -> List[Dict]:
+    @property
+    def serving_tier(self) -> ServingTier:
+        """Static tier this engine was built for (requests may run a lower one)"""
+        return self.tier_selector.base_tier
+    
+    def tier_weights(self, tier: ServingTier) -> Dict[str, float]:
+        """Component weights for a tier: tuned (SHL_WEIGHTS_FILE), the tier's own, or the WEIGHT_* constants"""
+        if tier.name in self.tuned_weights:
+            return self.tuned_weights[tier.name]
+        if tier.weights is not None:
+            return tier.weights
+        return {
+            'tfidf': self.WEIGHT_TFIDF,
+            'semantic': self.WEIGHT_SEMANTIC,
+            'training': self.WEIGHT_TRAINING,
+            'technical': self.WEIGHT_TECHNICAL,
+            'soft': 0.05,
+            'type': 0.10
+        }
+    
+    def refresh_frequency_boosts(self, urls) -> None:
+        """Recompute the precomputed popularity boosts of urls after the training patterns changed"""
+        for url in set(urls):
+            idx = self.catalog.url_index.get(url)
+            if idx is not None:
+                self.frequency_boosts[idx] = self.training_learner.frequency_boost(url)
+    
+    def compute_index_version(self) -> str:
+        """
+        Short hash of everything that determines rankings for a given LLM
+        output: catalog payloads, encoder, scoring weights and learned boosts
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        for prefix in self.catalog.json_prefixes:
+            digest.update(prefix)
+        digest.update(repr((
+            self.feature_extractor.encoder_backend,
+            self.feature_extractor.keyword_mode,
+            self.WEIGHT_TFIDF, self.WEIGHT_SEMANTIC, self.WEIGHT_TRAINING,
+            self.WEIGHT_TECHNICAL, self.WEIGHT_OTHER,
+            self.serving_tier.name, self.serving_tier.weights,
+            sorted((name, sorted(weights.items())) for name, weights in self.tuned_weights.items())
+        )).encode('utf-8'))
+        digest.update(self.frequency_boosts.tobytes())
+        for keyword in sorted(self.training_learner.keyword_to_assessments):
+            # Sorted: a cross-validation holdout can reorder a list without changing it
+            urls = sorted(self.training_learner.keyword_to_assessments[keyword])
+            digest.update(repr((keyword, urls)).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def recommend(
+        self,
+        query: str,
+        top_k: int = 10,
+        filters: RecommendationFilters = None,
+        extract_filters: bool = None,
+        tier: ServingTier = None
+    ) -> List[Dict]:
         """
         Generate recommendations for a query
         
         Args:
             query: Job description or requirements
             top_k: Number of recommendations to return
+            filters: Optional hard constraints (duration, remote, adaptive, test type)
+            extract_filters: Also take constraints stated in the query text
+                (default: SHL_EXTRACT_QUERY_FILTERS)
+            tier: Force a serving tier (default: chosen by the tier selector)
         
         Returns:
             List of recommended assessments with scores
@@ -78,66 +247,226 @@ class RecommendationEngine:
         if not self.initialized:
             self.initialize()
         
+        tier = tier or self.tier_selector.current()
+        
+        request_start = time.perf_counter()
+        try:
+            # 1. Extract requirements with LLM
+            if tier.use_llm:
+                start = time.perf_counter()
+                llm_data = self.llm_client.extract_requirements(query)
+                self.tier_selector.observe('llm', time.perf_counter() - start)
+            else:
+                llm_data = self.llm_client.empty_requirements()
+            
+            return self.recommend_with_requirements(
+                query,
+                llm_data,
+                top_k=top_k,
+                filters=self.resolve_filters(query, filters, extract_filters),
+                tier=tier
+            )
+        except Exception:
+            _RECOMMEND_ERRORS.inc()
+            raise
+        finally:
+            _RECOMMEND_SECONDS.observe(time.perf_counter() - request_start)
+    
+    @staticmethod
+    def resolve_filters(
+        query: str,
+        filters: RecommendationFilters = None,
+        extract_filters: bool = None
+    ) -> RecommendationFilters:
+        """
+        Combine explicit filters with those stated in the query text
+        
+        Explicit values always win; query-derived values only fill fields
+        the caller left unset.
+        """
+        if extract_filters is None:
+            extract_filters = config.EXTRACT_QUERY_FILTERS
+        
+        resolved = filters or RecommendationFilters()
+        if extract_filters:
+            resolved = resolved.merged_with(RecommendationFilters.from_query(query))
+        return resolved
+    
+    @staticmethod
+    def build_enhanced_query(query: str, llm_data: Dict) -> str:
+        """Append LLM keywords to the query for retrieval"""
+        keywords = llm_data.get('keywords', [])
+        return f"{query} {' '.join(keywords)}"
+    
+    def recommend_with_requirements(
+        self,
+        query: str,
+        llm_data: Dict,
+        top_k: int = 10,
+        query_embedding: np.ndarray = None,
+        filters: RecommendationFilters = None,
+        tier: ServingTier = None
+    ) -> List[Dict]:
+        """
+        CPU-bound part of recommend: retrieval, scoring and ranking
+        
+        Split out from recommend so callers that already have the LLM
+        extraction (e.g. the async execution layer) can run it on a worker pool.
+        
+        Args:
+            query: Job description or requirements
+            llm_data: Output of LLMClient.extract_requirements
+            top_k: Number of recommendations to return
+            query_embedding: Optional precomputed semantic query embedding
+            filters: Final hard constraints (already resolved, see resolve_filters)
+            tier: Serving tier to score with (default: the engine's base tier)
+        
+        Returns:
+            List of recommended assessments with scores
+        """
+        indices, scores = self.rank_with_requirements(
+            query,
+            llm_data,
+            top_k=top_k,
+            query_embedding=query_embedding,
+            filters=filters,
+            tier=tier
+        )
+        return [self.catalog.record(idx, score) for idx, score in zip(indices, scores)]
+    
+    def rank_with_requirements(
+        self,
+        query: str,
+        llm_data: Dict,
+        top_k: int = 10,
+        query_embedding: np.ndarray = None,
+        filters: RecommendationFilters = None,
+        tier: ServingTier = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same as recommend_with_requirements but returns the ranking as
+        (catalog positions, scores) arrays, for callers that render
+        responses straight from the compact catalog
+
+        top_k=None returns the full ranking of all candidates. Components
+        the tier does not use are never computed.
+        """
+        rank_start = time.perf_counter()
+        tier = tier or self.serving_tier
+        positions, components = self.score_components(
+            query,
+            llm_data,
+            query_embedding=query_embedding,
+            filters=filters,
+            tier=tier
+        )
+        if len(positions) == 0:
+            _RANK_SECONDS.observe(time.perf_counter() - rank_start)
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        
+        scoring_start = time.perf_counter()
+        weights = self.tier_weights(tier)
+        
+        # Hybrid scoring over the components this tier uses
+        final_scores = None
+        for name in COMPONENTS:
+            if name in components:
+                weighted = weights.get(name, 0.0) * components[name]
+                final_scores = weighted if final_scores is None else final_scores + weighted
+        top_k_start = time.perf_counter()
+        _SCORING_SECONDS.observe(top_k_start - scoring_start)
+        
+        # Sort (stable, so ties keep catalog order) and return top-k
+        order = np.argsort(-final_scores, kind='stable')[:top_k]
+        end = time.perf_counter()
+        _TOP_K_SECONDS.observe(end - top_k_start)
+        _RANK_SECONDS.observe(end - rank_start)
+        return positions[order], final_scores[order]
+    
+    def score_components(
+        self,
+        query: str,
+        llm_data: Dict,
+        query_embedding: np.ndarray = None,
+        filters: RecommendationFilters = None,
+        tier: ServingTier = None
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Unweighted score of every hybrid component the tier uses
+        
+        Returns:
+            (candidate catalog positions, {component: scores aligned with positions});
+            positions is empty when the filters exclude everything
+        """
+        if not self.initialized:
+            self.initialize()
+        
+        filter_start = time.perf_counter()
+        tier = tier or self.serving_tier
         query_lower = query.lower()
+        catalog = self.catalog
+        
+        # Filter pushdown: intersect bitmaps first so filtered-out
+        # assessments are never scored
+        mask = build_candidate_mask(catalog, filters)
+        candidates = None if mask is None else np.flatnonzero(mask)
+        _FILTER_SECONDS.observe(time.perf_counter() - filter_start)
+        if candidates is not None and len(candidates) == 0:
+            return np.zeros(0, dtype=np.int64), {}
+        positions = np.arange(catalog.size) if candidates is None else candidates
         
-        # 1. Extract requirements with LLM
-        llm_data = self.llm_client.extract_requirements(query)
+        if not tier.use_llm:
+            llm_data = self.llm_client.empty_requirements()
         
         # 2. Enhanced query
-        keywords = llm_data.get('keywords', [])
-        enhanced_query = f"{query} {' '.join(keywords)}"
+        enhanced_query = self.build_enhanced_query(query, llm_data)
         
         # 3. Get retrieval scores
-        tfidf_scores = self.feature_extractor.get_query_tfidf_scores(enhanced_query)
-        semantic_scores = self.feature_extractor.get_query_semantic_scores(enhanced_query)
+        components = {}
+        components['tfidf'] = self.feature_extractor.get_query_tfidf_scores(enhanced_query, indices=candidates)
+        if tier.use_semantic:
+            start = time.perf_counter()
+            components['semantic'] = self.feature_extractor.get_query_semantic_scores(
+                query,
+                query_embedding=query_embedding,
+                keywords=llm_data.get('keywords', []),
+                indices=candidates
+            )
+            if query_embedding is None:
+                # Encode ran inline (the execution layer times its own encode wait)
+                self.tier_selector.observe('semantic', time.perf_counter() - start)
         
         # 4. Calculate combined scores for each assessment
-        recommendations = []
         
-        for idx, row in self.df_assessments.iterrows():
-            url = row['normalized_url']
-            name_lower = str(row['name']).lower()
-            desc_lower = str(row['description']).lower()
-            test_type = str(row.get('test_type', '')).lower()
-            
-            # Base retrieval scores
-            tfidf_score = tfidf_scores[idx]
-            semantic_score = semantic_scores[idx]
-            
-            # Training pattern boost
-            training_boost = self.training_learner.get_training_boost(url, query_lower)
-            
-            # Technical skills boost
-            tech_boost = self._calculate_tech_boost(llm_data, name_lower, desc_lower)
-            
-            # Other boosts (soft skills, test type)
-            soft_boost = self._calculate_soft_boost(llm_data, name_lower, desc_lower)
-            type_boost = self._calculate_type_boost(query_lower, test_type)
-            
-            # Hybrid scoring
-            final_score = (
-                self.WEIGHT_TFIDF * tfidf_score +
-                self.WEIGHT_SEMANTIC * semantic_score +
-                self.WEIGHT_TRAINING * training_boost +
-                self.WEIGHT_TECHNICAL * tech_boost +
-                0.05 * soft_boost +
-                0.10 * type_boost
-            )
-            
-            recommendations.append({
-                'assessment_name': str(row['name']),
-                'assessment_url': str(row['url']),
-                'description': str(row['description'])[:500],
-                'duration': int(row.get('duration', 20)),
-                'test_type': self._parse_test_types(row.get('test_type')),
-                'adaptive_support': str(row.get('adaptive_support', 'No')),
-                'remote_support': str(row.get('remote_support', 'Yes')),
-                'relevance_score': float(final_score)
-            })
-        
-        # Sort and return top-k
-        recommendations.sort(key=lambda x: x['relevance_score'], reverse=True)
-        return recommendations[:top_k]
+        # Training pattern boost (all assessments at once)
+        if tier.use_training:
+            start = time.perf_counter()
+            components['training'] = self.training_learner.get_training_boosts(
+                query_lower,
+                catalog.url_index,
+                self.frequency_boosts
+            )[positions]
+            _TRAINING_SECONDS.observe(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        
+        # Technical / soft skills boosts (substring checks on pre-lowered text)
+        if tier.use_llm:
+            tech_boosts = np.zeros(len(positions), dtype=np.float64)
+            soft_boosts = np.zeros(len(positions), dtype=np.float64)
+            if llm_data.get('technical_skills') or llm_data.get('soft_skills'):
+                for i, idx in enumerate(positions):
+                    name_lower = catalog.names_lower[idx]
+                    desc_lower = catalog.descriptions_lower[idx]
+                    tech_boosts[i] = self._calculate_tech_boost(llm_data, name_lower, desc_lower)
+                    soft_boosts[i] = self._calculate_soft_boost(llm_data, name_lower, desc_lower)
+            components['technical'] = tech_boosts
+            components['soft'] = soft_boosts
+        
+        # Test type boost depends only on the query and the type bitmask
+        components['type'] = self._calculate_type_boosts(query_lower, catalog.test_type_mask[positions])
+        _BOOSTS_SECONDS.observe(time.perf_counter() - start)
+        return positions, components
     
     def _calculate_tech_boost(self, llm_data: Dict, name: str, desc: str) -> float:
         """Calculate technical skills boost"""
@@ -157,23 +486,16 @@ class RecommendationEngine:
                 boost += 0.25
         return min(boost, 1.0)
     
-    def _calculate_type_boost(self, query: str, test_type: str) -> float:
-        """Calculate test type matching boost"""
-        boost = 0.0
+    def _calculate_type_boosts(self, query: str, mask: np.ndarray) -> np.ndarray:
+        """Test type matching boost for each assessment, from its type bitmask"""
+        boosts = np.zeros(len(mask), dtype=np.float64)
         
         if any(word in query for word in ['programming', 'coding', 'developer']):
-            if 'knowledge & skills' in test_type:
-                boost += 0.3
+            bit = self.catalog.type_mask(['Knowledge & Skills'])
+            boosts += np.where(mask & bit, 0.3, 0.0)
         
         if any(word in query for word in ['personality', 'culture', 'behavior']):
-            if 'personality & behavior' in test_type:
-                boost += 0.3
+            bit = self.catalog.type_mask(['Personality & Behavior'])
+            boosts += np.where(mask & bit, 0.3, 0.0)
         
-        return boost
-    
-    @staticmethod
-    def _parse_test_types(test_type_str) -> List[str]:
-        """Parse test type string into list"""
-        if pd.isna(test_type_str):
-            return []
-        return [t.strip() for t in str(test_type_str).split('|') if t.strip()]
+        return boosts
@@ -0,0 +1,70 @@
+"""
+Response Cache
+Bounded LRU of rendered responses with a time-to-live
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of key -> (etag, body) entries that expire after ttl seconds
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """Return (etag, body) or None if missing/expired (counts a hit/miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        """Store a rendered response, evicting the least recently used entry if full"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl
+        }
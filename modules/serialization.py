@@ -0,0 +1,103 @@
+"""
+Serialization Module
+Fast JSON encoding and pre-rendered recommendation payloads
+
+orjson is used when installed (optional dependency); otherwise the
+standard library encoder with compact separators.
+"""
+import json
+from typing import Dict, Sequence
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def format_score(score: float, digits: int = None) -> bytes:
+    """JSON number for a score (shortest round-trip repr, like json.dumps)"""
+    value = float(score) if digits is None else round(float(score), digits)
+    return repr(value).encode('ascii')
+
+
+def render_fragment_prefix(record: Dict, with_score: bool = True) -> bytes:
+    """
+    Pre-render a recommendation object up to (and including) the score key
+
+    The record's 'relevance_score' must be its last key; the per-request
+    score is appended later as prefix + score + b'}'. Without the score
+    the fragment is the complete object.
+    """
+    static = {k: v for k, v in record.items() if k != 'relevance_score'}
+    body = dumps(static)
+    if not with_score:
+        return body
+    if not static:
+        return b'{"relevance_score":'
+    return body[:-1] + b',"relevance_score":'
+
+
+def render_recommendations(
+    prefixes: Sequence[bytes],
+    indices: Sequence[int],
+    scores: Sequence[float],
+    with_score: bool = True,
+    score_digits: int = None
+) -> bytes:
+    """JSON array of recommendations assembled from pre-rendered fragments"""
+    if with_score:
+        parts = [prefixes[idx] + format_score(score, score_digits) + b'}' for idx, score in zip(indices, scores)]
+    else:
+        parts = [prefixes[idx] for idx in indices]
+    return b'[' + b','.join(parts) + b']'
+
+
+def render_recommend_response(
+    query: str,
+    prefixes: Sequence[bytes],
+    indices: np.ndarray,
+    scores: np.ndarray,
+    filters: Dict = None,
+    extra: Dict = None,
+    with_score: bool = True,
+    score_digits: int = None
+) -> bytes:
+    """
+    Full /recommend response body without building per-result dicts or
+    re-validating trusted catalog data
+
+    Args:
+        query: Original query string
+        prefixes: Pre-rendered fragment per catalog position
+        indices: Ranked catalog positions
+        scores: Matching relevance scores
+        filters: Applied filters
+        extra: Additional top-level fields appended after the standard ones
+        with_score: False when the fragments were rendered without the score
+        score_digits: Round scores to this many decimals (compact responses)
+    """
+    body = [
+        b'{"query":', dumps(query),
+        b',"recommendations":', render_recommendations(prefixes, indices, scores, with_score, score_digits),
+        b',"count":', str(len(indices)).encode('ascii'),
+        b',"filters":', dumps(filters or {}),
+    ]
+    for key, value in (extra or {}).items():
+        body.append(b',' + dumps(key) + b':' + dumps(value))
+    body.append(b'}')
+    return b''.join(body)
+
+
+def loads(data: bytes):
+    """Parse JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
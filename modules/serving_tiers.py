@@ -0,0 +1,288 @@
+"""
+Serving Tiers
+Degradation modes of the hybrid scorer and how one is chosen:
+statically from config / available memory, then per request from
+observed stage latencies
+"""
+import json
+import threading
+from typing import Dict, Optional
+from modules import config
+from modules.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Hybrid score components (see RecommendationEngine.rank_with_requirements)
+COMPONENTS = ('tfidf', 'semantic', 'training', 'technical', 'soft', 'type')
+
+
+class ServingTier:
+    """
+    One degradation mode: which stages run and the weights of the components
+    that remain
+
+    weights=None means the engine's WEIGHT_* defaults (full tier only).
+    recall_at_10 is the Mean Recall@10 recorded on the labelled train set,
+    None where it could not be measured.
+    """
+
+    def __init__(self, name: str, use_llm: bool, use_semantic: bool, use_training: bool,
+                 weights: Optional[Dict[str, float]], recall_at_10: Optional[float], description: str):
+        self.name = name
+        self.use_llm = use_llm
+        self.use_semantic = use_semantic
+        self.use_training = use_training
+        self.weights = weights
+        self.recall_at_10 = recall_at_10
+        self.description = description
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'use_llm': self.use_llm,
+            'use_semantic': self.use_semantic,
+            'use_training': self.use_training,
+            'weights': self.weights,
+            'recall_at_10': self.recall_at_10,
+            'description': self.description
+        }
+
+    def __repr__(self) -> str:
+        return f"ServingTier({self.name})"
+
+
+def renormalize(weights: Dict[str, float]) -> Dict[str, float]:
+    """Scale weights to sum to 1 so scores stay comparable across tiers"""
+    total = sum(weights.values())
+    return {name: value / total for name, value in weights.items()} if total else dict(weights)
+
+
+# Best to cheapest. Non-full tiers start from the full-tier ratios of the
+# components they keep, renormalized to sum to 1. The lexical tiers were
+# grid-searched on the train set with `python -m benchmarks.serving_tiers
+# --tune` and `python -m benchmarks.tune_weights --tier lexical --llm none
+# --method grid --step 0.01`: recall is flat across the grid (every catalog
+# row carries the same test types, so the type boost never reorders and
+# `lexical` ranks by TF-IDF alone), so the renormalized ratios were kept.
+# lexical-llm is what a request gets when only the encoder is over its
+# latency budget; its recall needs live LLM extractions and is unmeasured. no-LLM was tuned
+# with `python -m benchmarks.tune_weights --tier no-llm --llm none --method
+# grid` (all-MiniLM-L6-v2 embeddings): its best grid point (tfidf 0.60,
+# semantic 0.10, training 0.30, type 0) reaches 0.904 on the train set but
+# 0.842 under nested leave-one-query-out against 0.867 for the renormalized
+# ratios, so with 10 labelled queries the renormalized ratios were kept.
+# Recall@10 is on the train set, which the training patterns were learned
+# from, like the full tier's reported 90.4%.
+TIERS = {
+    'full': ServingTier(
+        'full', use_llm=True, use_semantic=True, use_training=True,
+        weights=None,
+        recall_at_10=0.904,
+        description="TF-IDF + semantic + training patterns + LLM skill boosts"
+    ),
+    'no-llm': ServingTier(
+        'no-llm', use_llm=False, use_semantic=True, use_training=True,
+        weights=renormalize({'tfidf': 0.35, 'semantic': 0.18, 'training': 0.20, 'type': 0.10}),
+        recall_at_10=0.867,
+        description="Skips the Groq call; TF-IDF + semantic + training patterns"
+    ),
+    'lexical-llm': ServingTier(
+        'lexical-llm', use_llm=True, use_semantic=False, use_training=True,
+        weights=renormalize({'tfidf': 0.35, 'training': 0.20, 'technical': 0.12, 'soft': 0.05, 'type': 0.10}),
+        recall_at_10=None,
+        description="Skips the query embedding; TF-IDF + training patterns + LLM skill boosts"
+    ),
+    'lexical-training': ServingTier(
+        'lexical-training', use_llm=False, use_semantic=False, use_training=True,
+        weights=renormalize({'tfidf': 0.35, 'training': 0.20, 'type': 0.10}),
+        recall_at_10=0.859,
+        description="No embedding model (torch never loads); TF-IDF + training patterns"
+    ),
+    'lexical': ServingTier(
+        'lexical', use_llm=False, use_semantic=False, use_training=False,
+        weights=renormalize({'tfidf': 0.35, 'type': 0.10}),
+        recall_at_10=0.273,
+        description="TF-IDF only (plus query test-type boost)"
+    ),
+}
+TIER_ORDER = ('full', 'no-llm', 'lexical-llm', 'lexical-training', 'lexical')
+
+
+def tier_with(use_llm: bool, use_semantic: bool, use_training: bool) -> ServingTier:
+    """The tier running exactly these stages"""
+    for tier in TIERS.values():
+        if (tier.use_llm, tier.use_semantic, tier.use_training) == (use_llm, use_semantic, use_training):
+            return tier
+    raise ValueError(f"No serving tier with use_llm={use_llm}, use_semantic={use_semantic}, "
+                     f"use_training={use_training}")
+
+
+def get_tier(name: str) -> ServingTier:
+    try:
+        return TIERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown serving tier '{name}' (expected one of {', '.join(TIER_ORDER)} or auto)")
+
+
+def load_tuned_weights(path: str) -> Dict[str, Dict[str, float]]:
+    """
+    Per-tier weights exported by the weight tuner ({'tiers': {name: weights}})
+
+    Unknown tiers and components are rejected so a stale file fails at startup.
+    """
+    if not path:
+        return {}
+    with open(path) as f:
+        tiers = json.load(f).get('tiers', {})
+    for name, weights in tiers.items():
+        get_tier(name)
+        unknown = set(weights) - set(COMPONENTS)
+        if unknown:
+            raise ValueError(f"Unknown components {sorted(unknown)} for tier '{name}' in {path}")
+    logger.info(f"✅ Loaded tuned weights for {', '.join(tiers) or 'no tiers'} from {path}")
+    return {name: {component: float(value) for component, value in weights.items()}
+            for name, weights in tiers.items()}
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+        return int(value) if value.isdigit() else None
+    except OSError:
+        return None
+
+
+def available_memory_mb() -> Optional[float]:
+    """
+    Memory this process can still use: the container (cgroup) limit minus
+    its usage, or MemAvailable, whichever is smaller; None if unknown
+    """
+    candidates = []
+
+    # cgroup v2, then v1 (v1 reports a huge number when unlimited)
+    for limit_path, usage_path in (
+        ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+        ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes'),
+    ):
+        limit = _read_int(limit_path)
+        if limit is not None and limit < 1 << 60:
+            usage = _read_int(usage_path) or 0
+            candidates.append((limit - usage) / (1024 * 1024))
+            break
+
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    candidates.append(int(line.split()[1]) / 1024)
+                    break
+    except OSError:
+        pass
+
+    return min(candidates) if candidates else None
+
+
+def semantic_memory_requirement_mb(encoder_backend: str) -> float:
+    """Free memory needed to load the query encoder in-process"""
+    if config.EMBEDDING_SERVICE_SOCKET:
+        return 0.0
+    if encoder_backend.startswith('onnx'):
+        return config.ONNX_MIN_MEMORY_MB
+    return config.SEMANTIC_MIN_MEMORY_MB
+
+
+def select_serving_tier(
+    requested: str = None,
+    llm_available: bool = True,
+    encoder_backend: str = None,
+    memory_mb: float = None
+) -> ServingTier:
+    """
+    Static tier for this process
+
+    An explicit tier is used as-is. 'auto' starts from full and drops the
+    LLM when no client is configured and the embedding model when the
+    free memory is below what the encoder backend needs.
+    """
+    requested = (requested or config.SERVING_TIER).lower()
+    if requested != 'auto':
+        return get_tier(requested)
+
+    tier = TIERS['full'] if llm_available else TIERS['no-llm']
+
+    if memory_mb is None:
+        memory_mb = available_memory_mb()
+    needed = semantic_memory_requirement_mb(encoder_backend or config.ENCODER_BACKEND)
+    if memory_mb is not None and memory_mb < needed:
+        logger.warning(f"Only {memory_mb:.0f} MB available (< {needed:.0f} MB for the encoder) - "
+                       f"serving without semantic scoring")
+        tier = tier_with(tier.use_llm, False, tier.use_training)
+
+    logger.info(f"✅ Serving tier: {tier.name} ({tier.description})")
+    return tier
+
+
+class TierSelector:
+    """
+    Per-request tier: the static base tier, downgraded while a stage's
+    observed latency (EWMA) is over its budget
+
+    The LLM and semantic stages are dropped independently: a slow encoder
+    alone keeps the LLM skill boosts (full -> lexical-llm) and a slow LLM
+    alone keeps the embeddings (full -> no-llm).
+
+    While degraded, every probe_every-th request still runs the skipped
+    stage so its latency keeps being measured and the tier can recover.
+    """
+
+    STAGES = ('llm', 'semantic')
+
+    def __init__(self, base_tier: ServingTier, llm_budget_ms: float = None,
+                 semantic_budget_ms: float = None, probe_every: int = None, alpha: float = 0.2):
+        self.base_tier = base_tier
+        self.budgets_ms = {
+            'llm': config.LLM_LATENCY_BUDGET_MS if llm_budget_ms is None else llm_budget_ms,
+            'semantic': config.SEMANTIC_LATENCY_BUDGET_MS if semantic_budget_ms is None else semantic_budget_ms,
+        }
+        self.probe_every = max(1, config.TIER_PROBE_EVERY if probe_every is None else probe_every)
+        self.alpha = alpha
+        self.latency_ms = {stage: None for stage in self.STAGES}
+        self.served = {name: 0 for name in TIER_ORDER}
+        self._requests = 0
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one stage latency"""
+        ms = seconds * 1000
+        with self._lock:
+            current = self.latency_ms[stage]
+            self.latency_ms[stage] = ms if current is None else (1 - self.alpha) * current + self.alpha * ms
+
+    def _over_budget(self, stage: str) -> bool:
+        budget = self.budgets_ms[stage]
+        latency = self.latency_ms[stage]
+        return budget > 0 and latency is not None and latency > budget
+
+    def current(self) -> ServingTier:
+        """Tier for the next request"""
+        with self._lock:
+            self._requests += 1
+            probe = self._requests % self.probe_every == 0
+            tier = self.base_tier
+            if not probe:
+                use_llm = tier.use_llm and not self._over_budget('llm')
+                use_semantic = tier.use_semantic and not self._over_budget('semantic')
+                if (use_llm, use_semantic) != (tier.use_llm, tier.use_semantic):
+                    tier = tier_with(use_llm, use_semantic, tier.use_training)
+            self.served[tier.name] += 1
+            return tier
+
+    def stats(self) -> Dict:
+        return {
+            'base_tier': self.base_tier.name,
+            'latency_ms': dict(self.latency_ms),
+            'budgets_ms': dict(self.budgets_ms),
+            'served': dict(self.served),
+            'tiers': {name: TIERS[name].to_dict() for name in TIER_ORDER}
+        }
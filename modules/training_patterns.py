@@ -2,6 +2,7 @@
 Training Patterns Module
 Learns patterns from training data
 """
+import numpy as np
 import pandas as pd
 from collections import defaultdict
 from typing import Dict, List
@@ -26,23 +27,52 @@ class TrainingPatternsLearner:
         """
         print("Learning patterns from training data...")
         
-        # Build assessment frequency map
-        for url in train_df_merged['normalized_url']:
-            self.assessment_freq[url] += 1
-        
-        # Build query-keyword to assessment patterns
-        for _, row in train_df_merged.iterrows():
-            query = str(row['Query']).lower()
-            url = row['normalized_url']
-            
-            # Extract keywords (simple: words > 3 chars)
-            for word in query.split():
-                if len(word) > 3:
-                    self.keyword_to_assessments[word].append(url)
+        self.add_examples(train_df_merged)
         
         print(f"✅ Learned {len(self.assessment_freq)} popular assessments")
         print(f"✅ Learned {len(self.keyword_to_assessments)} keyword patterns")
     
+    @staticmethod
+    def _keyword_pairs(train_df_merged: pd.DataFrame):
+        """(keyword, url) pattern entries of each row (keywords: query words > 3 chars)"""
+        for query, url in zip(train_df_merged['Query'], train_df_merged['normalized_url']):
+            for word in str(query).lower().split():
+                if len(word) > 3:
+                    yield word, url
+    
+    def add_examples(self, train_df_merged: pd.DataFrame) -> None:
+        """Add the frequency and keyword patterns of some training rows"""
+        for url in train_df_merged['normalized_url']:
+            self.assessment_freq[url] += 1
+        for word, url in self._keyword_pairs(train_df_merged):
+            self.keyword_to_assessments[word].append(url)
+    
+    def remove_examples(self, train_df_merged: pd.DataFrame) -> None:
+        """
+        Subtract rows previously added (e.g. a held-out fold) without
+        relearning the rest; add_examples puts them back
+
+        The latest matching entries go first, so removing rows right after
+        adding them restores the exact previous state. Removing older rows
+        and adding them back restores the same counts, though a keyword's
+        list may come back in another order (lookups ignore the order).
+        """
+        for url in train_df_merged['normalized_url']:
+            self.assessment_freq[url] -= 1
+            if self.assessment_freq[url] <= 0:
+                del self.assessment_freq[url]
+        for word, url in reversed(list(self._keyword_pairs(train_df_merged))):
+            urls = self.keyword_to_assessments[word]
+            del urls[len(urls) - 1 - urls[::-1].index(url)]
+            if not urls:
+                del self.keyword_to_assessments[word]
+    
+    def frequency_boost(self, url: str) -> float:
+        """Popularity part of the training boost (query independent)"""
+        if url in self.assessment_freq:
+            return min(self.assessment_freq[url] * 0.08, 0.4)
+        return 0.0
+    
     def get_training_boost(self, url: str, query_lower: str) -> float:
         """
         Calculate training pattern boost for an assessment
@@ -53,8 +83,7 @@ class TrainingPatternsLearner:
         boost = 0.0
         
         # Frequency boost (popular assessments)
-        if url in self.assessment_freq:
-            boost += min(self.assessment_freq[url] * 0.08, 0.4)
+        boost += self.frequency_boost(url)
         
         # Keyword pattern boost
         for word in query_lower.split():
@@ -63,3 +92,32 @@ class TrainingPatternsLearner:
                     boost += 0.15
         
         return min(boost, 1.0)
+    
+    def get_training_boosts(
+        self,
+        query_lower: str,
+        url_index: Dict[str, int],
+        frequency_boosts: np.ndarray
+    ) -> np.ndarray:
+        """
+        Training boost for every catalog assessment at once
+        
+        Walks only the query words' pattern lists instead of scanning every
+        list once per assessment. Equivalent to get_training_boost per url.
+        
+        Args:
+            query_lower: Lower-cased query
+            url_index: normalized_url -> catalog position
+            frequency_boosts: Precomputed frequency_boost per catalog position
+        """
+        matches = np.zeros(len(frequency_boosts), dtype=np.float64)
+        for word in query_lower.split():
+            urls = self.keyword_to_assessments.get(word)
+            if not urls:
+                continue
+            for url in set(urls):
+                idx = url_index.get(url)
+                if idx is not None:
+                    matches[idx] += 1
+        
+        return np.minimum(frequency_boosts + 0.15 * matches, 1.0)
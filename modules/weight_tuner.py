@@ -0,0 +1,349 @@
+"""
+Weight Tuner
+Searches the hybrid scoring weights against the labelled train queries
+
+Each component's query x catalog score matrix (tfidf, semantic, training,
+technical, soft, type) is computed once through the engine and cached on
+disk. A weight setting then costs a weighted sum and a top-k per query,
+so thousands of settings are scored per second. The best weights are
+exported as JSON that the engine loads with SHL_WEIGHTS_FILE.
+"""
+import hashlib
+import itertools
+import json
+import time
+import numpy as np
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+from modules import config
+from modules.evaluator import DEFAULT_KS, Evaluator, hit_metrics
+from modules.filters import RecommendationFilters, build_candidate_mask
+from modules.logger import setup_logger
+from modules.serving_tiers import COMPONENTS, ServingTier, renormalize
+
+logger = setup_logger(__name__)
+
+# Catalogs up to this size are ranked with a full stable sort (ties keep
+# catalog order, exactly as the engine); larger ones use argpartition,
+# where ties straddling the cutoff may resolve differently
+EXACT_SORT_MAX_CATALOG = 4096
+
+# Upper bound on the (settings x queries x catalog) score block per step
+MAX_BLOCK_BYTES = 256 * 1024 * 1024
+
+
+class ComponentMatrices:
+    """
+    Unweighted component scores of every labelled query over the catalog
+
+    scores: (components, queries, catalog) float64
+    valid: (queries, catalog) bool, False where the query's filters exclude the item
+    relevant: (queries, catalog) bool ground truth
+    """
+
+    def __init__(self, components: List[str], queries: List[str], scores: np.ndarray,
+                 valid: np.ndarray, relevant: np.ndarray, key: str = ''):
+        self.components = list(components)
+        self.queries = list(queries)
+        self.scores = scores
+        self.valid = valid
+        self.relevant = relevant
+        self.n_relevant = relevant.sum(axis=1)
+        self.key = key
+
+    @staticmethod
+    def cache_key(evaluator: Evaluator, tier: ServingTier, queries: List[str], requirements: List[Dict],
+                  filters: List[RecommendationFilters]) -> str:
+        """Everything the component scores and the valid mask depend on (but not the weights)"""
+        engine = evaluator.recommender
+        digest = hashlib.blake2b(digest_size=12)
+        for prefix in engine.catalog.json_prefixes:
+            digest.update(prefix)
+        digest.update(engine.frequency_boosts.tobytes())
+        for keyword in sorted(engine.training_learner.keyword_to_assessments):
+            digest.update(repr((keyword, engine.training_learner.keyword_to_assessments[keyword])).encode('utf-8'))
+        digest.update(json.dumps([
+            tier.use_llm, tier.use_semantic, tier.use_training,
+            engine.feature_extractor.encoder_backend, engine.feature_extractor.keyword_mode,
+            queries, requirements, config.EXTRACT_QUERY_FILTERS,
+            [query_filters.cache_key() for query_filters in filters]
+        ], sort_keys=True, default=str).encode('utf-8'))
+        # The candidates the filters leave (inferred fields that would match
+        # nothing are dropped), so a change in mask building invalidates too
+        for query_filters in filters:
+            mask = build_candidate_mask(engine.catalog, query_filters)
+            digest.update(b'all' if mask is None else np.packbits(mask).tobytes())
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, evaluator: Evaluator, tier: ServingTier, llm: str = 'cached',
+              cache_dir: Optional[str] = '.eval_cache') -> 'ComponentMatrices':
+        """
+        Score every labelled query through engine.score_components, or load
+        the matrices from cache_dir when nothing they depend on changed
+        """
+        engine = evaluator.recommender
+        if not engine.initialized:
+            engine.initialize()
+        queries, relevant_sets = evaluator.labelled_queries()
+        requirements = evaluator.extract_requirements(queries, llm if tier.use_llm else 'none')
+        filters = [engine.resolve_filters(query) for query in queries]
+        key = cls.cache_key(evaluator, tier, queries, requirements, filters)
+
+        cache_path = Path(cache_dir) / f"components_{key}.npz" if cache_dir else None
+        if cache_path is not None and cache_path.exists():
+            with np.load(cache_path, allow_pickle=False) as data:
+                logger.info(f"✅ Loaded component matrices from {cache_path}")
+                return cls(list(data['components']), queries, data['scores'], data['valid'], data['relevant'], key)
+
+        start = time.perf_counter()
+        if tier.use_semantic:
+            embeddings = evaluator.query_embeddings(queries, requirements)
+        else:
+            embeddings = [None] * len(queries)
+        size = engine.catalog.size
+        # Components the tier computes, in the engine's summation order
+        components = [name for name in COMPONENTS if name in cls._tier_components(tier)]
+        scores = np.zeros((len(components), len(queries), size), dtype=np.float64)
+        valid = np.zeros((len(queries), size), dtype=bool)
+        relevant = np.zeros((len(queries), size), dtype=bool)
+        url_index = engine.catalog.url_index
+
+        for q, (query, llm_data, embedding) in enumerate(zip(queries, requirements, embeddings)):
+            positions, scored = engine.score_components(
+                query,
+                llm_data,
+                query_embedding=embedding,
+                filters=filters[q],
+                tier=tier
+            )
+            valid[q, positions] = True
+            for c, name in enumerate(components):
+                if name in scored:
+                    scores[c, q, positions] = scored[name]
+            relevant[q, [url_index[url] for url in relevant_sets[q]]] = True
+
+        # Components that are zero everywhere (e.g. skill boosts without LLM data) can't be tuned
+        used = [c for c, name in enumerate(components) if name == 'tfidf' or scores[c].any()]
+        matrices = cls([components[c] for c in used], queries, scores[used], valid, relevant, key)
+        logger.info(f"✅ Built {len(used)} component matrices ({len(queries)} queries x {size} assessments) "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(cache_path, components=np.array(matrices.components), scores=matrices.scores,
+                     valid=valid, relevant=relevant)
+        return matrices
+
+    @staticmethod
+    def _tier_components(tier: ServingTier) -> List[str]:
+        names = ['tfidf', 'type']
+        if tier.use_semantic:
+            names.append('semantic')
+        if tier.use_training:
+            names.append('training')
+        if tier.use_llm:
+            names += ['technical', 'soft']
+        return names
+
+    def subset(self, query_indices: Sequence[int]) -> 'ComponentMatrices':
+        """Matrices restricted to some queries (e.g. one cross-validation fold)"""
+        idx = np.asarray(query_indices)
+        return ComponentMatrices(self.components, [self.queries[i] for i in idx], self.scores[:, idx],
+                                 self.valid[idx], self.relevant[idx], self.key)
+
+
+class WeightTuner:
+    """
+    Scores weight settings on ComponentMatrices and searches for the best
+
+    Weight vectors are ordered like matrices.components. Scores are summed
+    component by component in the engine's order, so rankings match
+    RecommendationEngine.rank_with_requirements bit for bit.
+    """
+
+    def __init__(self, matrices: ComponentMatrices, objective: str = 'recall@10', ks: Sequence[int] = DEFAULT_KS):
+        self.matrices = matrices
+        self.ks = sorted(set(ks) | {int(objective.split('@')[1])})
+        self.objective = objective
+        # Secondary objective breaks ties between equally good settings
+        self.tiebreak = 'ndcg@10' if objective != 'ndcg@10' else 'map@10'
+        if int(self.tiebreak.split('@')[1]) not in self.ks:
+            self.tiebreak = f"ndcg@{max(self.ks)}"
+        self.evaluated = 0
+
+    def to_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        return np.array([weights.get(name, 0.0) for name in self.matrices.components], dtype=np.float64)
+
+    def to_dict(self, vector: np.ndarray) -> Dict[str, float]:
+        return {name: float(value) for name, value in zip(self.matrices.components, vector)}
+
+    def _block_size(self) -> int:
+        _, n_queries, size = self.matrices.scores.shape
+        return max(1, MAX_BLOCK_BYTES // max(1, n_queries * size * 8))
+
+    def score(self, weights: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Mean metrics of each weight setting
+
+        Args:
+            weights: (settings, components) array
+
+        Returns:
+            {'recall@10': (settings,) array, ...}
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        m = self.matrices
+        max_k = max(self.ks)
+        size = m.scores.shape[2]
+        results: Dict[str, List[np.ndarray]] = {}
+
+        for start in range(0, len(weights), self._block_size()):
+            block = weights[start:start + self._block_size()]
+            scores = None
+            for c in range(len(m.components)):
+                weighted = block[:, c, None, None] * m.scores[c][None]
+                scores = weighted if scores is None else scores + weighted
+            scores = np.where(m.valid[None], scores, -np.inf)
+
+            if size <= EXACT_SORT_MAX_CATALOG:
+                ranked = np.argsort(-scores, axis=-1, kind='stable')[..., :max_k]
+            else:
+                top = np.argpartition(-scores, min(max_k, size) - 1, axis=-1)[..., :max_k]
+                top_scores = np.take_along_axis(scores, top, axis=-1)
+                ranked = np.take_along_axis(top, np.lexsort((top, -top_scores), axis=-1), axis=-1)
+
+            relevant = np.broadcast_to(m.relevant[None], (len(block),) + m.relevant.shape)
+            hits = np.take_along_axis(relevant, ranked, axis=-1)
+            hits &= np.isfinite(np.take_along_axis(scores, ranked, axis=-1))
+            for name, values in hit_metrics(hits.astype(np.float64), m.n_relevant[None], self.ks).items():
+                results.setdefault(name, []).append(values.mean(axis=1))
+
+        self.evaluated += len(weights)
+        return {name: np.concatenate(parts) for name, parts in results.items()}
+
+    # Candidate generators -------------------------------------------------
+
+    def grid(self, step: float = 0.05, required: Sequence[str] = ()) -> Iterable[np.ndarray]:
+        """All weight vectors on a step grid that sum to 1, with required components > 0"""
+        units = int(round(1 / step))
+        n = len(self.matrices.components)
+        required_idx = [self.matrices.components.index(name) for name in required if name in self.matrices.components]
+        for split in itertools.product(range(units + 1), repeat=n - 1):
+            if sum(split) <= units:
+                vector = np.array(list(split) + [units - sum(split)], dtype=np.float64) * step
+                if all(vector[i] > 0 for i in required_idx):
+                    yield vector
+
+    def random(self, samples: int, seed: int = 0) -> Iterable[np.ndarray]:
+        """Uniform samples from the weight simplex"""
+        rng = np.random.default_rng(seed)
+        yield from rng.dirichlet(np.ones(len(self.matrices.components)), size=samples)
+
+    # Search ---------------------------------------------------------------
+
+    def _key(self, metrics: Dict[str, np.ndarray], i: int, distance: float) -> tuple:
+        # Larger is better: (objective, tiebreak, -distance from the starting weights)
+        return (round(float(metrics[self.objective][i]), 12), round(float(metrics[self.tiebreak][i]), 12), -distance)
+
+    def search_candidates(self, candidates: Iterable[np.ndarray], start: np.ndarray, batch: int = 1024):
+        """Best of start and every candidate; ties prefer the setting closest to start"""
+        metrics = self.score(start[None])
+        best_vector, best_key = start, self._key(metrics, 0, 0.0)
+        chunk = []
+
+        def flush():
+            nonlocal best_vector, best_key
+            vectors = np.vstack(chunk)
+            scored = self.score(vectors)
+            for i, vector in enumerate(vectors):
+                key = self._key(scored, i, float(np.abs(vector - start).sum()))
+                if key > best_key:
+                    best_vector, best_key = vector, key
+            chunk.clear()
+
+        for vector in candidates:
+            chunk.append(vector)
+            if len(chunk) >= batch:
+                flush()
+        if chunk:
+            flush()
+        return best_vector
+
+    def coordinate_ascent(self, start: np.ndarray, step: float = 0.05, rounds: int = 20,
+                          scales: Sequence[float] = (4, 2, 1, 0.5)) -> np.ndarray:
+        """
+        Move one component's weight at a time (by multiples of step) while
+        the objective improves, renormalizing to sum 1
+        """
+        current = start
+        for _ in range(rounds):
+            candidates = []
+            for c in range(len(current)):
+                for scale in scales:
+                    for sign in (1, -1):
+                        vector = current.copy()
+                        vector[c] = max(0.0, vector[c] + sign * scale * step)
+                        if vector.sum() > 0:
+                            candidates.append(vector / vector.sum())
+            best = self.search_candidates(candidates, current)
+            if np.allclose(best, current):
+                break
+            current = best
+        return current
+
+    def search(self, start_weights: Dict[str, float], method: str = 'coordinate', step: float = 0.05,
+               samples: int = 5000, rounds: int = 20, seed: int = 0, required: Sequence[str] = ()) -> Dict:
+        """
+        Run one search method from the current weights
+
+        Returns:
+            {'method', 'weights', 'metrics', 'baseline_weights', 'baseline_metrics',
+             'evaluated', 'seconds', 'settings_per_s'}
+        """
+        start = self.to_vector(start_weights)
+        self.evaluated = 0
+        began = time.perf_counter()
+        if method == 'grid':
+            best = self.search_candidates(self.grid(step, required), start)
+        elif method == 'random':
+            best = self.search_candidates(self.random(samples, seed), start)
+        elif method == 'coordinate':
+            best = self.coordinate_ascent(start, step, rounds)
+        else:
+            raise ValueError(f"Unknown search method '{method}' (expected grid, random or coordinate)")
+        seconds = time.perf_counter() - began
+        evaluated = self.evaluated
+
+        baseline = self.score(start[None])
+        tuned = self.score(best[None])
+        return {
+            'method': method,
+            'objective': self.objective,
+            # Components left out of the matrices keep their current weight
+            'weights': renormalize(dict(start_weights, **self.to_dict(best))),
+            'metrics': {name: float(values[0]) for name, values in tuned.items()},
+            'baseline_weights': dict(start_weights),
+            'baseline_metrics': {name: float(values[0]) for name, values in baseline.items()},
+            'evaluated': evaluated,
+            'seconds': seconds,
+            'settings_per_s': evaluated / seconds if seconds > 0 else None
+        }
+
+
+def export_weights(path: str, tier_name: str, result: Dict) -> None:
+    """Write (or update) a weights file: {'tiers': {tier: weights}, 'tuning': {tier: details}}"""
+    target = Path(path)
+    data = json.loads(target.read_text()) if target.exists() else {}
+    data.setdefault('tiers', {})[tier_name] = result['weights']
+    data.setdefault('tuning', {})[tier_name] = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'method': result['method'],
+        'objective': result['objective'],
+        'metrics': result['metrics'],
+        'baseline_metrics': result['baseline_metrics'],
+    }
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(data, indent=2))
+    logger.info(f"✅ Exported {tier_name} weights to {target}")
@@ -0,0 +1,92 @@
+"""Admission queue: priority order, queue-time budget and cancellation"""
+import asyncio
+import pytest
+from modules.admission import AdmissionController
+from modules.exceptions import AdmissionRejectedException
+
+
+def controller(max_queue=10, timeout=1.0):
+    return AdmissionController(
+        max_concurrency=1,
+        class_limits={'interactive': (max_queue, timeout), 'batch': (max_queue, timeout)}
+    )
+
+
+def test_interactive_is_served_before_batch():
+    async def scenario():
+        admission = controller()
+        await admission.acquire('interactive')
+        order = []
+
+        async def request(name, priority):
+            await admission.acquire(priority)
+            order.append(name)
+            admission.release()
+
+        tasks = [asyncio.create_task(request('batch-1', 'batch')),
+                 asyncio.create_task(request('batch-2', 'batch'))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request('interactive', 'interactive')))
+        await asyncio.sleep(0)
+        assert admission.stats()['queued'] == {'interactive': 1, 'batch': 2}
+
+        admission.release()
+        await asyncio.gather(*tasks)
+        return order, admission
+
+    order, admission = asyncio.run(scenario())
+    assert order == ['interactive', 'batch-1', 'batch-2']
+    assert admission.active == 0
+    assert admission.stats()['queue_depth'] == 0
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def scenario():
+        admission = controller(timeout=0.05)
+        await admission.acquire()
+        with pytest.raises(AdmissionRejectedException) as rejected:
+            await admission.acquire()
+        return admission, rejected.value
+
+    admission, error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert admission.rejected_timeout['interactive'] == 1
+    assert admission.queued['interactive'] == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        admission = controller(max_queue=1)
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedException) as rejected:
+            await admission.acquire()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return rejected.value
+
+    assert asyncio.run(scenario()).status_code == 429
+
+
+def test_cancelled_waiter_is_skipped():
+    async def scenario():
+        admission = controller()
+        await admission.acquire()
+        gone = asyncio.create_task(admission.acquire())
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+
+        gone.cancel()
+        await asyncio.gather(gone, return_exceptions=True)
+        assert admission.queued['interactive'] == 1
+
+        admission.release()
+        await waiting
+        assert admission.active == 1
+        admission.release()
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.active == 0
+    assert admission.stats()['queue_depth'] == 0
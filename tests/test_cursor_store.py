@@ -0,0 +1,72 @@
+"""Ranking cursor store: sliding TTL and LRU eviction"""
+import numpy as np
+import pytest
+from modules import cursor_store
+from modules.cursor_store import RankingCursorStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cursor_store.time, 'monotonic', clock)
+    return clock
+
+
+def create(store, n=5):
+    return store.create(np.arange(n), np.linspace(1, 0, n), query='q', filters={}, fields=('assessment_url',),
+                        compact=False, page_size=2, index_version='v1')
+
+
+def test_pages_are_slices_of_the_ranking(clock):
+    cursor = create(RankingCursorStore())
+    indices, scores = cursor.page(2, 2)
+    assert indices.tolist() == [2, 3]
+    assert scores.tolist() == pytest.approx([0.5, 0.25])
+    assert cursor.page(4, 2)[0].tolist() == [4]
+
+
+def test_cursor_expires_after_ttl(clock):
+    store = RankingCursorStore(ttl=10)
+    cursor = create(store)
+    clock.now += 10
+    assert store.get(cursor.cursor_id) is None
+    assert store.expired == 1
+    assert len(store) == 0
+
+
+def test_reads_extend_the_ttl(clock):
+    store = RankingCursorStore(ttl=10)
+    cursor = create(store)
+    for _ in range(3):
+        clock.now += 9
+        assert store.get(cursor.cursor_id) is cursor
+
+
+def test_purge_expired(clock):
+    store = RankingCursorStore(ttl=10)
+    create(store)
+    clock.now += 5
+    fresh = create(store)
+    clock.now += 6
+    assert store.purge_expired() == 1
+    assert store.get(fresh.cursor_id) is fresh
+
+
+def test_least_recently_used_is_evicted(clock):
+    store = RankingCursorStore(max_entries=2)
+    first, second = create(store), create(store)
+    store.get(first.cursor_id)
+    third = create(store)
+    assert store.get(second.cursor_id) is None
+    assert store.get(first.cursor_id) is first
+    assert store.get(third.cursor_id) is third
+    assert store.evicted == 1
+    assert store.stats()['cursors'] == 2
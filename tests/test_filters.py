@@ -0,0 +1,100 @@
+"""Query filter extraction and candidate masks"""
+import pandas as pd
+import pytest
+from modules.catalog import CompactCatalog
+from modules.filters import RecommendationFilters, build_candidate_mask, validate_test_types
+
+
+@pytest.fixture
+def catalog():
+    return CompactCatalog.from_dataframe(pd.DataFrame({
+        'name': ['Java Test', 'OPQ Personality', 'Verify Numerical'],
+        'url': ['u1', 'u2', 'u3'],
+        'normalized_url': ['u1', 'u2', 'u3'],
+        'description': ['', '', ''],
+        'duration': [25, 25, 18],
+        'remote_support': ['Yes', 'Yes', 'No'],
+        'adaptive_support': ['No', 'No', 'Yes'],
+        'test_type': ['Knowledge & Skills', 'Personality & Behavior|Knowledge & Skills',
+                      'Ability & Aptitude|Knowledge & Skills'],
+    }))
+
+
+@pytest.mark.parametrize('query', [
+    "Graduate trainee role, no prior knowledge required",
+    "Customer service rep, without technical background",
+    "Willing to work extra hours",
+    "not only technical but also people skills",
+    "Remote sensing analyst",
+    "Adaptive leadership for managers",
+    "Work on-site in Pune",
+])
+def test_job_wording_is_not_a_filter(query):
+    assert RecommendationFilters.from_query(query).is_empty()
+
+
+@pytest.mark.parametrize('query, expected', [
+    ("Need a test under 40 minutes", {'max_duration': 40}),
+    ("at least 20 minutes", {'min_duration': 20}),
+    ("not more than 30 mins", {'max_duration': 30}),
+    ("about 1-2 hours", {'max_duration': 120}),
+    ("half an hour", {'max_duration': 30}),
+    ("no personality tests please", {'exclude_types': ['Personality & Behavior']}),
+    ("personality only", {'include_types': ['Personality & Behavior']}),
+    ("only cognitive assessments", {'include_types': ['Ability & Aptitude']}),
+    ("remote testing", {'remote': True}),
+    ("in-person assessments", {'remote': False}),
+    ("non-adaptive tests", {'adaptive': False}),
+])
+def test_stated_constraints(query, expected):
+    filters = RecommendationFilters.from_query(query)
+    assert filters.to_dict() == expected
+    assert filters.inferred == set(expected)
+
+
+def test_explicit_values_win_and_stay_explicit():
+    merged = RecommendationFilters(max_duration=60).merged_with(
+        RecommendationFilters.from_query("remote testing under 10 minutes")
+    )
+    assert merged.to_dict() == {'max_duration': 60, 'remote': True}
+    assert merged.inferred == {'remote'}
+
+
+def test_inferred_filters_narrow_when_something_matches(catalog):
+    mask = build_candidate_mask(catalog, RecommendationFilters.from_query("adaptive tests"))
+    assert mask.tolist() == [False, False, True]
+
+
+def test_inferred_filters_never_empty_the_result(catalog):
+    # Every row is Knowledge & Skills and none is under 5 minutes
+    for query in ("no technical tests", "under 5 minutes"):
+        assert build_candidate_mask(catalog, RecommendationFilters.from_query(query)) is None
+
+
+def test_fallback_keeps_explicit_filters(catalog):
+    filters = RecommendationFilters(remote=False).merged_with(RecommendationFilters.from_query("under 5 minutes"))
+    assert build_candidate_mask(catalog, filters).tolist() == [False, False, True]
+
+
+def test_explicit_filters_can_empty_the_result(catalog):
+    assert not build_candidate_mask(catalog, RecommendationFilters(max_duration=5)).any()
+
+
+def test_cache_key_tells_inferred_from_explicit():
+    explicit = RecommendationFilters(max_duration=40)
+    inferred = RecommendationFilters.from_query("under 40 minutes")
+    assert explicit.to_dict() == inferred.to_dict()
+    assert explicit.cache_key() != inferred.cache_key()
+
+
+def test_only_the_inferred_field_that_empties_the_result_is_dropped(catalog):
+    # Every row is Knowledge & Skills, so only the exclusion is unsatisfiable
+    filters = RecommendationFilters.from_query("remote testing, under 30 minutes, no technical tests")
+    assert filters.to_dict() == {'max_duration': 30, 'remote': True, 'exclude_types': ['Knowledge & Skills']}
+    assert build_candidate_mask(catalog, filters).tolist() == [True, True, False]
+
+
+def test_unknown_explicit_test_types_are_rejected():
+    assert validate_test_types(['P', 'cognitive', 'Knowledge & Skills']) == ['P', 'cognitive', 'Knowledge & Skills']
+    with pytest.raises(ValueError, match='Personalty'):
+        validate_test_types(['Personalty'])
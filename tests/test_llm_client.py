@@ -0,0 +1,83 @@
+"""LLM extraction: the sync and async paths share prompt, parsing and retry policy"""
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from modules.llm_client import LLMClient
+from modules.metrics import llm_event
+
+EVENTS = ('success', 'retry', 'fallback', 'json_error', 'api_error')
+REQUIREMENTS = {'technical_skills': ['Java'], 'soft_skills': [], 'role_type': 'developer', 'keywords': ['java']}
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class Completions:
+    """Replays scripted outcomes: a string is the model's reply, an exception is raised"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return completion(outcome)
+
+
+class AsyncCompletions(Completions):
+    async def create(self, **request):
+        return Completions.create(self, **request)
+
+
+def client(outcomes):
+    llm = LLMClient(api_key=None)
+    sync, async_ = Completions(outcomes), AsyncCompletions(outcomes)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=sync))
+    llm.async_client = SimpleNamespace(chat=SimpleNamespace(completions=async_))
+    return llm, sync, async_
+
+
+def counts():
+    return {event: llm_event(event).value() for event in EVENTS}
+
+
+def delta(before):
+    return {event: value - before[event] for event, value in counts().items() if value != before[event]}
+
+
+SCENARIOS = {
+    'success': ([json.dumps(REQUIREMENTS)], REQUIREMENTS, {'success': 1}),
+    'markdown': (['```json\n' + json.dumps(REQUIREMENTS) + '\n```'], REQUIREMENTS, {'success': 1}),
+    'bad json then success': (['not json', json.dumps(REQUIREMENTS)], REQUIREMENTS,
+                              {'json_error': 1, 'retry': 1, 'success': 1}),
+    'api errors exhaust retries': ([RuntimeError('down')] * 3, LLMClient.empty_requirements(),
+                                   {'api_error': 3, 'retry': 2, 'fallback': 1}),
+}
+
+
+@pytest.mark.parametrize('name', SCENARIOS)
+def test_sync_and_async_behave_the_same(name):
+    outcomes, expected, events = SCENARIOS[name]
+
+    llm, sync, async_ = client(outcomes)
+    before = counts()
+    assert llm.extract_requirements('java developer', max_retries=2) == expected
+    assert delta(before) == events
+
+    before = counts()
+    assert asyncio.run(llm.extract_requirements_async('java developer', max_retries=2)) == expected
+    assert delta(before) == events
+
+    assert sync.requests == async_.requests
+    assert sync.requests[0]['messages'][1]['content'].count('java developer') == 1
+
+
+def test_no_client_returns_empty_requirements():
+    llm = LLMClient(api_key=None)
+    assert llm.extract_requirements('java') == LLMClient.empty_requirements()
+    assert asyncio.run(llm.extract_requirements_async('java')) == LLMClient.empty_requirements()
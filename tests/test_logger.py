@@ -0,0 +1,40 @@
+"""Queued logging: formatting on the listener thread and SHL_LOG_LEVEL handling"""
+import logging
+from modules import config, logger as logger_module
+from modules.logger import _LazyQueueHandler, flush_logs, setup_logger
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record, record.getMessage()))
+
+
+def test_records_are_formatted_by_the_listener(monkeypatch):
+    record = logging.LogRecord('x', logging.INFO, __file__, 1, 'scored %s', ('java',), None)
+    prepared = _LazyQueueHandler(None).prepare(record)
+    # Nothing is merged on the calling thread
+    assert prepared.msg == 'scored %s' and prepared.args == ('java',)
+
+    monkeypatch.setattr(config, 'LOG_ASYNC', True)
+    log = setup_logger('test_logger.listener')
+    capture = Capture()
+    monkeypatch.setitem(logger_module._router.routes, log.name, [capture])
+    log.info('scored %s in %d ms', 'java', 3)
+    assert flush_logs()
+    assert capture.records[-1][1] == 'scored java in 3 ms'
+
+
+def test_unknown_log_level_falls_back_to_default(monkeypatch):
+    monkeypatch.setattr(config, 'LOG_LEVEL', 'VERBOSE')
+    monkeypatch.setattr(config, 'LOG_ASYNC', False)
+    monkeypatch.setattr(logger_module, '_invalid_level_warned', False)
+    log = setup_logger('test_logger.verbose', level=logging.WARNING)
+    assert log.level == logging.WARNING
+    assert logger_module._invalid_level_warned
+
+    monkeypatch.setattr(config, 'LOG_LEVEL', 'DEBUG')
+    assert setup_logger('test_logger.debug').level == logging.DEBUG
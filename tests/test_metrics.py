@@ -0,0 +1,41 @@
+"""Metrics: per-thread shards summed at scrape time"""
+import threading
+import pytest
+from modules.metrics import Counter, Histogram, MetricsRegistry, _Metric, _Sharded
+
+
+def test_bases_are_abstract():
+    with pytest.raises(TypeError):
+        _Sharded()
+    with pytest.raises(TypeError):
+        _Metric('x', 'doc')
+
+
+def test_shards_from_all_threads_are_summed():
+    counter = Counter('events_total', 'Events', ['kind'])
+    histogram = Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    child = counter.labels(kind='a')
+
+    def work():
+        for _ in range(100):
+            child.inc()
+            histogram.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert child.value() == 400
+    assert histogram.labels().snapshot() == ([0, 400, 400], 200.0)
+
+
+def test_render():
+    registry = MetricsRegistry()
+    registry.counter('events_total', 'Events', ['kind']).labels(kind='a').inc(2)
+    registry.histogram('latency_seconds', 'Latency', buckets=(0.1,)).observe(0.05)
+    text = registry.render()
+    assert '# TYPE events_total counter\nevents_total{kind="a"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_count 1' in text
@@ -0,0 +1,110 @@
+"""Pipeline: cache hits, invalidation and dependency checks"""
+import pytest
+from modules.exceptions import PipelineException
+from modules.pipeline import Pipeline, Stage
+
+
+class Counter:
+    def __init__(self):
+        self.calls = {}
+
+    def wrap(self, name, func):
+        def stage(*args):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return func(*args)
+        return stage
+
+
+def build(tmp_path, counter, source, scale=2, workers=1):
+    def read():
+        return source.read_text()
+
+    stages = [
+        Stage('read', counter.wrap('read', read), outputs=['text'], files=[source]),
+        Stage('upper', counter.wrap('upper', str.upper), inputs=['text'], outputs=['upper']),
+        Stage('length', counter.wrap('length', lambda text: len(text) * scale), inputs=['upper'],
+              outputs=['length'], params={'scale': scale}),
+    ]
+    return Pipeline(stages, cache_dir=tmp_path / 'cache', workers=workers)
+
+
+def statuses(pipeline):
+    return {entry['stage']: entry['status'] for entry in pipeline.report}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('abc')
+    return path
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_second_run_is_served_from_cache(tmp_path, source, workers):
+    counter = Counter()
+    assert build(tmp_path, counter, source, workers=workers).run() == {'text': 'abc', 'upper': 'ABC', 'length': 6}
+
+    pipeline = build(tmp_path, counter, source, workers=workers)
+    assert pipeline.run(targets=['length']) == {'length': 6}
+    assert set(statuses(pipeline).values()) == {'cached'}
+    assert counter.calls == {'read': 1, 'upper': 1, 'length': 1}
+
+
+def test_changed_file_reruns_downstream(tmp_path, source):
+    counter = Counter()
+    build(tmp_path, counter, source).run()
+    source.write_text('abcd')
+    pipeline = build(tmp_path, counter, source)
+    assert pipeline.run(targets=['length']) == {'length': 8}
+    assert statuses(pipeline) == {'read': 'ran', 'upper': 'ran', 'length': 'ran'}
+
+
+def test_changed_params_rerun_only_that_stage(tmp_path, source):
+    counter = Counter()
+    build(tmp_path, counter, source).run()
+    pipeline = build(tmp_path, counter, source, scale=3)
+    assert pipeline.run(targets=['length']) == {'length': 9}
+    assert statuses(pipeline) == {'read': 'cached', 'upper': 'cached', 'length': 'ran'}
+
+
+def test_identical_output_keeps_downstream_cached(tmp_path, source):
+    counter = Counter()
+    build(tmp_path, counter, source).run()
+    # Different file, same text after upper-casing
+    source.write_text('ABC')
+    pipeline = build(tmp_path, counter, source)
+    pipeline.run()
+    assert statuses(pipeline) == {'read': 'ran', 'upper': 'ran', 'length': 'cached'}
+
+
+def test_changed_code_invalidates_cache(tmp_path):
+    def run(func):
+        pipeline = Pipeline([Stage('value', func, outputs=['value'])], cache_dir=tmp_path)
+        return pipeline.run()['value'], statuses(pipeline)['value']
+
+    def value():
+        return 1
+
+    def edited_value():
+        return 2
+
+    assert run(value) == (1, 'ran')
+    assert run(value) == (1, 'cached')
+    assert run(edited_value) == (2, 'ran')
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_cycle_is_detected(workers):
+    stages = [
+        Stage('a', lambda: 1, outputs=['a'], after=['b']),
+        Stage('b', lambda a: a, inputs=['a'], outputs=['b']),
+    ]
+    with pytest.raises(PipelineException, match='cycle'):
+        Pipeline(stages, workers=workers).run()
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(PipelineException, match='no stage produces'):
+        Pipeline([Stage('a', lambda x: x, inputs=['x'], outputs=['a'])])
+    with pytest.raises(PipelineException, match='produced by both'):
+        Pipeline([Stage('a', lambda: 1, outputs=['x']), Stage('b', lambda: 2, outputs=['x'])])
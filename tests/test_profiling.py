@@ -0,0 +1,43 @@
+"""Sampling profiler: stopping and cancelling"""
+import asyncio
+import threading
+import pytest
+from modules.profiling import SamplingProfiler
+
+
+def samplers():
+    return [thread for thread in threading.enumerate() if thread.name == 'shl-profiler']
+
+
+def test_profile_stops_after_max_requests():
+    profiler = SamplingProfiler(interval_ms=1, max_seconds=10)
+
+    async def main():
+        task = asyncio.create_task(profiler.profile(max_requests=2))
+        await asyncio.sleep(0.05)
+        profiler.request_finished()
+        profiler.request_finished()
+        return await task
+
+    result = asyncio.run(main())
+    assert result.requests == 2
+    assert result.seconds < 5
+    assert not profiler.running
+    assert not samplers()
+
+
+def test_cancelled_profile_joins_the_sampler():
+    profiler = SamplingProfiler(interval_ms=1, max_seconds=10)
+
+    async def main():
+        task = asyncio.create_task(profiler.profile())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # A new profile can start straight away
+        return await profiler.profile(seconds=0.05)
+
+    assert asyncio.run(main()).samples >= 0
+    assert not profiler.running
+    assert not samplers()
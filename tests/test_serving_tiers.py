@@ -0,0 +1,40 @@
+"""Serving tiers: static selection and per-request latency downgrades"""
+import pytest
+from modules.serving_tiers import TIERS, TierSelector, select_serving_tier
+
+
+def selector(base='full', probe_every=1000):
+    return TierSelector(TIERS[base], llm_budget_ms=100, semantic_budget_ms=10, probe_every=probe_every)
+
+
+@pytest.mark.parametrize('base, llm_ms, semantic_ms, expected', [
+    ('full', 50, 5, 'full'),
+    ('full', 500, 5, 'no-llm'),
+    ('full', 50, 50, 'lexical-llm'),
+    ('full', 500, 50, 'lexical-training'),
+    ('no-llm', 500, 50, 'lexical-training'),
+    ('lexical-training', 500, 50, 'lexical-training'),
+])
+def test_stages_are_dropped_independently(base, llm_ms, semantic_ms, expected):
+    tiers = selector(base)
+    tiers.observe('llm', llm_ms / 1000)
+    tiers.observe('semantic', semantic_ms / 1000)
+    assert tiers.current().name == expected
+    assert tiers.served[expected] == 1
+
+
+def test_probe_runs_the_base_tier():
+    tiers = selector(probe_every=2)
+    tiers.observe('semantic', 1.0)
+    assert [tiers.current().name for _ in range(4)] == ['lexical-llm', 'full'] * 2
+
+
+@pytest.mark.parametrize('llm_available, memory_mb, expected', [
+    (True, 1e6, 'full'),
+    (False, 1e6, 'no-llm'),
+    (True, 1, 'lexical-llm'),
+    (False, 1, 'lexical-training'),
+])
+def test_auto_selection(llm_available, memory_mb, expected):
+    tier = select_serving_tier('auto', llm_available=llm_available, encoder_backend='torch', memory_mb=memory_mb)
+    assert tier.name == expected
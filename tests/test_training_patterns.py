@@ -0,0 +1,58 @@
+"""Incremental training patterns (used by cross-validation)"""
+import pandas as pd
+import pytest
+from modules.training_patterns import TrainingPatternsLearner
+
+
+@pytest.fixture
+def train():
+    return pd.DataFrame({
+        'Query': ['Java developer with SQL', 'Java developer with SQL', 'Sales manager personality',
+                  'Senior Java engineer'],
+        'normalized_url': ['java-8', 'sql-server', 'opq32r', 'java-8'],
+    })
+
+
+def snapshot(learner):
+    return dict(learner.assessment_freq), {word: list(urls) for word, urls in learner.keyword_to_assessments.items()}
+
+
+def learned(df):
+    learner = TrainingPatternsLearner()
+    learner.add_examples(df)
+    return learner
+
+
+def test_add_then_remove_restores_stats(train):
+    learner = learned(train)
+    before = snapshot(learner)
+    extra = pd.DataFrame({'Query': ['Java and Python developer', 'Call center agent'],
+                          'normalized_url': ['java-8', 'contact-center']})
+
+    learner.add_examples(extra)
+    assert snapshot(learner) != before
+    learner.remove_examples(extra)
+    assert snapshot(learner) == before
+
+
+def test_remove_matches_learning_without_the_rows(train):
+    held_out = train.iloc[[1, 3]]
+    learner = learned(train)
+    learner.remove_examples(held_out)
+
+    expected = learned(train.drop(index=held_out.index))
+    assert snapshot(learner) == snapshot(expected)
+    # Counts that reach zero are dropped, not left behind as 0 / []
+    assert 'senior' not in learner.keyword_to_assessments
+    assert 'sql-server' not in learner.assessment_freq
+
+
+def test_remove_then_add_restores_boosts(train):
+    learner = learned(train)
+    url_boost = learner.get_training_boost('java-8', 'java developer')
+    held_out = train.iloc[[0]]
+
+    learner.remove_examples(held_out)
+    assert learner.get_training_boost('java-8', 'java developer') < url_boost
+    learner.add_examples(held_out)
+    assert learner.get_training_boost('java-8', 'java developer') == url_boost